@@ -1,38 +1,65 @@
 # analysis.py
 import pandas as pd
+import numpy as np
 import os
-import re
-from config import FUND_CONFIG, YEARS, MONTHS
+from config import FUND_CONFIG, SCHEME_TYPE_KEYWORDS
+import periods
+import security_master
 
-def load_fund_data(fund_name):
-    """Helper to load a specific fund's excel file"""
+# --- READING ---
+# The holdings engine keeps the one resident (cleaned) copy of each fund; nothing is cached here.
+def read_fund_file(fund_name):
+    """A fund's excel file as stored, read fresh (for raw checks; dashboard reads go through the engine)"""
     file_path = FUND_CONFIG[fund_name]["file"]
     if not os.path.exists(file_path):
         return None
-    
-    df = pd.read_excel(file_path)
+    return pd.read_excel(file_path)
+
+def load_fund_data(fund_name):
+    """A fund's cleaned holdings: a private copy of the engine's shared frame"""
+    # Deferred: engine builds on this module
+    import engine
+    df = engine.get_engine().frame(fund_name)
+    return df.copy() if df is not None else None
+
+def scheme_type(fund_name):
+    """equity / hybrid / debt: the fund's "scheme_type" setting, else guessed from its name"""
+    configured = FUND_CONFIG.get(fund_name, {}).get("scheme_type")
+    if configured:
+        return configured
+    name = fund_name.lower()
+    return next((kind for kind, words in SCHEME_TYPE_KEYWORDS.items() if any(w in name for w in words)), "equity")
+
+def percent_nav(df, fund_name):
+    """
+    NavPct is kept in percent (5.2 = 5.2% of NAV); sheets formatted as Excel percentages read as
+    fractions, so a month whose values are all <= 1 and sum to <= 1.5 is scaled (in place). Debt
+    schemes are left alone: a few tiny equity rows there are real percentages.
+    """
+    if scheme_type(fund_name) == "debt":
+        return df
+    for col in [c for c in df.columns if str(c).startswith("NavPct_")]:
+        nav = pd.to_numeric(df[col], errors="coerce")
+        if nav.notna().any() and nav.abs().max() <= 1 and nav.sum() <= 1.5:
+            df[col] = nav * 100
+    return df
+
+def clean_fund_frame(df, fund_name):
+    """Normalizes a fund file as read from disk (in place): ISIN key, canonical names, numeric quantities, NavPct in percent"""
     # Clean ISIN - This is the primary key for matching
     if "ISIN" in df.columns:
         df["ISIN"] = df["ISIN"].astype(str).str.strip().str.upper()
-    # Clean Stock Names - remove special characters and extra whitespace
-    if "Stock Name" in df.columns:
-        df["Stock Name"] = df["Stock Name"].astype(str).str.strip()
-        # Remove special characters but keep alphanumeric, spaces, and hyphens
-        df["Stock Name"] = df["Stock Name"].str.replace(r'[^\w\s\-&]', '', regex=True)
-        df["Stock Name"] = df["Stock Name"].str.replace(r'\s+', ' ', regex=True)  # Collapse multiple spaces
-    return df
+    # Canonical names come from the security master (a lookup, not a regex sweep)
+    security_master.get_master().apply(df)
+    for c in df.columns:
+        if str(c).startswith("Qty_"):
+            df[c] = pd.to_numeric(df[c], errors="coerce").fillna(0)
+    return percent_nav(df, fund_name)
 
 def get_latest_month_column(df):
     """Finds the most recent data column in a dataframe"""
-    qty_cols = [c for c in df.columns if "Qty_" in c]
-    if not qty_cols:
-        return None
-        
-    def get_month_index(col_name):
-        m_name = col_name.replace("Qty_", "").replace(f"_{YEARS[0]}", "")
-        return MONTHS.index(m_name) if m_name in MONTHS else -1
-    
-    return sorted(qty_cols, key=get_month_index)[-1]
+    qty_cols = periods.sort_period_cols([c for c in df.columns if "Qty_" in c])
+    return qty_cols[-1] if qty_cols else None
 
 
 def compare_portfolios(fund_a_name, fund_b_name):
@@ -40,9 +67,10 @@ def compare_portfolios(fund_a_name, fund_b_name):
     Compares two funds and returns a FULL merged view of both portfolios.
     """
     # 1. Load Data
-    df_a = load_fund_data(fund_a_name)
-    df_b = load_fund_data(fund_b_name)
-    
+    return compare_frames(load_fund_data(fund_a_name), load_fund_data(fund_b_name), fund_a_name, fund_b_name)
+
+def compare_frames(df_a, df_b, fund_a_name, fund_b_name):
+    """compare_portfolios on already-loaded frames (the holdings engine passes its shared copies)"""
     if df_a is None or df_b is None:
         return {"error": "One or both fund files are missing. Please sync them first."}
 
@@ -67,22 +95,16 @@ def compare_portfolios(fund_a_name, fund_b_name):
     
     # 5. Clean Up Data
     #    Coalesce Stock Names: If Name is missing in A (because it's unique to B), take it from B
-    merged_df["Stock Name"] = merged_df["Stock Name_A"].fillna(merged_df["Stock Name_B"])
+    #    (as plain strings: the engine's categoricals don't share categories across funds)
+    merged_df["Stock Name"] = merged_df["Stock Name_A"].astype(object).fillna(merged_df["Stock Name_B"].astype(object))
     merged_df.drop(columns=["Stock Name_A", "Stock Name_B"], inplace=True)
     
     #    Fill NaN Quantities with 0
     merged_df[[qty_a_label, qty_b_label]] = merged_df[[qty_a_label, qty_b_label]].fillna(0)
     
     # 6. Determine "Status" (Overlap vs Unique)
-    def get_status(row):
-        if row[qty_a_label] > 0 and row[qty_b_label] > 0:
-            return "Overlap"
-        elif row[qty_a_label] > 0:
-            return f"Unique to {fund_a_name}"
-        else:
-            return f"Unique to {fund_b_name}"
-
-    merged_df["Status"] = merged_df.apply(get_status, axis=1)
+    in_a, in_b = merged_df[qty_a_label] > 0, merged_df[qty_b_label] > 0
+    merged_df["Status"] = np.select([in_a & in_b, in_a], ["Overlap", f"Unique to {fund_a_name}"], f"Unique to {fund_b_name}")
     
     # 7. Calculate Stats
     counts = merged_df["Status"].value_counts()
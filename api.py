@@ -0,0 +1,233 @@
+# api.py
+import argparse
+import gzip
+import json
+import threading
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+from config import FUND_CONFIG, API_HOST, API_PORT, API_CACHE_SIZE, API_GZIP_MIN_BYTES
+import periods
+import engine
+import similarity
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+# ===========================
+# ENDPOINTS
+# ===========================
+# Each takes the query parameters and returns a JSON-ready payload.
+def _records(df):
+    if df is None:
+        return []
+    return df.astype(object).where(df.notna(), None).to_dict(orient="records")
+
+def _fund(params, key="fund"):
+    name = params.get(key)
+    if name not in FUND_CONFIG:
+        raise ApiError(404, f"unknown fund: {name}")
+    return name
+
+def _period(params, fund_name):
+    """?period=YYYY-MM, defaulting to the fund's latest stored month"""
+    if "period" in params:
+        try:
+            return periods.parse_month_key(params["period"])
+        except (ValueError, IndexError):
+            raise ApiError(400, "period must be YYYY-MM")
+    latest = engine.get_engine().latest_period(fund_name)
+    if latest is None:
+        raise ApiError(404, f"no data for {fund_name}")
+    return latest
+
+def list_funds(params):
+    eng = engine.get_engine()
+    out = []
+    for name, conf in FUND_CONFIG.items():
+        stored = eng.periods(name)
+        out.append({
+            "fund": name, "amc": conf.get("amc_code"), "periods": [periods.month_key(*p) for p in stored],
+            "latest": periods.month_key(*stored[-1]) if stored else None
+        })
+    return out
+
+def get_holdings(params):
+    fund_name = _fund(params)
+    month, year = _period(params, fund_name)
+    df = engine.get_engine().holdings(fund_name, month, year)
+    if df is None:
+        raise ApiError(404, f"{fund_name} has no data for {periods.month_key(month, year)}")
+    return {"fund": fund_name, "period": periods.month_key(month, year), "holdings": _records(df)}
+
+def get_flows(params):
+    fund_name = _fund(params)
+    month, year = _period(params, fund_name)
+    entries, exits, prev = engine.get_engine().flows(fund_name, month, year)
+    return {
+        "fund": fund_name, "period": periods.month_key(month, year),
+        "previous": periods.month_key(*prev) if prev else None,
+        "entries": _records(entries), "exits": _records(exits)
+    }
+
+def get_cumulative_flows(params):
+    """Per stock across every stored month: months held, entries, exits, adds, trims, net change"""
+    fund_name = _fund(params)
+    matrix = engine.get_engine().flow_matrix(fund_name)
+    if matrix is None:
+        raise ApiError(404, f"no data for {fund_name}")
+    return {
+        "fund": fund_name, "periods": [periods.month_key(*p) for p in matrix.periods],
+        "stocks": _records(matrix.cumulative())
+    }
+
+def get_trajectory(params):
+    isin = params.get("isin")
+    if not isin:
+        raise ApiError(400, "isin is required")
+    eng = engine.get_engine()
+    if "fund" in params:
+        fund_name = _fund(params)
+        return {"isin": isin, "fund": fund_name, "trajectory": _records(eng.trajectory(fund_name, isin))}
+    return {"isin": isin, "trajectories": _records(eng.trajectories(isin))}
+
+def get_overlap(params):
+    fund_a, fund_b = _fund(params, "a"), _fund(params, "b")
+    result = engine.get_engine().overlap(fund_a, fund_b)
+    if "error" in result:
+        raise ApiError(404, result["error"])
+    merged = result["merged_df"].rename(columns={result["col_a"]: "QtyA", result["col_b"]: "QtyB"})
+    return {
+        "a": fund_a, "b": fund_b, "stats": {k: int(v) for k, v in result["stats"].items()},
+        "holdings": _records(merged)
+    }
+
+def get_similar(params):
+    """?fund=...&k=10&period=YYYY-MM: most similar funds by ISIN-set Jaccard; no fund = likely closet indexers"""
+    index = similarity.get_index()
+    if "fund" not in params:
+        return {"closet_indexers": _records(index.closet_indexers())}
+    fund_name = _fund(params)
+    month, year = _period(params, fund_name)
+    try:
+        k = int(params.get("k", 10))
+    except ValueError:
+        raise ApiError(400, "k must be an integer")
+    return {"fund": fund_name, "period": periods.month_key(month, year), "similar": _records(index.similar(fund_name, k, (month, year)))}
+
+ROUTES = {
+    "/funds": list_funds,
+    "/holdings": get_holdings,
+    "/flows": get_flows,
+    "/flows/cumulative": get_cumulative_flows,
+    "/trajectory": get_trajectory,
+    "/overlap": get_overlap,
+    "/similar": get_similar
+}
+
+# ===========================
+# RESPONSE CACHE
+# ===========================
+class ResponseCache:
+    """Rendered bodies (plain and gzipped) per (URL, data version); LRU-bounded"""
+    def __init__(self, size=API_CACHE_SIZE):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, body):
+        entry = {"body": body, "gzip": gzip.compress(body, 5) if len(body) >= API_GZIP_MIN_BYTES else None}
+        with self._lock:
+            self._entries[key] = entry
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return entry
+
+_CACHE = ResponseCache()
+
+# ===========================
+# SERVER
+# ===========================
+class ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # Keep-alive: internal tools poll in tight loops
+    disable_nagle_algorithm = True  # Headers and body go out as separate writes; don't wait on delayed ACKs
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        route = ROUTES.get(url.path.rstrip("/") or "/funds")
+        if route is None:
+            return self._send_json(404, {"error": f"no such endpoint: {url.path}"})
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+        try:
+            # Cheap version check first; the payload is only built on a cache miss
+            depends_on = _dependencies(route, params)
+            etag = f'"{engine.get_engine().version(depends_on)}"'
+            if self.headers.get("If-None-Match") == etag:
+                return self._send(304, b"", etag)
+            key = (self.path, etag)
+            entry = _CACHE.get(key)
+            if entry is None:
+                entry = _CACHE.put(key, json.dumps(route(params), default=str).encode())
+        except ApiError as e:
+            return self._send_json(e.status, {"error": str(e)})
+        except Exception as e:
+            return self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+
+        if entry["gzip"] is not None and "gzip" in self.headers.get("Accept-Encoding", ""):
+            return self._send(200, entry["gzip"], etag, encoding="gzip")
+        self._send(200, entry["body"], etag)
+
+    def _send_json(self, status, payload):
+        self._send(status, json.dumps(payload).encode())
+
+    def _send(self, status, body, etag=None, encoding=None):
+        self.send_response(status)
+        if status != 304:
+            self.send_header("Content-Type", "application/json")
+        if etag:
+            self.send_header("ETag", etag)
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass   # One line per request would dominate at hundreds of requests per second
+
+def _dependencies(route, params):
+    """
+    Funds whose files a route reads, known from the query alone (None = every fund).
+    They decide the ETag, so an unrelated fund's sync doesn't invalidate a cached response.
+    """
+    if route in (get_holdings, get_flows, get_cumulative_flows) or (route is get_trajectory and "fund" in params):
+        return [_fund(params)]
+    if route is get_overlap:
+        return [_fund(params, "a"), _fund(params, "b")]
+    return None
+
+def serve(host=API_HOST, port=API_PORT):
+    server = ThreadingHTTPServer((host, port), ApiHandler)
+    print(f"🌐 API listening on http://{host}:{port} ({', '.join(ROUTES)})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="JSON API over fund holdings, flows and overlap.")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    args = parser.parse_args()
+    serve(args.host, args.port)
@@ -1,12 +1,17 @@
 import streamlit as st
-import pandas as pd
 import os
 import warnings
-import re
-from config import FUND_CONFIG, YEARS, MONTHS
-import scrapers
+from config import (FUND_CONFIG, YEARS, SCHEDULER_ENABLED, SIMILARITY_CLOSET_JACCARD, COMPARE_MAX_FUNDS,
+                    SYNC_DEADLINE_SECONDS)
 import ui
-import analysis
+import sector_flows
+import leaderboard
+import similarity
+import bitsets
+import engine
+import query
+import periods
+import export
 
 warnings.filterwarnings("ignore")
 
@@ -33,81 +38,66 @@ def go_home():
     st.session_state["app_mode"] = "Single View"
     st.rerun()
 
-#Helper: Normalize Stock Names
-def normalize_names(df):
-    if "Stock Name" in df.columns:
-        df["Stock Name"] = df["Stock Name"].astype(str)
-        df["Stock Name"] = df["Stock Name"].str.replace(r'\s+Limited\s*$', '', case=False, regex=True)
-        df["Stock Name"] = df["Stock Name"].str.replace(r'\s+Ltd\.?\s*$', '', case=False, regex=True)
-        # Remove special characters but keep alphanumeric, spaces, hyphens, and ampersand
-        df["Stock Name"] = df["Stock Name"].str.replace(r'[^\w\s\-&]', '', regex=True)
-        df["Stock Name"] = df["Stock Name"].str.replace(r'\s+', ' ', regex=True)  # Collapse multiple spaces
-        df["Stock Name"] = df["Stock Name"].str.strip()
-    return df
-
 # ===========================
 # 2. LOGIC CONTROLLER (SYNC)
 # ===========================
+@st.cache_resource
+def start_prefetch_scheduler():
+    """One background sync thread per server process, shared by all sessions"""
+    import scheduler
+    return scheduler.PrefetchScheduler().start()
+
+if SCHEDULER_ENABLED:
+    start_prefetch_scheduler()
+
+@st.cache_resource
+def get_holdings_engine():
+    """One copy of every fund's holdings per server process, shared by all sessions"""
+    return engine.get_engine()
+
+holdings_engine = get_holdings_engine()
+
 def run_update_process(fund_name):
-    conf = FUND_CONFIG[fund_name]
-    output_file = conf["file"]
+    # Deferred: sync pulls in the scrapers (requests, bs4), only needed once a sync is triggered
+    import sync
+    import pending
     status = st.empty()
     bar = st.progress(0)
-    
-    if os.path.exists(output_file):
-        master_df = pd.read_excel(output_file)
-        if "ISIN" in master_df.columns:
-            master_df["ISIN"] = master_df["ISIN"].astype(str).str.strip()
-    else:
-        master_df = pd.DataFrame(columns=["ISIN", "Stock Name"])
-
-    for i, month in enumerate(MONTHS):
-        col_name = f"Qty_{month}_{YEARS[0]}"
-        if col_name not in master_df.columns:
-            status.text(f"📥 Fetching {month} for {fund_name}...")
-            new_df = None
-            if fund_name == "PPFAS Flexi Cap": new_df = scrapers.fetch_ppfas(month, YEARS[0])
-            elif fund_name == "Nippon India Small Cap": new_df = scrapers.fetch_nippon(st,month, YEARS[0])
-            elif fund_name == "HDFC Nifty 50 Index": new_df = scrapers.fetch_hdfc(month, YEARS[0])
-            elif conf.get("amc_code") == "SBI":
-                new_df = scrapers.fetch_sbi_generic(fund_name, month, YEARS[0]) # <--- NEW GENERIC CALL
-            
-            if new_df is not None:
-                new_df["ISIN"] = new_df["ISIN"].astype(str).str.strip()
-                master_df = pd.merge(master_df, new_df, on="ISIN", how="outer", suffixes=("", "_new"))
-                
-                # Handle Stock Name
-                if "Stock Name_new" in master_df.columns:
-                    master_df["Stock Name"] = master_df["Stock Name"].fillna(master_df["Stock Name_new"])
-                    master_df.drop(columns=["Stock Name_new"], inplace=True)
-                st.toast(f"✅ Secured data for {month}  ", icon="✨")
-                # Handle Qty column
-                if f"{col_name}_new" in master_df.columns:
-                    master_df[col_name] = master_df[f"{col_name}_new"]
-                    master_df.drop(columns=[f"{col_name}_new"], inplace=True)
-                
-                # Handle MarketValue column
-                market_val_col = f"MarketValue_{month}_{YEARS[0]}"
-                if f"{market_val_col}_new" in master_df.columns:
-                    master_df[market_val_col] = master_df[f"{market_val_col}_new"]
-                    master_df.drop(columns=[f"{market_val_col}_new"], inplace=True)
-                
-                # Handle NavPct column
-                nav_pct_col = f"NavPct_{month}_{YEARS[0]}"
-                if f"{nav_pct_col}_new" in master_df.columns:
-                    master_df[nav_pct_col] = master_df[f"{nav_pct_col}_new"]
-                    master_df.drop(columns=[f"{nav_pct_col}_new"], inplace=True)
 
-            else:
-                st.toast(f"⚠️ Data for {month} not found. Skipping.", icon="⚠️")
-        bar.progress((i + 1) / len(MONTHS))
-    
-    master_df = normalize_names(master_df)
-    master_df.to_excel(output_file, index=False)
+    def on_progress(done, total, month, year):
+        status.text(f"📥 Fetched {month} {year} for {fund_name} ({done}/{total})...")
+        bar.progress(done / total)
+
+    def on_result(month, year, found):
+        if found: st.toast(f"✅ Secured data for {month}  ", icon="✨")
+        else: st.toast(f"⚠️ Data for {month} not found. Skipping.", icon="⚠️")
+
+    # Bounded: whatever is still downloading at the deadline is left to the background scheduler
+    master_df, _ = sync.sync_fund(fund_name, on_progress=on_progress, on_result=on_result, deadline=SYNC_DEADLINE_SECONDS)
     status.empty()
     bar.empty()
+    left = pending.periods_for(fund_name)
+    if left:
+        st.toast(f"⏳ {', '.join(f'{m[:3]} {y}' for m, y in left)} still downloading; will be picked up in the background.", icon="⏳")
     return master_df
 
+def export_controls(fund_name):
+    """Format, months and funds for an export; the file is only built (or reused) on download"""
+    fmt = st.selectbox("Format", export.available_formats(), format_func=export.FORMATS.get, key="export_format")
+    stored = holdings_engine.periods(fund_name)
+    period_range = None
+    if len(stored) > 1:
+        first, last = st.select_slider("Months", options=range(len(stored)), value=(0, len(stored) - 1),
+                                       format_func=lambda i: f"{stored[i][0][:3]} {stored[i][1]}", key=f"export_months_{fund_name}")
+        if (first, last) != (0, len(stored) - 1):
+            period_range = (stored[first], stored[last])
+    funds = st.multiselect("Funds", list(FUND_CONFIG), default=[fund_name], key=f"export_funds_{fund_name}")
+    st.caption("Excel: one sheet per fund. CSV / Parquet: one row per fund, stock and month.")
+    if not funds:
+        return
+    st.download_button("Download", data=lambda: export.read(funds, fmt, period_range), on_click="ignore",
+                       file_name=export.file_name(funds, fmt, period_range), mime=export.MIME_TYPES[fmt])
+
 # ===========================
 # 3. SIDEBAR NAVIGATION
 # ===========================
@@ -122,8 +112,9 @@ with st.sidebar:
         """, unsafe_allow_html=True)
     st.markdown("---")
     st.markdown("### Mode")
-    mode_index = 0 if st.session_state.get("app_mode", "Single View") == "Single View" else 1
-    app_mode = st.radio("Navigation Mode", ["Single View", "Compare Funds"], index=mode_index, label_visibility="collapsed")
+    modes = ["Single View", "Compare Funds", "Smart Money"]
+    mode_index = modes.index(st.session_state.get("app_mode", "Single View"))
+    app_mode = st.radio("Navigation Mode", modes, index=mode_index, label_visibility="collapsed")
     st.session_state["app_mode"] = app_mode
     st.markdown("---")
 
@@ -146,28 +137,34 @@ with st.sidebar:
                     activate_dashboard() # Ensure dashboard shows after sync
                     st.rerun()
         if os.path.exists(current_file):
-            with open(current_file, "rb") as f:
-                c2.download_button("↓ Export", f, file_name=current_file)
+            with c2.popover("↓ Export"):
+                export_controls(selected_fund)
 
         st.markdown("---")
         st.markdown("### Timeline")
         
-        available_months = []
-        if os.path.exists(current_file):
-            temp = pd.read_excel(current_file)
-            available_months = [c.replace("Qty_", "").replace(f"_{YEARS[0]}", "") for c in temp.columns if "Qty_" in c]
-        view_month = st.selectbox("Period", ["All Months"] + available_months) if available_months else "All Months"
+        # Every stored month, any year, newest last
+        available_periods = {f"{m} {y}": (m, y) for m, y in holdings_engine.periods(selected_fund)}
+        view_month = st.selectbox("Period", ["All Months"] + list(available_periods)) if available_periods else "All Months"
+        view_period = available_periods.get(view_month)
         
+    elif app_mode == "Smart Money":
+        st.markdown("### 🐋 Smart Money")
+        st.caption("What every tracked fund bought and sold, month by month.")
+        board_periods = {f"{m} {y}": (m, y) for m, y in reversed(leaderboard.available_periods())}
+        board_month = st.selectbox("Month", list(board_periods)) if board_periods else None
+        board_by = st.radio("Rank By", ["Number of Funds", "Market Value"], horizontal=True)
+
     else: 
         st.markdown("### ⚔️ Compare")
-        st.caption("Select two funds to find overlapping holdings.")
-        fund_a = st.selectbox("Base Fund (A)", list(FUND_CONFIG.keys()), index=0)
-        fund_b = st.selectbox("Target Fund (B)", list(FUND_CONFIG.keys()), index=1)
+        st.caption("Pick two funds for a head-to-head overlap, or more to see where they all intersect.")
+        compare_funds = st.multiselect("Funds", list(FUND_CONFIG.keys()), default=list(FUND_CONFIG.keys())[:2],
+                                       max_selections=COMPARE_MAX_FUNDS)
         
         st.markdown("<br>", unsafe_allow_html=True)
         if st.button("Analyze Overlap", type="primary"):
-            if fund_a == fund_b:
-                st.error("❌ Please select two different funds to compare.")
+            if len(compare_funds) < 2:
+                st.error("❌ Please select at least two funds to compare.")
             else:
                 st.session_state['run_compare'] = True
                 activate_dashboard() # Switch to view on click
@@ -199,31 +196,21 @@ if app_mode == "Single View":
             </div>
         """, unsafe_allow_html=True)
 
-        df = pd.read_excel(current_file)
-        df = normalize_names(df)
+        # Shared across sessions: filter/copy, never modify in place
+        df = holdings_engine.frame(selected_fund)
         
-        qty_cols = [c for c in df.columns if "Qty_" in c]
-        for c in qty_cols: df[c] = pd.to_numeric(df[c], errors='coerce').fillna(0)
+        qty_cols = periods.sort_period_cols([c for c in df.columns if "Qty_" in c])
+        latest_col = qty_cols[-1] if qty_cols else None
 
-        present_qty_cols = [c for c in qty_cols if c in df.columns]
-        latest_col = None
-        
-        if present_qty_cols:
-            def get_month_index(col_name):
-                m_name = col_name.replace("Qty_", "").replace(f"_{YEARS[0]}", "")
-                return MONTHS.index(m_name) if m_name in MONTHS else -1
-            sorted_cols = sorted(present_qty_cols, key=get_month_index)
-            latest_col = sorted_cols[-1]
-
-        if view_month != "All Months":
-            target_col = f"Qty_{view_month}_{YEARS[0]}"
+        if view_period:
+            target_col = periods.qty_col(*view_period)
             display_df = df[df[target_col] > 0][["Stock Name", "ISIN", target_col]].copy()
             view_cols = [target_col]
             active_count = len(display_df)
         else:
-            mask = df[present_qty_cols].sum(axis=1) > 0
-            display_df = df[mask][["Stock Name", "ISIN"] + present_qty_cols].copy()
-            view_cols = present_qty_cols
+            mask = df[qty_cols].sum(axis=1) > 0
+            display_df = df[mask][["Stock Name", "ISIN"] + qty_cols].copy()
+            view_cols = qty_cols
             active_count = len(df[df[latest_col] > 0]) if latest_col else 0
 
         top_stock = "N/A"
@@ -244,7 +231,7 @@ if app_mode == "Single View":
 
         col1, col2, col3 = st.columns(3)
         with col1: ui.render_metric_card("Total Assets", active_count, "Active Positions", "neu")
-        with col2: ui.render_metric_card("Top Allocation", top_stock[:15]+"..", f"{top_nav_pct*100:.2f}% of NAV", "pos")
+        with col2: ui.render_metric_card("Top Allocation", top_stock[:15]+"..", f"{top_nav_pct:.2f}% of NAV", "pos")
         with col3: 
             arrow = "↑" if delta_pct >= 0 else "↓"
             ui.render_metric_card("Volume Velocity", f"{abs(delta_pct):.1f}%", f"{arrow} MoM Change", "pos" if delta_pct >= 0 else "neg")
@@ -252,56 +239,28 @@ if app_mode == "Single View":
         st.markdown("<br>", unsafe_allow_html=True)
 
         if latest_col:
-            new_entries_df = pd.DataFrame()
-            exits_df = pd.DataFrame()
-            
-            # Determine which month to show in Fund Flow
-            if view_month != "All Months":
-                current_month_col = f"Qty_{view_month}_{YEARS[0]}"
-                # Find previous month
-                current_idx = MONTHS.index(view_month) if view_month in MONTHS else -1
-                if current_idx > 0:
-                    prev_month = MONTHS[current_idx - 1]
-                    prev_month_col = f"Qty_{prev_month}_{YEARS[0]}"
-                    if prev_month_col in df.columns and current_month_col in df.columns:
-                        mask_new = (df[prev_month_col] == 0) & (df[current_month_col] > 0)
-                        new_entries_df = df[mask_new][["Stock Name", current_month_col]].rename(columns={current_month_col: "Qty"})
-                        mask_exit = (df[prev_month_col] > 0) & (df[current_month_col] == 0)
-                        exits_df = df[mask_exit][["Stock Name", prev_month_col]].rename(columns={prev_month_col: "Qty"})
-                        fund_flow_label = view_month
-                    else:
-                        fund_flow_label = view_month
-                else:
-                    fund_flow_label = view_month
-            else:
-                # Use latest months for "All Months" view
-                if len(sorted_cols) >= 2:
-                    curr_col = sorted_cols[-1]
-                    prev_col = sorted_cols[-2]
-                    mask_new = (df[prev_col] == 0) & (df[curr_col] > 0)
-                    new_entries_df = df[mask_new][["Stock Name", curr_col]].rename(columns={curr_col: "Qty"})
-                    mask_exit = (df[prev_col] > 0) & (df[curr_col] == 0)
-                    exits_df = df[mask_exit][["Stock Name", prev_col]].rename(columns={prev_col: "Qty"})
-                    fund_flow_label = latest_col.replace("Qty_", "").replace(f"_{YEARS[0]}", "")
-                else:
-                    fund_flow_label = "N/A"
+            # Every month's flows come from one cached diff of the whole ISIN x period matrix
+            flow = holdings_engine.flow_matrix(selected_fund)
+            flow_period = view_period or periods.parse_period_col(latest_col)
+            fund_flow_label = f"{flow_period[0]} {flow_period[1]}"
 
-            tab1, tab2, tab3, tab4 = st.tabs(["Fund Flow", "Overview", "Data Grid", "Analytics"])
+            tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["Fund Flow", "Overview", "Data Grid", "Analytics", "Sectors", "Similar Funds"])
             
             with tab1:
-                if view_month != "All Months" and MONTHS.index(view_month) == 0:
-                    st.warning("⚠️ January has no previous month for Entry/Exit comparison.")
-                elif len(sorted_cols) < 2 and view_month == "All Months":
-                    st.warning("⚠️ Need at least 2 months of data to calculate Entry/Exit flows.")
-                else: ui.render_fund_flow(new_entries_df, exits_df, fund_flow_label)
+                if flow.previous(*flow_period) is None:
+                    st.warning(f"⚠️ {fund_flow_label} is the first stored month, so there is nothing to compare it with. Sync earlier months to see its flows.")
+                else:
+                    ui.render_fund_flow(flow.entries(*flow_period), flow.exits(*flow_period), fund_flow_label)
+                ui.render_flow_history(flow.summary(), flow.cumulative())
 
             with tab2: ui.render_treemap(df[df[latest_col]>0].nlargest(30, latest_col), latest_col)
             
             with tab3:
                 if "Stock Name" in display_df.columns:
+                    # Group on ISIN (the real key); two ISINs can share a display name
                     agg = {c: "sum" for c in view_cols}
-                    if "ISIN" in display_df.columns: agg["ISIN"] = "first"
-                    grid = display_df.groupby("Stock Name", as_index=False).agg(agg).set_index("Stock Name")
+                    agg["Stock Name"] = "first"
+                    grid = display_df.groupby("ISIN", as_index=False).agg(agg).set_index(["Stock Name", "ISIN"])
                 else: grid = display_df
                 st.dataframe(grid.style.background_gradient(cmap="Oranges", subset=view_cols).format("{:,.0f}", subset=view_cols), use_container_width=True, height=500)
                 
@@ -309,6 +268,24 @@ if app_mode == "Single View":
                 c_s, _ = st.columns([1, 2])
                 with c_s: stock = st.selectbox("Inspect Asset", sorted(df["Stock Name"].unique().tolist()))
                 ui.render_trend_chart(df, stock, qty_cols, YEARS)
+
+            with tab5:
+                scope = st.radio("Scope", ["This Fund", "All Funds"], horizontal=True, label_visibility="collapsed")
+                sector_df = sector_flows.sector_view(selected_fund if scope == "This Fund" else None)
+                if sector_df.empty and scope == "This Fund":
+                    # Fund synced before sector tracking existed: build its aggregate once
+                    sector_flows.update_fund(selected_fund, df)
+                    sector_df = sector_flows.sector_view(selected_fund)
+                ui.render_sector_view(sector_df)
+
+            with tab6:
+                similar_df = similarity.get_index().similar(selected_fund, 10, flow_period)
+                index_match = None
+                if not similarity.is_index_fund(selected_fund):
+                    closest = similar_df[similar_df["Fund"].map(similarity.is_index_fund)]
+                    if not closest.empty and closest["Jaccard"].iloc[0] >= SIMILARITY_CLOSET_JACCARD:
+                        index_match = closest.iloc[0]
+                ui.render_similar_funds(similar_df, fund_flow_label, index_match)
     
     else:
         # --- SHOW LANDING PAGE (Default State) ---
@@ -320,6 +297,24 @@ if app_mode == "Single View":
                 run_update_process(selected_fund)
                 st.rerun()
 
+elif app_mode == "Smart Money":
+    if st.button("← Back to Home", key="home_btn_smart"):
+        go_home()
+
+    st.markdown("---")
+    st.markdown("""
+        <div style="margin-bottom: 2rem; padding-top: 1rem;">
+            <h1 style="font-size: 2rem; margin-bottom: 0.5rem;">Smart Money Leaderboard</h1>
+            <p style="font-size: 1rem; opacity: 0.8;">Most bought, sold, initiated and exited stocks across every tracked fund.</p>
+        </div>
+    """, unsafe_allow_html=True)
+
+    if board_month:
+        boards = leaderboard.leaderboard(*board_periods[board_month], by="funds" if board_by == "Number of Funds" else "value")
+        ui.render_leaderboard(boards, board_month)
+    else:
+        st.info("No trades recorded yet. Sync at least two months of any fund, or run `python leaderboard.py` to build it from files already on disk.")
+
 else: # Compare Mode View
     # --- HOME BUTTON AT TOP ---
     if st.button("← Back to Home", key="home_btn_compare"):
@@ -330,15 +325,32 @@ else: # Compare Mode View
     st.markdown(f"""
         <div style="margin-bottom: 2rem; padding-top: 1rem;">
             <h1 style="font-size: 2rem; margin-bottom: 0.5rem;">Overlap Tool</h1>
-            <p style="font-size: 1rem; opacity: 0.8;">Analyze diversification and common bets between {fund_a} and {fund_b}.</p>
+            <p style="font-size: 1rem; opacity: 0.8;">Analyze diversification and common bets between {" and ".join(compare_funds) or "the selected funds"}.</p>
         </div>
     """, unsafe_allow_html=True)
 
-    if st.session_state.get('run_compare', False):
-        results = analysis.compare_portfolios(fund_a, fund_b)
-        ui.render_comparison_dashboard(fund_a, fund_b, results)
+    if st.session_state.get('run_compare', False) and len(compare_funds) == 2:
+        results = holdings_engine.overlap(*compare_funds)
+        ui.render_comparison_dashboard(*compare_funds, results)
+    elif st.session_state.get('run_compare', False) and len(compare_funds) > 2:
+        # Word-level AND / OR over cached per-fund bitsets, no pairwise merges
+        ui.render_intersections(bitsets.intersect(compare_funds))
     else:
-        st.info("Select two funds from the sidebar and click 'Analyze Overlap'.")
+        st.info("Select two or more funds from the sidebar and click 'Analyze Overlap'.")
+
+# ===========================
+# SQL QUERY BOX
+# ===========================
+with st.expander("🔎 Query All Holdings (SQL)"):
+    st.caption("Table `holdings`: fund, amc, isin, stock_name, sector, period, month, year, month_key (YYYY-MM), "
+               "qty, prev_qty, market_value, nav_pct, action (entry / exit / add / trim / hold).")
+    example = st.selectbox("Examples", list(query.EXAMPLES.keys()), key="sql_example")
+    sql = st.text_area("SQL", query.EXAMPLES[example].strip(), height=150, key=f"sql_{example}")
+    if st.button("Run Query", key="sql_run"):
+        try:
+            st.dataframe(query.run_query(sql), use_container_width=True)
+        except Exception as e:
+            st.error(f"❌ {e}")
 
 # ===========================
 # FOOTER - SUPPORTED FUNDS
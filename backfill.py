@@ -0,0 +1,114 @@
+# backfill.py
+import argparse
+import datetime
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from config import FUND_CONFIG, BACKFILL_CHECKPOINT_FILE, BACKFILL_WORKERS
+import periods
+import planner
+import sync
+
+# ===========================
+# CHECKPOINT
+# ===========================
+class Checkpoint:
+    """
+    Per-job record of finished downloads ({task id: "found" | "empty"}), saved after every task.
+    Funds' own files are the source of truth for stored months; this adds the months that came back empty.
+    """
+    def __init__(self, job, path=BACKFILL_CHECKPOINT_FILE):
+        self.job = job
+        self.path = path
+        self.jobs = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.jobs = json.load(f)
+        self.state = self.jobs.setdefault(job, {"started": _now(), "done": {}})
+
+    def is_done(self, task):
+        return planner.task_id(task) in self.state["done"]
+
+    def mark(self, task, status):
+        self.state["done"][planner.task_id(task)] = status
+        self.state["updated"] = _now()
+        self.save()
+
+    def forget_empty(self):
+        self.state["done"] = {k: v for k, v in self.state["done"].items() if v != "empty"}
+        self.save()
+
+    def save(self):
+        # Temp file + rename: a crash mid-write never leaves a truncated checkpoint
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.jobs, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+
+def _now():
+    return datetime.datetime.now().isoformat(timespec="seconds")
+
+# ===========================
+# RUN
+# ===========================
+def backfill(fund_names, start, end, job, workers=BACKFILL_WORKERS, retry_missing=False):
+    """
+    Fetches every missing fund-month between start and end ((month, year) pairs), committing
+    each download's funds to disk as soon as it finishes. Rerunning the same job resumes it.
+    """
+    checkpoint = Checkpoint(job)
+    period_list = periods.period_range(start, end)
+    if retry_missing:
+        checkpoint.forget_empty()
+        # This job's funds and months only: other AMCs and ranges keep their cached misses
+        planner.forget_misses(fund_names, period_list)
+
+    plan = [t for t in planner.build_plan(fund_names, period_list) if not checkpoint.is_done(t)]
+    done = len(checkpoint.state["done"])
+    print(f"📦 Backfill '{job}': {len(plan)} downloads to go ({done} already done)")
+    if not plan:
+        return {}
+
+    added = {}
+    # Per-host semaphores in http_client keep each AMC within HTTP_PER_HOST_LIMIT however many workers run
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(planner.fetch_task, task): task for task in plan}
+        for i, future in enumerate(as_completed(futures), 1):
+            task = futures[future]
+            try:
+                fetched = future.result()
+            except Exception as e:
+                # Left out of the checkpoint, so the next run retries it
+                print(f"   ❌ {task['source']} {task['month']} {task['year']}: {e}")
+                continue
+
+            found = False
+            for fund_name, new_df in fetched.items():
+                _, fund_added = sync.commit_results(fund_name, [(task["month"], task["year"], new_df)])
+                if fund_added:
+                    found = True
+                    added.setdefault(fund_name, []).extend(fund_added)
+            checkpoint.mark(task, "found" if found else "empty")
+            print(f"   {'✅' if found else '⚪'} [{i}/{len(plan)}] {task['source']} {task['month']} {task['year']}")
+    return added
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resumable historical backfill for any funds over any date range.")
+    parser.add_argument("--from", dest="start", required=True, help="first month, YYYY-MM")
+    parser.add_argument("--to", dest="end", help="last month, YYYY-MM (default: last completed month)")
+    parser.add_argument("--fund", action="append", help="limit to these funds (repeatable)")
+    parser.add_argument("--amc", action="append", help="limit to these AMC codes, e.g. SBI (repeatable)")
+    parser.add_argument("--workers", type=int, default=BACKFILL_WORKERS)
+    parser.add_argument("--job", help="checkpoint name (default: derived from the selection and range)")
+    parser.add_argument("--retry-missing", action="store_true", help="re-probe months that came back empty")
+    args = parser.parse_args()
+
+    start = periods.parse_month_key(args.start)
+    end = periods.parse_month_key(args.end) if args.end else periods.previous_period()
+    funds = [f for f, c in FUND_CONFIG.items()
+             if (not args.fund or f in args.fund) and (not args.amc or c.get("amc_code") in args.amc)]
+    job = args.job or f"{','.join(args.amc or args.fund or ['all'])}:{args.start}..{args.end or 'latest'}"
+
+    added = backfill(funds, start, end, job, args.workers, args.retry_missing)
+    print(f"🎉 Backfill stored {sum(len(v) for v in added.values())} fund-months across {len(added)} funds.")
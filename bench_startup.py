@@ -0,0 +1,124 @@
+# bench_startup.py
+import argparse
+import csv
+import datetime
+import json
+import os
+import statistics
+import subprocess
+import sys
+from config import STARTUP_BENCH_FILE, STARTUP_BENCH_RUNS
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+APP_FILE = os.path.join(ROOT, "app.py.py")
+
+# Dashboard-path modules first, then the sync side that should stay off it
+MODULES = ["periods", "security_master", "analysis", "flows", "engine", "sector_flows", "leaderboard",
+           "query", "ui", "scheduler", "sync", "scrapers", "planner"]
+# Must not be loaded by the time the first page has rendered
+DEFERRED = ["requests", "bs4", "plotly.express", "scrapers", "sync", "planner"]
+
+# Runs in a fresh interpreter. The scheduler is switched off so its background sync doesn't
+# import the scrapers mid-measurement.
+RENDER_SCRIPT = """
+import json, sys, time
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+t1 = time.perf_counter()
+import config
+config.SCHEDULER_ENABLED = False
+at = AppTest.from_file(sys.argv[1], default_timeout=300)
+at.run()
+t2 = time.perf_counter()
+print(json.dumps({
+    "streamlit_import": (t1 - t0) * 1000, "first_render": (t2 - t1) * 1000,
+    "error": bool(at.exception), "loaded": [m for m in sys.argv[2:] if m in sys.modules]
+}))
+"""
+
+# ===========================
+# MEASUREMENTS
+# ===========================
+def import_time_ms(module):
+    """Cumulative import time of one module in a fresh interpreter, from -X importtime"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed: {proc.stderr.strip().splitlines()[-1]}")
+    for line in reversed(proc.stderr.splitlines()):
+        # "import time: self [us] | cumulative | imported package"
+        parts = line.split("|")
+        if line.startswith("import time:") and len(parts) == 3 and parts[2].strip() == module:
+            return int(parts[1]) / 1000
+    raise RuntimeError(f"no importtime entry for {module}")
+
+def first_render():
+    """Cold run of the app script up to the first rendered page"""
+    proc = subprocess.run([sys.executable, "-c", RENDER_SCRIPT, APP_FILE, *DEFERRED],
+                          cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"app run failed: {proc.stderr.strip()[-500:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+def run_bench(runs=STARTUP_BENCH_RUNS):
+    """Median of `runs` cold measurements per metric (ms), plus the deferred modules that leaked"""
+    samples = {}
+    leaked = set()
+    for _ in range(runs):
+        for module in MODULES:
+            samples.setdefault(f"import:{module}", []).append(import_time_ms(module))
+        render = first_render()
+        if render["error"]:
+            raise RuntimeError("app raised an exception on first render")
+        samples.setdefault("streamlit_import", []).append(render["streamlit_import"])
+        samples.setdefault("first_render", []).append(render["first_render"])
+        leaked.update(render["loaded"])
+    return {metric: statistics.median(values) for metric, values in samples.items()}, sorted(leaked)
+
+# ===========================
+# HISTORY
+# ===========================
+def _commit():
+    proc = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+    return proc.stdout.strip() if proc.returncode == 0 else ""
+
+def load_previous(path=STARTUP_BENCH_FILE):
+    """Metrics from the most recent recorded run"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    if not rows:
+        return {}
+    last = rows[-1]["Timestamp"]
+    return {r["Metric"]: float(r["Ms"]) for r in rows if r["Timestamp"] == last}
+
+def record(results, path=STARTUP_BENCH_FILE):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    new_file = not os.path.exists(path)
+    stamp = datetime.datetime.now().isoformat(timespec="seconds")
+    commit = _commit()
+    with open(path, "a", newline="") as f:
+        writer = csv.writer(f)
+        if new_file:
+            writer.writerow(["Timestamp", "Commit", "Metric", "Ms"])
+        for metric, ms in results.items():
+            writer.writerow([stamp, commit, metric, f"{ms:.1f}"])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold-start benchmark: per-module import time and time to first render.")
+    parser.add_argument("--runs", type=int, default=STARTUP_BENCH_RUNS, help="fresh interpreters per metric (median kept)")
+    parser.add_argument("--no-record", action="store_true", help=f"don't append to {STARTUP_BENCH_FILE}")
+    args = parser.parse_args()
+
+    previous = load_previous()
+    print(f"⏱️ Startup benchmark ({args.runs} cold runs each)")
+    results, leaked = run_bench(args.runs)
+    for metric, ms in results.items():
+        delta = f"{ms - previous[metric]:+8.1f}" if metric in previous else ""
+        print(f"   {metric:<24} {ms:8.1f} ms {delta}")
+    if leaked:
+        print(f"   ⚠️ Loaded before first render, should be deferred: {', '.join(leaked)}")
+    if not args.no_record:
+        record(results)
+        print(f"💾 Recorded in {STARTUP_BENCH_FILE}")
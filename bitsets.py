@@ -0,0 +1,170 @@
+# bitsets.py
+import threading
+import numpy as np
+import pandas as pd
+from config import FUND_CONFIG
+import periods
+import engine
+import security_master
+
+# Popcount per uint64 word: numpy >= 2.0 has it built in, older versions count bytes via a table
+_BYTE_COUNTS = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+def popcount(words):
+    if hasattr(np, "bitwise_count"):
+        return int(np.bitwise_count(words).sum())
+    return int(_BYTE_COUNTS[words.view(np.uint8)].sum())
+
+# ===========================
+# HOLDINGS BITSETS
+# ===========================
+class HoldingsBitsets:
+    """
+    One bitset per fund-period over a global ISIN universe (bit i = universe[i] is held).
+    The universe is append-only, so existing bitsets stay valid as new ISINs appear; shorter
+    ones are zero-padded on use. Funds are re-encoded only when their data version changes.
+    """
+    def __init__(self):
+        self.universe = []
+        self._position = {}
+        self._bits = {}       # (fund, period) -> uint64 words
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def _positions(self, isins):
+        for isin in isins:
+            if isin not in self._position:
+                self._position[isin] = len(self.universe)
+                self.universe.append(isin)
+        return np.fromiter((self._position[i] for i in isins), dtype=np.int64, count=len(isins))
+
+    def _encode(self, isins):
+        pos = self._positions(isins)
+        words = np.zeros((len(self.universe) + 63) // 64, dtype=np.uint64)
+        np.bitwise_or.at(words, pos >> 6, np.left_shift(np.uint64(1), (pos & 63).astype(np.uint64)))
+        return words
+
+    def refresh(self, fund_names=None):
+        eng = engine.get_engine()
+        with self._lock:
+            for fund_name in fund_names or FUND_CONFIG.keys():
+                version = eng.fund_version(fund_name)
+                if fund_name in self._versions and self._versions[fund_name] == version: continue
+                for key in [k for k in self._bits if k[0] == fund_name]:
+                    del self._bits[key]
+                df = eng.frame(fund_name)
+                for month, year in eng.periods(fund_name):
+                    held = df.loc[df[periods.qty_col(month, year)] > 0, "ISIN"].astype(str).unique()
+                    self._bits[(fund_name, (month, year))] = self._encode(held)
+                self._versions[fund_name] = version
+
+    def bitset(self, fund_name, period=None):
+        """The fund's bitset at a period (default: its latest), padded to the current universe"""
+        self.refresh([fund_name])
+        period = period or engine.get_engine().latest_period(fund_name)
+        words = self._bits.get((fund_name, period))
+        if words is None:
+            return None
+        size = (len(self.universe) + 63) // 64
+        return words if len(words) == size else np.concatenate([words, np.zeros(size - len(words), dtype=np.uint64)])
+
+    def isins(self, words):
+        """Universe ISINs whose bits are set"""
+        bits = np.unpackbits(words.view(np.uint8), bitorder="little")
+        return [self.universe[i] for i in np.flatnonzero(bits[:len(self.universe)])]
+
+# ===========================
+# N-FUND INTERSECTIONS
+# ===========================
+def _counts_by_holders(sets):
+    """
+    Bit-sliced counter: after adding every fund's bitset with ripple carry, plane j holds bit j
+    of "how many of the funds hold this ISIN" -> {k: bitset of ISINs held by exactly k funds}
+    """
+    planes = []
+    for words in sets:
+        carry = words
+        for j in range(len(planes)):
+            planes[j], carry = planes[j] ^ carry, planes[j] & carry
+        if carry.any(): planes.append(carry)
+    union = np.bitwise_or.reduce(sets)
+    out = {}
+    for k in range(1, len(sets) + 1):
+        match = union.copy()
+        for j, plane in enumerate(planes):
+            match &= plane if (k >> j) & 1 else ~plane
+        if k >> len(planes): match[:] = 0
+        out[k] = match
+    return out
+
+def _exclusive_groups(sets, union):
+    """
+    UpSet membership groups: ISINs held by exactly this combination of funds and no other.
+    Splits the union by one fund at a time, dropping empty branches, so cost follows the
+    number of non-empty groups rather than 2^N.
+    """
+    groups = [((), union)]
+    for i, words in enumerate(sets):
+        split = []
+        for members, bits in groups:
+            inside, outside = bits & words, bits & ~words
+            if inside.any(): split.append((members + (i,), inside))
+            if outside.any(): split.append((members, outside))
+        groups = split
+    return groups
+
+def intersect(fund_names, period=None, index=None):
+    """
+    Intersection analysis for N funds at a period (default: each fund's latest). Returns
+    {"funds", "union", "all", "held_by_all" (DataFrame), "exactly" (DataFrame), "unique" (DataFrame),
+    "groups" (DataFrame: one membership-mark column per fund + Stocks)} or {"error"}.
+    """
+    index = index or get_bitsets()
+    index.refresh(fund_names)
+    sets = [index.bitset(f, period) for f in fund_names]
+    missing = [f for f, s in zip(fund_names, sets) if s is None]
+    if missing:
+        return {"error": f"No holdings for {', '.join(missing)}" + (f" in {period[0]} {period[1]}" if period else "") + ". Sync first."}
+    # Pad to the same length: the universe may have grown between the calls above
+    size = max(len(s) for s in sets)
+    sets = np.stack([np.concatenate([s, np.zeros(size - len(s), dtype=np.uint64)]) for s in sets])
+
+    union = np.bitwise_or.reduce(sets)
+    held_by_all = np.bitwise_and.reduce(sets)
+    by_holders = _counts_by_holders(sets)
+
+    # Unique to fund i: its bits minus the OR of all others, via prefix / suffix ORs
+    n = len(fund_names)
+    zeros = np.zeros(size, dtype=np.uint64)
+    prefix = [zeros] + list(np.bitwise_or.accumulate(sets[:-1]))
+    suffix = list(np.bitwise_or.accumulate(sets[::-1][:-1]))[::-1] + [zeros]
+    unique = [sets[i] & ~(prefix[i] | suffix[i]) for i in range(n)]
+
+    names = security_master.get_master().name_of
+    all_isins = pd.Series(index.isins(held_by_all), dtype=object)
+    groups = _exclusive_groups(sets, union)
+    group_rows = [{**{f: "●" if i in members else "" for i, f in enumerate(fund_names)},
+                   "Funds": len(members), "Stocks": popcount(bits)} for members, bits in groups]
+    return {
+        "funds": fund_names,
+        "union": popcount(union),
+        "all": popcount(held_by_all),
+        "held_by_all": pd.DataFrame({"Stock Name": names(all_isins), "ISIN": all_isins}).sort_values("Stock Name", ignore_index=True),
+        "exactly": pd.DataFrame([{"Held By": f"{k} of {n}", "Stocks": popcount(by_holders[k])} for k in range(n, 0, -1)]),
+        "unique": pd.DataFrame([{"Fund": f, "Holdings": popcount(sets[i]), "Unique": popcount(unique[i]),
+                                 "Unique Stocks": ", ".join(names(pd.Series(index.isins(unique[i]), dtype=object)).head(5))}
+                                for i, f in enumerate(fund_names)]),
+        "groups": pd.DataFrame(group_rows, columns=list(fund_names) + ["Funds", "Stocks"])
+                    .sort_values(["Stocks", "Funds"], ascending=False, ignore_index=True)
+    }
+
+# --- SHARED INSTANCE ---
+_BITSETS = None
+_BITSETS_LOCK = threading.Lock()
+
+def get_bitsets():
+    global _BITSETS
+    with _BITSETS_LOCK:
+        if _BITSETS is None:
+            _BITSETS = HoldingsBitsets()
+        return _BITSETS
@@ -85,22 +85,39 @@ NIPPON_EQUITY_SCHEMES = {
     "MC": "Nippon India MNC Fund",
     "MG": "Nippon India Nifty India Manufacturing Index"
 }
+# HDFC sheets aren't named after the scheme, so the value is the scheme name
+# searched for in each sheet's title rows (and the per-scheme fallback file name)
+HDFC_EQUITY_SCHEMES = {
+    "NIFTY50": "HDFC Nifty 50 Index Fund",
+    "NEXT50": "HDFC Nifty Next 50 Index Fund",
+    "SENSEX": "HDFC BSE Sensex Index Fund",
+    "FLEXI": "HDFC Flexi Cap Fund",
+    "LARGECAP": "HDFC Large Cap Fund",
+    "MIDCAP": "HDFC Mid Cap Fund",
+    "SMALLCAP": "HDFC Small Cap Fund",
+    "LARGEMID": "HDFC Large and Mid Cap Fund",
+    "MULTICAP": "HDFC Multi Cap Fund",
+    "FOCUSED": "HDFC Focused Fund",
+    "VALUE": "HDFC Value Fund",
+    "ELSS": "HDFC ELSS Tax saver",
+    "BAF": "HDFC Balanced Advantage Fund"
+}
 FUND_CONFIG = {
     "PPFAS Flexi Cap": {
+        "amc_code": "PPFAS",
         "file": "PPFCF_Portfolio_Dashboard_2025.xlsx",
         "url": "https://amc.ppfas.com/downloads/portfolio-disclosure/",
         "sheet": None
     },
     "Nippon India Small Cap": {
-        "file": "Nippon_SC_Portfolio_2025.xlsx",
-        "url": "https://mf.nipponindiaim.com/investor-service/downloads/factsheet-portfolio-and-other-disclosures",
-        "base_url": "https://mf.nipponindiaim.com",
-        "sheet": "SC"
+        "amc_code": "NIPPON",
+        "sheet_code": "SC",  # Served from the shared master workbook like every other Nippon scheme
+        "file": "Nippon_SC_Portfolio_2025.xlsx"
     },
     "HDFC Nifty 50 Index": {
-        "file": "HDFC_Nifty50_Portfolio_2025.xlsx",
-        "base_url": "https://files.hdfcfund.com/s3fs-public",
-        "fund_keyword": "nifty 50 index fund" 
+        "amc_code": "HDFC",
+        "sheet_code": "NIFTY50",  # Key into HDFC_EQUITY_SCHEMES
+        "file": "HDFC_Nifty50_Portfolio_2025.xlsx"
     }
 }
 
@@ -112,13 +129,25 @@ for code, name in SBI_EQUITY_SCHEMES.items():
         "file": f"data/sbi_{code.lower()}.xlsx" # Auto-generates unique filenames
     }
 
-# 3. Auto-generate Nippon Configs
-# for code, name in NIPPON_EQUITY_SCHEMES.items():
-#     FUND_CONFIG[name] = {
-#         "amc_code": "NIPPON",
-#         "sheet_code": code,  # Crucial: This is "SC", "GF", etc.
-#         "file": f"data/nippon_{code.lower()}.xlsx"
-#     }
+# 4. Auto-generate Nippon Configs (skipping schemes already wired by hand above)
+_wired_nippon = {c.get("sheet_code") for c in FUND_CONFIG.values() if c.get("amc_code") == "NIPPON"}
+for code, name in NIPPON_EQUITY_SCHEMES.items():
+    if code in _wired_nippon: continue
+    FUND_CONFIG[name] = {
+        "amc_code": "NIPPON",
+        "sheet_code": code,  # Crucial: This is "SC", "GF", etc.
+        "file": f"data/nippon_{code.lower()}.xlsx"
+    }
+
+# 5. Auto-generate HDFC Configs (skipping schemes already wired by hand above)
+_wired_hdfc = {c.get("sheet_code") for c in FUND_CONFIG.values() if c.get("amc_code") == "HDFC"}
+for code, name in HDFC_EQUITY_SCHEMES.items():
+    if code in _wired_hdfc: continue
+    FUND_CONFIG[name] = {
+        "amc_code": "HDFC",
+        "sheet_code": code,
+        "file": f"data/hdfc_{code.lower()}.xlsx"
+    }
 
 HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"}
 
@@ -143,3 +172,132 @@ MONTH_ABBR = {
     "November": "Nov",
     "December": "Dec"
 }
+
+# --- BACKGROUND PREFETCH ---
+# Days after month-end during which each AMC usually publishes its disclosure.
+# The scheduler only polls inside this window; SEBI requires publication within 10 days.
+PUBLICATION_WINDOWS = {
+    "PPFAS": (3, 12),
+    "NIPPON": (5, 15),
+    "SBI": (5, 15),
+    "HDFC": (5, 15)
+}
+DEFAULT_PUBLICATION_WINDOW = (5, 15)
+
+SCHEDULER_ENABLED = True
+SCHEDULER_POLL_SECONDS = 6 * 60 * 60
+
+# --- HTTP CLIENT ---
+HTTP_PER_HOST_LIMIT = 4       # Concurrent requests (and pooled keep-alive connections) per AMC host
+HTTP_TIMEOUT_SECONDS = 30     # Per attempt
+HTTP_DEADLINE_SECONDS = 120   # Per fetch, across all retries
+HTTP_RETRIES = 3
+HTTP_BACKOFF_SECONDS = 0.5    # Doubles on every retry
+
+# --- DOWNLOADS ---
+DOWNLOAD_MAX_BYTES = 200 * 1024 * 1024    # Abort anything bigger than this
+DOWNLOAD_SPOOL_BYTES = 8 * 1024 * 1024    # Kept in memory below this, spilled to a temp file above
+DOWNLOAD_CHUNK_BYTES = 1024 * 1024
+
+# --- SECURITY MASTER ---
+SECURITY_MASTER_FILE = "data/security_master.csv"     # ISIN -> canonical name
+SECURITY_ALIASES_FILE = "data/security_aliases.csv"   # Raw names seen per AMC
+
+# --- SECTORS ---
+SECTOR_MAP_FILE = "data/sector_map.csv"       # Optional hand-maintained ISIN -> Sector overrides
+SECTOR_FLOWS_FILE = "data/sector_flows.csv"   # Precomputed fund x sector x month aggregate
+UNCLASSIFIED_SECTOR = "Unclassified"
+
+# --- SMART MONEY LEADERBOARD ---
+STOCK_FLOWS_FILE = "data/stock_flows.db"    # Fund x month x stock trades (entry / exit / add / trim), SQLite
+LEADERBOARD_FILE = "data/leaderboard.csv"   # Month x stock totals across funds
+
+# --- DATA QUALITY ---
+QUALITY_REPORT_FILE = "data/quality.csv"   # One reconciliation row per fund-month
+# Equity rows' NavPct total (in percent) outside the scheme type's range is flagged
+QUALITY_NAV_SUM_RANGES = {
+    "equity": (60, 100.5),
+    "hybrid": (10, 100.5),   # Equity share varies with the allocation; only the upper bound is tight
+    "debt": (0, 100.5)       # Few or no equity rows
+}
+# Scheme type from the fund name (first match wins), unless its FUND_CONFIG entry sets "scheme_type"
+SCHEME_TYPE_KEYWORDS = {
+    "hybrid": ["hybrid", "balanced advantage", "multi asset", "equity savings", "arbitrage", "savings plan"],
+    "debt": ["duration", "liquid", "overnight", "gilt", "bond", "credit risk", "savings fund", "income", "debt"]
+}
+QUALITY_NAV_MIN_ROWS = 10                  # Skip the NavPct total for tiny sheets (index funds mid-rebuild, etc.)
+QUALITY_PRICE_RATIO = 3.0                  # Implied price (MarketValue / Qty) move vs last month that counts as an outlier
+QUALITY_PRICE_OUTLIER_SHARE = 0.2          # More outliers than this share of stocks = unit or column error
+
+# --- AMC ENGINES ---
+ENGINE_MAX_PARALLEL = 4   # Periods one AMC engine fetches at once (http_client still caps each host)
+
+# --- SHEET LAYOUTS ---
+LAYOUTS_FILE = "data/layouts.json"               # Known header row + column mapping per AMC layout fingerprint
+LAYOUT_EVENTS_FILE = "data/layout_events.jsonl"  # Drift / unparseable sheet events, one JSON object per line
+
+# --- MASTER WORKBOOKS ---
+MASTER_CACHE_SIZE = 24   # Parsed all-schemes workbooks kept in memory (per AMC-month)
+
+# --- HDFC DISCLOSURES ---
+# Files live in a folder named after the upload month (usually the month after the data)
+HDFC_BASE_URL = "https://files.hdfcfund.com/s3fs-public"
+HDFC_MASTER_FILENAME = "Monthly Portfolio - {day} {month} {year}.xlsx"        # All schemes, one sheet each
+HDFC_SCHEME_FILENAME = "Monthly {scheme} - {day} {month} {year}.xlsx"        # Per-scheme fallback
+HDFC_INDEX_ROWS = 5   # Title rows read per sheet when indexing a workbook
+
+# --- SYNC PLANNER ---
+# Rough download size per source file, used only for dry-run cost estimates
+EST_DOWNLOAD_MB = {
+    "SBI": 12,
+    "NIPPON": 8,
+    "PPFAS": 0.5,
+    "HDFC": 6
+}
+
+# --- BACKFILL ---
+BACKFILL_CHECKPOINT_FILE = "data/backfill_checkpoint.json"
+BACKFILL_WORKERS = 8   # Downloads in flight; each AMC host is still capped at HTTP_PER_HOST_LIMIT
+
+# --- JSON API ---
+API_HOST = "127.0.0.1"
+API_PORT = 8765
+API_CACHE_SIZE = 512          # Rendered responses kept per (URL, data version)
+API_GZIP_MIN_BYTES = 1024     # Smaller bodies aren't worth compressing
+
+# --- SQL QUERY ENGINE ---
+QUERY_DB_FILE = "data/holdings.db"   # Long holdings table rebuilt per fund when its file changes
+
+# --- FUND SIMILARITY ---
+# 40 bands x 3 rows: funds above ~0.5 Jaccard share a bucket >99% of the time, below ~0.1 rarely
+SIMILARITY_NUM_PERM = 120
+SIMILARITY_BANDS = 40
+SIMILARITY_SEED = 7                            # Fixed so signatures are stable across processes
+SIMILARITY_CLOSET_JACCARD = 0.5                # Active fund this close to an index fund's holdings = likely closet indexer
+INDEX_FUND_KEYWORDS = ("Index", "ETF", "BeES")  # Name markers of passive schemes
+
+# --- MULTI-FUND COMPARE ---
+COMPARE_MAX_FUNDS = 12   # Funds selectable at once in Compare mode
+
+# --- EXPORTS ---
+EXPORT_DIR = "data/exports"   # Built on request, one file per export and data version
+
+# --- STARTUP BENCHMARK ---
+STARTUP_BENCH_FILE = "data/startup_bench.csv"   # One row per bench_startup.py run, for spotting cold-start regressions
+STARTUP_BENCH_RUNS = 3                          # Fresh interpreters per measurement; the median is kept
+
+# --- SYNC DEADLINE ---
+# Upper bound on a sync started from the UI. Months still downloading then are cancelled, the
+# finished ones are saved, and the rest are queued in PENDING_FILE for the next sync or the scheduler.
+SYNC_DEADLINE_SECONDS = 45
+PENDING_FILE = "data/pending.json"
+PENDING_RETRY_SECONDS = 5 * 60     # Scheduler poll interval while anything is pending
+
+# --- NEGATIVE CACHE ---
+# How long a "not published" answer is trusted, by how old the period is.
+# (max age in days since month-end, TTL in hours); older gaps are treated as permanent.
+NEGATIVE_CACHE_FILE = "data/negative_cache.json"
+NEGATIVE_CACHE_TTLS = [
+    (45, 6),          # Current publication cycle: re-probe a few times a day
+    (120, 72)         # Recent months: AMCs occasionally publish late
+]
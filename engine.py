@@ -0,0 +1,218 @@
+# engine.py
+import hashlib
+import os
+import threading
+import pandas as pd
+from config import FUND_CONFIG
+import periods
+import analysis
+import flows
+
+# ===========================
+# COMPACT FRAMES
+# ===========================
+# Resident dtypes per period column family; text columns (ISIN, Stock Name, Industry) become
+# categoricals whose categories the engine shares across funds, so each distinct string is held
+# once per process and each fund only keeps small integer codes. The wide layout is unchanged.
+COMPACT_DTYPES = {"Qty": "int64", "NavPct": "float32"}
+
+def compact_frame(df):
+    """Cleaned wide frame -> the same frame with compact dtypes (in place)"""
+    for col in df.columns:
+        if periods.parse_period_col(col) is None:
+            if df[col].dtype == object or pd.api.types.is_string_dtype(df[col]):
+                df[col] = df[col].astype("category")
+            continue
+        dtype = COMPACT_DTYPES.get(str(col).split("_")[0])
+        if dtype is None: continue
+        values = pd.to_numeric(df[col], errors="coerce")
+        # Quantities are whole units; NaN (not held) is already 0 after clean_fund_frame
+        df[col] = values.fillna(0).round().astype(dtype) if dtype == "int64" else values.astype(dtype)
+    return df
+
+def resident_bytes(df):
+    """Frame bytes with categoricals counted by their codes (the categories are shared tables)"""
+    return int(sum(df[c].cat.codes.nbytes if isinstance(df[c].dtype, pd.CategoricalDtype)
+                   else df[c].memory_usage(index=False, deep=True) for c in df.columns))
+
+# ===========================
+# HOLDINGS ENGINE
+# ===========================
+class HoldingsEngine:
+    """
+    Cleaned holdings for every fund, loaded once per process and shared read-only by all sessions.
+    Each fund carries a data version (file mtime + size); a fund is re-read only when its version changes.
+    Frames handed out are shared: callers filter or copy, never modify in place. They are held
+    compact (see compact_frame), so every configured fund fits in memory at once.
+    """
+    def __init__(self):
+        self._funds = {}
+        self._flows = {}
+        self._categories = {}   # Text column -> CategoricalDtype shared by every loaded fund (append-only)
+        self._lock = threading.Lock()
+
+    # --- VERSIONING ---
+    def fund_version(self, fund_name):
+        """(mtime_ns, size) of the fund's file, None if it hasn't been synced"""
+        try:
+            stat = os.stat(FUND_CONFIG[fund_name]["file"])
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def version(self, fund_names=None):
+        """Data version across funds: changes whenever any of their files does (used for cache keys / ETags)"""
+        versions = [(f, self.fund_version(f)) for f in fund_names or FUND_CONFIG.keys()]
+        return hashlib.md5(repr(versions).encode()).hexdigest()[:16]
+
+    def refresh(self, fund_names=None):
+        """Reloads funds whose file changed since last load, returns the ones reloaded"""
+        changed = []
+        for fund_name in fund_names or FUND_CONFIG.keys():
+            current = self.fund_version(fund_name)
+            loaded = self._funds.get(fund_name)
+            if loaded is not None and loaded[0] == current:
+                continue
+            with self._lock:
+                # Another session may have reloaded it while we waited
+                loaded = self._funds.get(fund_name)
+                if loaded is not None and loaded[0] == current:
+                    continue
+                if current is None:
+                    self._funds.pop(fund_name, None)
+                    continue
+                df = pd.read_excel(FUND_CONFIG[fund_name]["file"])
+                as_read = df.memory_usage(index=False, deep=True).sum()
+                df = self._compact(analysis.clean_fund_frame(df, fund_name))
+                self._funds[fund_name] = (current, df, as_read)
+                changed.append(fund_name)
+        return changed
+
+    def _compact(self, df):
+        """compact_frame, with text columns coded against the shared categories (called under the lock)"""
+        df = compact_frame(df)
+        for col in [c for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)]:
+            shared = self._categories.get(col)
+            new = df[col].cat.categories if shared is None else df[col].cat.categories.difference(shared.categories)
+            if shared is None or len(new):
+                shared = self._categories[col] = pd.CategoricalDtype(new if shared is None else shared.categories.append(new))
+                # Appending keeps every existing code valid: point loaded funds at the grown table
+                for _, other, _ in self._funds.values():
+                    if col in other.columns:
+                        other[col] = pd.Categorical.from_codes(other[col].cat.codes, dtype=shared)
+            df[col] = df[col].astype(shared)
+        return df
+
+    def frame(self, fund_name):
+        """The fund's cleaned wide frame (shared, do not modify), or None if not synced"""
+        self.refresh([fund_name])
+        loaded = self._funds.get(fund_name)
+        return loaded[1] if loaded else None
+
+    # --- QUERIES ---
+    def periods(self, fund_name):
+        """Stored (month, year) pairs, oldest first"""
+        df = self.frame(fund_name)
+        if df is None:
+            return []
+        return [periods.parse_period_col(c) for c in periods.sort_period_cols([c for c in df.columns if str(c).startswith("Qty_")])]
+
+    def latest_period(self, fund_name):
+        stored = self.periods(fund_name)
+        return stored[-1] if stored else None
+
+    def holdings(self, fund_name, month, year):
+        """Positions held at one period: Stock Name, ISIN, Qty (+ MarketValue / NavPct when disclosed)"""
+        df = self.frame(fund_name)
+        col = periods.qty_col(month, year)
+        if df is None or col not in df.columns:
+            return None
+        cols = {col: "Qty", f"MarketValue_{month}_{year}": "MarketValue", f"NavPct_{month}_{year}": "NavPct"}
+        cols = {k: v for k, v in cols.items() if k in df.columns}
+        out = df.loc[df[col] > 0, ["Stock Name", "ISIN"] + list(cols)].rename(columns=cols)
+        return out.sort_values("Qty", ascending=False).reset_index(drop=True)
+
+    def memory_report(self, fund_names=None):
+        """
+        KB per loaded fund: the frame as read from Excel vs compact as resident, and its cached flow
+        matrix. The shared text tables are counted once, in report.attrs["shared_kb"].
+        """
+        self.refresh(fund_names)
+        rows = []
+        for fund_name in fund_names or FUND_CONFIG.keys():
+            loaded = self._funds.get(fund_name)
+            if loaded is None: continue
+            _, df, as_read = loaded
+            matrix = self._flows.get(fund_name, (None, None))[1]
+            rows.append({
+                "Fund": fund_name,
+                "Securities": len(df),
+                "Periods": len(self.periods(fund_name)),
+                "As-read KB": as_read / 1024,
+                "Compact KB": resident_bytes(df) / 1024,
+                "Flows KB": sum(a.nbytes for a in vars(matrix).values() if hasattr(a, "nbytes")) / 1024 if matrix is not None else 0
+            })
+        report = pd.DataFrame(rows, columns=["Fund", "Securities", "Periods", "As-read KB", "Compact KB", "Flows KB"])
+        report.attrs["shared_kb"] = sum(d.categories.memory_usage(deep=True) for d in self._categories.values()) / 1024
+        return report
+
+    def flow_matrix(self, fund_name):
+        """Every period's entries/exits/adds/trims for the fund, computed once per data version"""
+        df = self.frame(fund_name)
+        if df is None:
+            return None
+        version = self.fund_version(fund_name)
+        cached = self._flows.get(fund_name)
+        if cached is None or cached[0] != version:
+            cached = (version, flows.compute(df))
+            self._flows[fund_name] = cached
+        return cached[1]
+
+    def flows(self, fund_name, month, year):
+        """Entries and exits at a period vs the previous stored one -> (entries_df, exits_df, previous period)"""
+        matrix = self.flow_matrix(fund_name)
+        if matrix is None or matrix.previous(month, year) is None:
+            return flows.FlowMatrix.empty_frame(), flows.FlowMatrix.empty_frame(), None
+        return matrix.entries(month, year), matrix.exits(month, year), matrix.previous(month, year)
+
+    def overlap(self, fund_a_name, fund_b_name):
+        """Latest-period overlap between two funds, same result shape as analysis.compare_portfolios"""
+        return analysis.compare_frames(self.frame(fund_a_name), self.frame(fund_b_name), fund_a_name, fund_b_name)
+
+    def trajectory(self, fund_name, isin):
+        """One security's quantity in a fund across every stored period (0 when not held)"""
+        df = self.frame(fund_name)
+        if df is None:
+            return pd.DataFrame(columns=["Month", "Year", "Qty"])
+        rows = df[df["ISIN"] == str(isin).strip().upper()]
+        return pd.DataFrame([
+            {"Month": m, "Year": y, "Qty": float(rows[periods.qty_col(m, y)].sum())}
+            for m, y in self.periods(fund_name)
+        ], columns=["Month", "Year", "Qty"])
+
+    def trajectories(self, isin, fund_names=None):
+        """trajectory() for every fund that has ever held the security, stacked with a Fund column"""
+        out = []
+        for fund_name in fund_names or FUND_CONFIG.keys():
+            traj = self.trajectory(fund_name, isin)
+            if (traj["Qty"] > 0).any():
+                out.append(traj.assign(Fund=fund_name))
+        return pd.concat(out, ignore_index=True) if out else pd.DataFrame(columns=["Month", "Year", "Qty", "Fund"])
+
+# --- SHARED INSTANCE ---
+_ENGINE = None
+_ENGINE_LOCK = threading.Lock()
+
+def get_engine():
+    global _ENGINE
+    with _ENGINE_LOCK:
+        if _ENGINE is None:
+            _ENGINE = HoldingsEngine()
+        return _ENGINE
+
+if __name__ == "__main__":
+    report = get_engine().memory_report()
+    print(report.to_string(index=False))
+    resident = report["Compact KB"].sum() + report.attrs["shared_kb"] + report["Flows KB"].sum()
+    print(f"\nShared text tables: {report.attrs['shared_kb']:.1f} KB")
+    print(f"Resident: {resident:.1f} KB for {len(report)} funds (as read: {report['As-read KB'].sum():.1f} KB)")
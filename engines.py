@@ -0,0 +1,140 @@
+# engines.py
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+from config import FUND_CONFIG, ENGINE_MAX_PARALLEL, HDFC_MASTER_FILENAME, HDFC_EQUITY_SCHEMES
+import http_client
+import scrapers
+
+# ===========================
+# ENGINE INTERFACE
+# ===========================
+class AmcEngine:
+    """
+    One AMC's disclosure source and its capabilities. Sync and the planner only talk to this
+    interface; a new AMC registers an engine and gets batching and parallel fetches with it.
+
+    Schemes are the keys fetch() works with: sheet codes for master-file engines, fund names otherwise.
+    """
+    def __init__(self, code, fetch, resolve, master_file=False, max_parallel=ENGINE_MAX_PARALLEL, fallback_sources=None):
+        self.code = code
+        self._fetch = fetch          # (month, year, schemes) -> {scheme: df or None}
+        self._resolve = resolve      # (month, year) -> candidate URLs, most likely first
+        self.master_file = master_file
+        self.max_parallel = max_parallel
+        self._fallback_sources = fallback_sources   # fund -> other files tried when the main one is missing
+
+    def scheme_of(self, fund_name):
+        return FUND_CONFIG[fund_name]["sheet_code"] if self.master_file else fund_name
+
+    def source(self, fund_name):
+        """Name of the physical file a fund-month comes from (shared by every scheme of a master file)"""
+        return f"{self.code} master" if self.master_file else fund_name
+
+    def miss_sources(self, fund_name):
+        """Every negative-cache source a fund-month's misses can be recorded under"""
+        return [self.source(fund_name)] + (self._fallback_sources(fund_name) if self._fallback_sources else [])
+
+    def resolve(self, month, year):
+        return self._resolve(month, year)
+
+    def fetch(self, month, year, schemes):
+        """One period -> {scheme: df or None}"""
+        return self._fetch(month, year, list(schemes))
+
+    def fetch_many(self, period_list, schemes, on_period=None):
+        """
+        Several periods at once, up to max_parallel in flight -> {(month, year): {scheme: df or None}}.
+        on_period(month, year, parsed) is called on the caller's thread as each period finishes.
+        Under an http_client budget, waiting stops at its deadline: the stragglers are cancelled
+        and left out of the result, so callers can tell "not published" from "not finished".
+        """
+        out = {}
+        if not period_list:
+            return out
+        sync_budget = http_client.current_budget()
+        pool = ThreadPoolExecutor(max_workers=min(self.max_parallel, len(period_list)))
+        # Each worker runs in a copy of this context, so its requests see the budget
+        futures = {pool.submit(contextvars.copy_context().run, self.fetch, m, y, schemes): (m, y) for m, y in period_list}
+        try:
+            for future in as_completed(futures, timeout=sync_budget.remaining() if sync_budget else None):
+                month, year = futures[future]
+                try:
+                    out[(month, year)] = future.result()
+                except http_client.Cancelled:
+                    continue
+                except Exception as e:
+                    print(f"   ❌ {self.code} {month} {year}: {e}")
+                    out[(month, year)] = {s: None for s in schemes}
+                if on_period: on_period(month, year, out[(month, year)])
+        except FuturesTimeout:
+            sync_budget.cancel()
+            print(f"   ⏳ {self.code}: deadline reached with {len(period_list) - len(out)} period(s) unfinished")
+        finally:
+            # Without a budget this waits as before; with one, running fetches wind down on their own
+            pool.shutdown(wait=sync_budget is None, cancel_futures=True)
+        return out
+
+# ===========================
+# REGISTRY
+# ===========================
+ENGINES = {}
+
+def register(engine):
+    ENGINES[engine.code] = engine
+    return engine
+
+def engine_for(fund_name):
+    code = FUND_CONFIG[fund_name].get("amc_code")
+    if code not in ENGINES:
+        raise KeyError(f"no engine registered for {fund_name} (amc_code {code})")
+    return ENGINES[code]
+
+# --- BUILT-IN ENGINES ---
+def _fetch_ppfas(month, year, schemes):
+    return {s: scrapers.fetch_ppfas(month, year) for s in schemes}
+
+def _ppfas_urls(month, year):
+    # The disclosures page; the month's file is linked from it
+    return [FUND_CONFIG["PPFAS Flexi Cap"]["url"]]
+
+def _sbi_urls(month, year):
+    return [scrapers.sbi_master_url(month, year)]
+
+def _hdfc_urls(month, year):
+    return scrapers.hdfc_file_urls(scrapers.hdfc_filename(HDFC_MASTER_FILENAME, month, year), month, year)
+
+register(AmcEngine("PPFAS", _fetch_ppfas, _ppfas_urls))
+register(AmcEngine("SBI", scrapers.fetch_sbi_master, _sbi_urls, master_file=True))
+register(AmcEngine("NIPPON", scrapers.fetch_nippon_master, scrapers.nippon_master_candidates, master_file=True))
+def _hdfc_scheme_file(fund_name):
+    # Per-scheme files, fetched when the all-schemes workbook lacks the scheme
+    return [HDFC_EQUITY_SCHEMES[FUND_CONFIG[fund_name]["sheet_code"]]]
+
+register(AmcEngine("HDFC", scrapers.fetch_hdfc_master, _hdfc_urls, master_file=True, fallback_sources=_hdfc_scheme_file))
+
+# ===========================
+# BATCHES ACROSS ENGINES
+# ===========================
+def fetch_batches(batches, on_period=None):
+    """
+    batches: [(engine, period_list, schemes)]. Each engine runs its batch through fetch_many,
+    engines side by side -> {(engine code, month, year): {scheme: df or None}}.
+    on_period(engine, month, year, parsed) is called from the engine's thread, serialized.
+    """
+    out = {}
+    lock = threading.Lock()
+
+    def run(engine, period_list, schemes):
+        def done(month, year, parsed):
+            with lock:
+                out.setdefault((engine.code, month, year), {}).update(parsed)
+                if on_period: on_period(engine, month, year, parsed)
+        engine.fetch_many(period_list, schemes, done)
+
+    if not batches:
+        return out
+    with ThreadPoolExecutor(max_workers=len(batches)) as pool:
+        for future in [pool.submit(contextvars.copy_context().run, run, *batch) for batch in batches]:
+            future.result()
+    return out
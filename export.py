@@ -0,0 +1,173 @@
+# export.py
+import argparse
+import glob
+import hashlib
+import importlib.util
+import os
+import re
+import shutil
+import pandas as pd
+from config import FUND_CONFIG, EXPORT_DIR
+import periods
+import engine
+import storage
+
+# Excel mirrors the stored fund files (one wide sheet per fund); CSV and Parquet are the long
+# holdings table from query.py (one row per fund x security x month, with the month's action).
+FORMATS = {"xlsx": "Excel", "csv": "CSV", "parquet": "Parquet"}
+MIME_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet"
+}
+
+def parquet_available():
+    """Parquet needs pyarrow or fastparquet, neither of which the dashboard requires"""
+    return any(importlib.util.find_spec(m) is not None for m in ("pyarrow", "fastparquet"))
+
+def available_formats():
+    return [f for f in FORMATS if f != "parquet" or parquet_available()]
+
+# ===========================
+# FRAMES
+# ===========================
+def in_range(period, period_range):
+    if period_range is None:
+        return True
+    start, end = period_range
+    return periods.period_key(*start) <= periods.period_key(*period) <= periods.period_key(*end)
+
+def wide_frame(fund_name, period_range=None):
+    """The fund's wide frame cut to the range: identity columns plus its months, rows held in any of them"""
+    df = engine.get_engine().frame(fund_name)
+    if df is None:
+        return None
+    period_cols = [c for c in df.columns if periods.parse_period_col(c)]
+    keep = [c for c in period_cols if in_range(periods.parse_period_col(c), period_range)]
+    out = df[[c for c in df.columns if c not in period_cols] + keep]
+    qty = [c for c in keep if str(c).startswith("Qty_")]
+    return out[(out[qty] > 0).any(axis=1)] if qty else out.iloc[:0]
+
+def long_frame(fund_names, period_range=None):
+    """Long holdings rows for every fund, months inside the range only"""
+    # Deferred: only CSV / Parquet exports need the flow matrices
+    import query
+    eng = engine.get_engine()
+    parts = []
+    for fund_name in fund_names:
+        df = eng.frame(fund_name)
+        if df is None: continue
+        # Built over every stored month, so prev_qty / action stay right at the start of the range
+        rows = query.long_rows(fund_name, df, eng.flow_matrix(fund_name))
+        if rows.empty: continue
+        if period_range is not None:
+            start, end = (periods.period_key(*p) for p in period_range)
+            rows = rows[(rows["period"] >= start) & (rows["period"] <= end)]
+        parts.append(rows)
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+
+# ===========================
+# WRITERS
+# ===========================
+def sheet_name(fund_name, used):
+    name = re.sub(r"[\[\]:*?/\\]", " ", fund_name)[:31]
+    base, i = name, 2
+    while name in used:
+        suffix = f" ({i})"
+        name, i = base[:31 - len(suffix)] + suffix, i + 1
+    used.add(name)
+    return name
+
+def write_xlsx(frames, path):
+    """
+    {sheet: frame} -> workbook, streamed row by row in xlsxwriter's constant_memory mode:
+    only the current row is held, whatever the size of the export.
+    """
+    import xlsxwriter
+    workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+    try:
+        for name, df in frames.items():
+            sheet = workbook.add_worksheet(name)
+            sheet.write_row(0, 0, [str(c) for c in df.columns])
+            # Blank cells for NaN: xlsxwriter rejects NaN as a number
+            values = df.astype(object).where(df.notna(), None)
+            for i, row in enumerate(values.itertuples(index=False, name=None), start=1):
+                sheet.write_row(i, 0, row)
+    finally:
+        workbook.close()
+
+def write_export(fund_names, fmt, period_range, path):
+    if fmt == "xlsx":
+        used, frames = set(), {}
+        for fund_name in fund_names:
+            df = wide_frame(fund_name, period_range)
+            if df is not None: frames[sheet_name(fund_name, used)] = df
+        if not frames:
+            frames = {"Holdings": pd.DataFrame(columns=["ISIN", "Stock Name"])}
+        write_xlsx(frames, path)
+    elif fmt == "csv":
+        long_frame(fund_names, period_range).to_csv(path, index=False)
+    elif fmt == "parquet":
+        long_frame(fund_names, period_range).to_parquet(path, index=False)
+    else:
+        raise ValueError(f"unknown export format {fmt!r} (choose from {', '.join(FORMATS)})")
+
+# ===========================
+# CACHE
+# ===========================
+def _stem(fund_names, period_range):
+    key = repr((list(fund_names), period_range))
+    return hashlib.md5(key.encode()).hexdigest()[:12]
+
+def build(fund_names, fmt="xlsx", period_range=None):
+    """
+    Path of the export, built on first request and reused until any of the funds' files change.
+    Earlier versions of the same export are removed when a new one is written.
+    """
+    stem = _stem(fund_names, period_range)
+    path = os.path.join(EXPORT_DIR, f"{stem}-{engine.get_engine().version(fund_names)}.{fmt}")
+    if os.path.exists(path):
+        return path
+    # One lock per export (not per version), so lock files don't pile up
+    with storage.file_lock(os.path.join(EXPORT_DIR, stem)):
+        # Another session may have built it while we waited
+        if not os.path.exists(path):
+            with storage.atomic_path(path) as tmp:
+                write_export(fund_names, fmt, period_range, tmp)
+            print(f"   📤 Export built: {file_name(fund_names, fmt, period_range)} ({os.path.getsize(path) / 1024:.0f} KB)")
+    for old in glob.glob(os.path.join(EXPORT_DIR, f"{stem}-*.{fmt}")):
+        if old != path:
+            os.remove(old)
+    return path
+
+def read(fund_names, fmt="xlsx", period_range=None):
+    """Export bytes, for st.download_button(data=lambda: ...) so nothing is built until the click"""
+    with open(build(fund_names, fmt, period_range), "rb") as f:
+        return f.read()
+
+def file_name(fund_names, fmt="xlsx", period_range=None):
+    base = fund_names[0] if len(fund_names) == 1 else f"{len(fund_names)}_funds"
+    base = re.sub(r"[^A-Za-z0-9]+", "_", base).strip("_")
+    if period_range is not None:
+        base += "_" + "_to_".join(periods.month_key(*p) for p in period_range)
+    return f"{base}.{fmt}"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export fund holdings as Excel, CSV or Parquet.")
+    parser.add_argument("--fund", action="append", help="funds to export (repeatable); default: all")
+    parser.add_argument("--format", choices=list(FORMATS), default="xlsx")
+    parser.add_argument("--from", dest="start", help="first month, YYYY-MM")
+    parser.add_argument("--to", dest="end", help="last month, YYYY-MM")
+    parser.add_argument("-o", "--output", help="copy the export here (default: its name in the current directory)")
+    args = parser.parse_args()
+
+    funds = args.fund or list(FUND_CONFIG)
+    period_range = None
+    if args.start or args.end:
+        stored = [p for f in funds for p in engine.get_engine().periods(f)] or periods.tracked_periods()
+        first, last = min(stored, key=lambda p: periods.period_key(*p)), max(stored, key=lambda p: periods.period_key(*p))
+        period_range = (periods.parse_month_key(args.start) if args.start else first,
+                        periods.parse_month_key(args.end) if args.end else last)
+    output = args.output or file_name(funds, args.format, period_range)
+    shutil.copyfile(build(funds, args.format, period_range), output)
+    print(f"✅ {output}")
@@ -0,0 +1,130 @@
+# flows.py
+import numpy as np
+import pandas as pd
+import periods
+
+# Action codes per ISIN x period cell; NONE = not held either month, or the fund's first stored month
+NONE, ENTRY, EXIT, ADD, TRIM, HOLD = -1, 0, 1, 2, 3, 4
+ACTIONS = {ENTRY: "entry", EXIT: "exit", ADD: "add", TRIM: "trim", HOLD: "hold"}
+FLOW_COLUMNS = ["Stock Name", "ISIN", "Action", "Qty", "PrevQty", "Change", "ValueChange"]
+COUNT_COLUMNS = {ENTRY: "Entries", EXIT: "Exits", ADD: "Adds", TRIM: "Trims", HOLD: "Holds"}
+
+# ===========================
+# FLOW MATRIX
+# ===========================
+class FlowMatrix:
+    """
+    Every period's flows for one fund, from a single diff of the ISIN x period quantity matrix.
+    Each period is compared with the previous *stored* period, so January diffs against the
+    prior December and a missing month is bridged. Per-period views are then lookups.
+    """
+    def __init__(self, isins, names, stored, qty, prev, value_change):
+        self.isins = isins
+        self.names = names
+        self.periods = stored
+        self.qty = qty
+        self.prev = prev
+        self.change = qty - prev
+        self.value_change = value_change
+        self.action = classify(qty, prev)
+        self._index = {p: i for i, p in enumerate(stored)}
+
+    @staticmethod
+    def empty_frame():
+        return pd.DataFrame(columns=FLOW_COLUMNS)
+
+    def previous(self, month, year):
+        """The stored period a given period is compared with, None for the first one"""
+        i = self._index.get((month, year))
+        return self.periods[i - 1] if i else None
+
+    def at(self, month, year, actions=None):
+        """Cells with a flow at one period: Stock Name, ISIN, Action, Qty, PrevQty, Change, ValueChange"""
+        j = self._index.get((month, year))
+        if j is None:
+            return self.empty_frame()
+        codes = self.action[:, j]
+        mask = codes != NONE if actions is None else np.isin(codes, actions)
+        out = pd.DataFrame({
+            "Stock Name": self.names[mask], "ISIN": self.isins[mask],
+            "Action": [ACTIONS[c] for c in codes[mask]],
+            "Qty": self.qty[mask, j], "PrevQty": self.prev[mask, j],
+            "Change": self.change[mask, j], "ValueChange": self.value_change[mask, j]
+        })
+        return out.sort_values("Change", key=np.abs, ascending=False).reset_index(drop=True)
+
+    def entries(self, month, year):
+        return self.at(month, year, [ENTRY])
+
+    def exits(self, month, year):
+        """Exited positions; Qty is what was held before the exit"""
+        out = self.at(month, year, [EXIT])
+        out["Qty"] = out["PrevQty"]
+        return out
+
+    def summary(self):
+        """Per period: count of each action plus gross quantity / value bought and sold"""
+        bought = np.where(self.change > 0, self.change, 0)
+        sold = np.where(self.change < 0, -self.change, 0)
+        value = np.nan_to_num(self.value_change)
+        out = pd.DataFrame({
+            "Period": [f"{m} {y}" for m, y in self.periods],
+            **{label: (self.action == code).sum(axis=0) for code, label in COUNT_COLUMNS.items()},
+            "QtyBought": bought.sum(axis=0), "QtySold": sold.sum(axis=0),
+            "ValueBought": np.where(value > 0, value, 0).sum(axis=0), "ValueSold": np.where(value < 0, -value, 0).sum(axis=0)
+        })
+        # The first stored month has nothing to compare with
+        return out.iloc[1:].reset_index(drop=True)
+
+    def cumulative(self):
+        """Per security across all periods: months held, entries, exits, adds, trims and net quantity change"""
+        held = self.qty > 0
+        first = np.argmax(held, axis=1)
+        out = pd.DataFrame({
+            "Stock Name": self.names, "ISIN": self.isins,
+            "MonthsHeld": held.sum(axis=1),
+            "Entries": (self.action == ENTRY).sum(axis=1), "Exits": (self.action == EXIT).sum(axis=1),
+            "Adds": (self.action == ADD).sum(axis=1), "Trims": (self.action == TRIM).sum(axis=1),
+            "NetChange": self.qty[:, -1] - self.qty[np.arange(len(first)), first] if self.qty.size else 0,
+            "Held": held[:, -1] if self.qty.size else False
+        })
+        return out.sort_values(["Entries", "MonthsHeld"], ascending=False).reset_index(drop=True)
+
+def classify(qty, prev):
+    """Action code per cell; prev is NaN where there is no earlier period"""
+    return np.select(
+        [np.isnan(prev), (prev == 0) & (qty > 0), (prev > 0) & (qty == 0), (prev > 0) & (qty > prev),
+         (qty > 0) & (qty < prev), (qty > 0) & (qty == prev)],
+        [NONE, ENTRY, EXIT, ADD, TRIM, HOLD], NONE
+    ).astype(np.int8)
+
+# ===========================
+# BUILD
+# ===========================
+def value_matrix(df, prefix, stored):
+    """ISIN x period matrix of one column family (MarketValue / NavPct), NaN where not disclosed"""
+    cols = [f"{prefix}_{m}_{y}" for m, y in stored]
+    return np.column_stack([pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=float) if c in df.columns
+                            else np.full(len(df), np.nan) for c in cols]) if cols else np.empty((len(df), 0))
+
+def compute(df):
+    """FlowMatrix for a wide fund frame (as cleaned by analysis.clean_fund_frame, or as merged at sync time)"""
+    qty_cols = periods.sort_period_cols([c for c in df.columns if str(c).startswith("Qty_")])
+    stored = [periods.parse_period_col(c) for c in qty_cols]
+    # Fund files as merged on disk leave NaN where a security wasn't held
+    qty = df[qty_cols].apply(pd.to_numeric, errors="coerce").fillna(0).to_numpy(dtype=float) if qty_cols else np.empty((len(df), 0))
+    prev = np.hstack([np.full((len(df), 1), np.nan), qty[:, :-1]]) if qty_cols else qty.copy()
+
+    # Value of the change at this month's price (last month's for exits), NaN without market values
+    mv = value_matrix(df, "MarketValue", stored)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        price = np.where(qty > 0, mv / qty, np.nan)
+    if qty_cols:
+        prev_price = np.hstack([np.full((len(df), 1), np.nan), price[:, :-1]])
+        price = np.where(np.isnan(price), prev_price, price)
+    value_change = (qty - prev) * price
+
+    return FlowMatrix(
+        df["ISIN"].to_numpy(dtype=object), df["Stock Name"].to_numpy(dtype=object),
+        stored, qty, prev, value_change
+    )
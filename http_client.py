@@ -0,0 +1,244 @@
+# http_client.py
+import asyncio
+import contextlib
+import contextvars
+import random
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from config import (HEADERS, HTTP_PER_HOST_LIMIT, HTTP_TIMEOUT_SECONDS, HTTP_DEADLINE_SECONDS,
+                    HTTP_RETRIES, HTTP_BACKOFF_SECONDS, DOWNLOAD_MAX_BYTES, DOWNLOAD_SPOOL_BYTES,
+                    DOWNLOAD_CHUNK_BYTES)
+
+class DeadlineExceeded(requests.Timeout):
+    """Raised when a fetch runs out of its overall time budget (retries included)"""
+
+class DownloadTooLarge(IOError):
+    """Raised when a download exceeds DOWNLOAD_MAX_BYTES"""
+
+class Cancelled(requests.RequestException):
+    """Raised when the sync a fetch belongs to has given up on it (deadline reached or cancelled)"""
+
+# ===========================
+# SYNC BUDGET
+# ===========================
+class SyncBudget:
+    """
+    Overall deadline and cancel flag shared by every fetch of one sync. Requests made under it
+    (see budget()) never outlive it: per-attempt timeouts are capped at what is left, and backoff
+    sleeps, retries and download chunks stop with Cancelled once it runs out or cancel() is called.
+    """
+    def __init__(self, seconds):
+        self.deadline_at = time.monotonic() + seconds
+        self._cancelled = threading.Event()
+
+    def remaining(self):
+        return max(self.deadline_at - time.monotonic(), 0)
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def done(self):
+        return self._cancelled.is_set() or self.remaining() <= 0
+
+    def check(self, url=""):
+        if self.done():
+            raise Cancelled(f"Sync deadline reached, abandoned {url}".strip())
+
+    def sleep(self, seconds):
+        """Backoff sleep that wakes up early on cancel()"""
+        self._cancelled.wait(min(seconds, self.remaining()))
+
+# Context, not thread-local: worker threads started through contextvars.copy_context() inherit it
+_BUDGET = contextvars.ContextVar("sync_budget", default=None)
+
+@contextlib.contextmanager
+def budget(seconds_or_budget):
+    """Runs the block's fetches under a SyncBudget (or seconds for a new one), yields it"""
+    b = seconds_or_budget if isinstance(seconds_or_budget, SyncBudget) else SyncBudget(seconds_or_budget)
+    token = _BUDGET.set(b)
+    try:
+        yield b
+    finally:
+        _BUDGET.reset(token)
+
+def current_budget():
+    return _BUDGET.get()
+
+# ===========================
+# POOLED CLIENT
+# ===========================
+class HttpClient:
+    """
+    One keep-alive session shared by every scraper.
+    Requests to the same host reuse pooled connections and are capped at `per_host_limit` in flight.
+    5xx responses, timeouts and connection errors are retried with exponential backoff
+    until `retries` is exhausted or the per-fetch `deadline` runs out.
+    """
+    def __init__(self, per_host_limit=HTTP_PER_HOST_LIMIT, timeout=HTTP_TIMEOUT_SECONDS,
+                 deadline=HTTP_DEADLINE_SECONDS, retries=HTTP_RETRIES, backoff=HTTP_BACKOFF_SECONDS):
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff = backoff
+
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        # Non-blocking pool: the per-host semaphore (which honours each fetch's deadline) already keeps
+        # connections in use per host at or below pool_maxsize, so urllib3 never has to wait for one
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=per_host_limit, pool_block=False)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def host_slot(self, url):
+        """Semaphore bounding concurrent requests to the url's host"""
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._hosts[host]
+
+    def request(self, method, url, timeout=None, deadline=None, **kwargs):
+        resp, slot = self._send(method, url, timeout, deadline, **kwargs)
+        slot.release()
+        return resp
+
+    def _send(self, method, url, timeout=None, deadline=None, **kwargs):
+        """
+        Retrying request -> (response, host slot). The slot is still held: the caller releases it
+        once done with the response, so a streamed body counts against the host limit until read.
+        """
+        deadline_at = time.monotonic() + (deadline or self.deadline)
+        sync_budget = current_budget()
+        if sync_budget is not None:
+            deadline_at = min(deadline_at, sync_budget.deadline_at)
+        slot = self.host_slot(url)
+        attempt = 0
+        while True:
+            if sync_budget is not None: sync_budget.check(url)
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0 or not slot.acquire(timeout=remaining):
+                if sync_budget is not None: sync_budget.check(url)
+                raise DeadlineExceeded(f"Deadline exceeded for {url}")
+            try:
+                per_try = min(timeout or self.timeout, max(deadline_at - time.monotonic(), 0.1))
+                resp = self.session.request(method, url, timeout=per_try, **kwargs)
+                error = None
+            except (requests.Timeout, requests.ConnectionError) as e:
+                resp, error = None, e
+            except BaseException:
+                slot.release()
+                raise
+
+            if resp is not None and resp.status_code < 500:
+                return resp, slot
+
+            delay = self.backoff * (2 ** attempt) * (1 + random.random() * 0.25)
+            if attempt >= self.retries or time.monotonic() + delay >= deadline_at:
+                # Retries left but no sync time for them: cut short by the sync, not by the server
+                cut = sync_budget is not None and attempt < self.retries and time.monotonic() + delay >= sync_budget.deadline_at
+                if resp is not None and not cut:
+                    return resp, slot
+                slot.release()
+                if resp is not None: resp.close()
+                if cut: raise Cancelled(f"Sync deadline reached, abandoned {url}")
+                raise error
+            slot.release()
+            if resp is not None: resp.close()
+            if sync_budget is not None: sync_budget.sleep(delay)
+            else: time.sleep(delay)
+            attempt += 1
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def head(self, url, **kwargs):
+        return self.request("HEAD", url, **kwargs)
+
+    def download(self, url, max_bytes=DOWNLOAD_MAX_BYTES, spool_bytes=DOWNLOAD_SPOOL_BYTES, **kwargs):
+        """
+        Streams a file in chunks into a spooled temp file (memory below `spool_bytes`, disk above).
+        Returns the file rewound to the start, or None if the server answered 4xx/3xx (file not there).
+        Caller owns the file and should close it once parsed.
+        """
+        sync_budget = current_budget()
+        resp, slot = self._send("GET", url, stream=True, **kwargs)
+        # The host slot stays taken until the whole body is in
+        try:
+            with resp:
+                # 5xx survived every retry: that's an outage, not a missing file
+                if resp.status_code >= 500:
+                    resp.raise_for_status()
+                if resp.status_code != 200:
+                    return None
+                declared = int(resp.headers.get("Content-Length") or 0)
+                if declared > max_bytes:
+                    raise DownloadTooLarge(f"{url} is {declared} bytes (limit {max_bytes})")
+
+                out = tempfile.SpooledTemporaryFile(max_size=spool_bytes)
+                size = 0
+                try:
+                    for chunk in resp.iter_content(chunk_size=DOWNLOAD_CHUNK_BYTES):
+                        if sync_budget is not None: sync_budget.check(url)
+                        size += len(chunk)
+                        if size > max_bytes:
+                            raise DownloadTooLarge(f"{url} exceeded {max_bytes} bytes")
+                        out.write(chunk)
+                except BaseException:
+                    out.close()
+                    raise
+        finally:
+            slot.release()
+        out.seek(0)
+        return out
+
+# ===========================
+# ASYNC VARIANT (BATCH SYNCS)
+# ===========================
+class AsyncHttpClient:
+    """
+    asyncio facade over the pooled client for batch syncs.
+    Calls run on worker threads so they share the same connection pool and per-host limits.
+    """
+    def __init__(self, client=None):
+        self.client = client or get_client()
+
+    async def request(self, method, url, **kwargs):
+        return await asyncio.to_thread(self.client.request, method, url, **kwargs)
+
+    async def get(self, url, **kwargs):
+        return await self.request("GET", url, **kwargs)
+
+    async def head(self, url, **kwargs):
+        return await self.request("HEAD", url, **kwargs)
+
+    async def get_many(self, urls, **kwargs):
+        """Fetches urls concurrently; failures come back as exceptions in place of responses"""
+        return await asyncio.gather(*(self.get(u, **kwargs) for u in urls), return_exceptions=True)
+
+# --- SHARED INSTANCE ---
+_CLIENT = None
+_CLIENT_LOCK = threading.Lock()
+
+def get_client():
+    global _CLIENT
+    with _CLIENT_LOCK:
+        if _CLIENT is None:
+            _CLIENT = HttpClient()
+        return _CLIENT
+
+def get(url, **kwargs):
+    return get_client().get(url, **kwargs)
+
+def head(url, **kwargs):
+    return get_client().head(url, **kwargs)
+
+def download(url, **kwargs):
+    return get_client().download(url, **kwargs)
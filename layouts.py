@@ -0,0 +1,152 @@
+# layouts.py
+import contextlib
+import datetime
+import hashlib
+import json
+import os
+import re
+import threading
+import pandas as pd
+from config import LAYOUTS_FILE, LAYOUT_EVENTS_FILE
+import storage
+
+# Layout of a scheme sheet: the header row's position plus its normalized labels, and the resolved
+# column mapping {column position: field}. Fields are period-free ("Qty", "MarketValue", ...);
+# the parser adds the month suffix.
+
+def normalize_label(value):
+    if pd.isna(value):
+        return ""
+    return re.sub(r'[^a-z0-9%]+', ' ', str(value).lower()).strip()
+
+def row_labels(df, header_idx):
+    return [normalize_label(v) for v in df.iloc[header_idx]]
+
+def fingerprint(header_idx, labels):
+    return hashlib.md5(f"{header_idx}|{'|'.join(labels)}".encode()).hexdigest()[:12]
+
+# ===========================
+# STORE
+# ===========================
+class LayoutCache:
+    """
+    Known sheet layouts per AMC, persisted as JSON: {amc: {fingerprint: layout}}. Each layout
+    lists the sheets it was seen on, so drift is judged per sheet.
+    """
+    def __init__(self, path=LAYOUTS_FILE, events_path=LAYOUT_EVENTS_FILE):
+        self.path = path
+        self.events_path = events_path
+        self.layouts = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        mtime = os.path.getmtime(self.path) if os.path.exists(self.path) else None
+        if mtime == self._mtime:
+            return
+        self.layouts = {}
+        if mtime is not None:
+            with open(self.path) as f:
+                self.layouts = json.load(f)
+        self._mtime = mtime
+
+    def _save(self):
+        with storage.file_lock(self.path), storage.atomic_path(self.path) as tmp:
+            with open(tmp, "w") as f:
+                json.dump(self.layouts, f, indent=1, sort_keys=True)
+        self._mtime = os.path.getmtime(self.path)
+
+    @contextlib.contextmanager
+    def _editing(self):
+        """Read-modify-write under the file lock, so concurrent workers and processes don't lose layouts"""
+        with self._lock, storage.file_lock(self.path):
+            self._mtime = None    # Always re-read: another process may have written within our mtime resolution
+            self._refresh()
+            yield self.layouts
+            self._save()
+
+    def lookup(self, amc_code, df, sheet=None):
+        """(header_idx, col_map) of a known layout whose header row matches this sheet, else None"""
+        with self._lock:
+            self._refresh()
+            known = list(self.layouts.get(amc_code, {}).items())
+        # This sheet's own layouts first, then most recently seen: almost always a match on the first try
+        known.sort(key=lambda kv: (sheet in kv[1].get("sheets", []), kv[1]["last_seen"]), reverse=True)
+        for fp, layout in known:
+            idx = layout["header_idx"]
+            if idx < len(df) and row_labels(df, idx) == layout["labels"]:
+                if sheet is not None and sheet not in layout.get("sheets", []):
+                    self._tag(amc_code, fp, sheet)
+                return idx, {int(pos): field for pos, field in layout["col_map"].items()}
+        return None
+
+    def _tag(self, amc_code, fp, sheet):
+        """Notes that a sheet uses a layout first recorded for another sheet of the AMC"""
+        with self._editing() as layouts:
+            layout = layouts.get(amc_code, {}).get(fp)
+            if layout is not None and sheet not in layout.setdefault("sheets", []):
+                layout["sheets"].append(sheet)
+
+    def record(self, amc_code, sheet, month, year, df, header_idx, col_map):
+        """
+        Stores a layout found by discovery. A new layout for a sheet that already had one is a
+        drift event (sheets of one workbook legitimately differ, so they aren't compared with each
+        other); a sheet discovery couldn't parse is an unparseable event.
+        """
+        where = {"amc": amc_code, "sheet": sheet, "month": month, "year": year}
+        if header_idx is None or "Qty" not in col_map.values():
+            with self._lock:
+                self._refresh()
+                known = list(self.layouts.get(amc_code, {}))
+            self.event("unparseable", reason="no header row" if header_idx is None else "no quantity column",
+                       known=known, **where)
+            return
+
+        labels = row_labels(df, header_idx)
+        fp = fingerprint(header_idx, labels)
+        period = f"{month} {year}"
+        with self._editing() as layouts:
+            amc_layouts = layouts.setdefault(amc_code, {})
+            previous = [k for k, l in amc_layouts.items() if sheet in l.get("sheets", []) and k != fp]
+            drifted = bool(previous) and sheet not in amc_layouts.get(fp, {}).get("sheets", [])
+            layout = amc_layouts.setdefault(fp, {
+                "header_idx": header_idx, "labels": labels, "col_map": {str(p): f for p, f in col_map.items()},
+                "first_seen": period
+            })
+            if sheet not in layout.setdefault("sheets", []):
+                layout["sheets"].append(sheet)
+            layout["last_seen"] = datetime.datetime.now().isoformat(timespec="seconds")
+        if drifted:
+            self.event("drift", fingerprint=fp, previous=previous, labels=labels, **where)
+
+    def event(self, kind, **details):
+        entry = {"time": datetime.datetime.now().isoformat(timespec="seconds"), "event": kind, **details}
+        print(f"   📐 Layout {kind}: {details.get('amc')} {details.get('sheet') or ''} {details.get('month')} {details.get('year')}"
+              + (f" ({details['reason']})" if "reason" in details else ""))
+        os.makedirs(os.path.dirname(self.events_path) or ".", exist_ok=True)
+        with storage.file_lock(self.events_path), open(self.events_path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    def events(self, limit=None):
+        if not os.path.exists(self.events_path):
+            return []
+        with open(self.events_path) as f:
+            entries = [json.loads(line) for line in f if line.strip()]
+        return entries[-limit:] if limit else entries
+
+# --- SHARED INSTANCE ---
+_CACHE = LayoutCache()
+
+def lookup(amc_code, df, sheet=None):
+    return _CACHE.lookup(amc_code, df, sheet)
+
+def record(amc_code, sheet, month, year, df, header_idx, col_map):
+    _CACHE.record(amc_code, sheet, month, year, df, header_idx, col_map)
+
+def events(limit=None):
+    return _CACHE.events(limit)
+
+if __name__ == "__main__":
+    for e in events(50):
+        print(f"{e['time']}  {e['event']:<12} {e['amc']:<8} {e.get('sheet') or '-':<12} {e['month']} {e['year']}  "
+              f"{e.get('reason') or e.get('fingerprint', '')}")
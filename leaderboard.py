@@ -0,0 +1,167 @@
+# leaderboard.py
+import os
+import sqlite3
+from contextlib import closing
+import numpy as np
+import pandas as pd
+from config import FUND_CONFIG, STOCK_FLOWS_FILE, LEADERBOARD_FILE
+import periods
+import flows
+import analysis
+import security_master
+import storage
+
+# Per fund-month: every security the fund traded (entries, exits, adds, trims), kept in SQLite so
+# a sync replaces just its fund-months instead of rewriting every fund's trades
+STOCK_FLOW_COLUMNS = ["Fund", "Year", "Month", "ISIN", "Action", "Change", "ValueChange"]
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stock_flows (
+    Fund TEXT, Year INTEGER, Month TEXT, ISIN TEXT, Action TEXT, Change REAL, ValueChange REAL
+);
+CREATE INDEX IF NOT EXISTS idx_stock_flows_fund ON stock_flows (Fund, Year, Month);
+CREATE INDEX IF NOT EXISTS idx_stock_flows_month ON stock_flows (Year, Month);
+"""
+# Per month-security: the same summed across funds. ValueBought / ValueSold include adds and trims;
+# ValueInitiated / ValueExited only count new positions and full exits.
+BOARD_COLUMNS = ["Year", "Month", "ISIN", "Buyers", "Sellers", "Initiated", "Exited",
+                 "ValueBought", "ValueSold", "ValueInitiated", "ValueExited", "NetValue"]
+VALUE_COLUMNS = ["ValueBought", "ValueSold", "ValueInitiated", "ValueExited", "NetValue"]
+TRADES = [flows.ENTRY, flows.EXIT, flows.ADD, flows.TRIM]
+
+# ===========================
+# PER FUND-MONTH CONTRIBUTIONS
+# ===========================
+def fund_trades(fund_name, matrix, todo):
+    rows = []
+    for month, year in todo:
+        trades = matrix.at(month, year, TRADES)
+        if trades.empty: continue
+        trades = trades[["ISIN", "Action", "Change", "ValueChange"]].assign(Fund=fund_name, Year=year, Month=month)
+        rows.append(trades[STOCK_FLOW_COLUMNS])
+    return pd.concat(rows, ignore_index=True) if rows else pd.DataFrame(columns=STOCK_FLOW_COLUMNS)
+
+def _load(path, columns):
+    if os.path.exists(path):
+        return pd.read_csv(path)
+    return pd.DataFrame(columns=columns)
+
+def _connect():
+    os.makedirs(os.path.dirname(STOCK_FLOWS_FILE) or ".", exist_ok=True)
+    con = sqlite3.connect(STOCK_FLOWS_FILE)
+    con.executescript(SCHEMA)
+    return con
+
+def _drop(frame, keep_mask):
+    return frame[np.asarray(keep_mask, dtype=bool)] if len(frame) else frame
+
+# ===========================
+# INCREMENTAL UPDATE
+# ===========================
+def aggregate(trades):
+    """Stock flow rows for some months -> one leaderboard row per month x security"""
+    if trades.empty:
+        return pd.DataFrame(columns=BOARD_COLUMNS)
+    action = trades["Action"]
+    value = pd.to_numeric(trades["ValueChange"], errors="coerce")
+    frame = pd.DataFrame({
+        "Year": trades["Year"], "Month": trades["Month"], "ISIN": trades["ISIN"],
+        "Buyers": action.isin(["entry", "add"]), "Sellers": action.isin(["exit", "trim"]),
+        "Initiated": action == "entry", "Exited": action == "exit",
+        "ValueBought": value.where(value > 0), "ValueSold": -value.where(value < 0),
+        "ValueInitiated": value.where(action == "entry"), "ValueExited": -value.where(action == "exit"),
+        "NetValue": value
+    })
+    counts = ["Buyers", "Sellers", "Initiated", "Exited"]
+    out = frame.groupby(["Year", "Month", "ISIN"], as_index=False).agg(
+        **{c: (c, "sum") for c in counts},
+        **{c: (c, lambda s: s.sum(min_count=1)) for c in VALUE_COLUMNS}
+    )
+    return out[BOARD_COLUMNS]
+
+def update_fund(fund_name, df, new_periods=None):
+    """
+    Replaces one fund's trades for the given months (plus each successor month, whose diff
+    depends on them), then re-aggregates just those months across funds.
+    With new_periods=None every stored month of the fund is rebuilt.
+    """
+    matrix = flows.compute(df)
+    todo = set(matrix.periods) if new_periods is None else periods.with_successors(matrix.periods, new_periods)
+    if not todo:
+        return
+    fresh = fund_trades(fund_name, matrix, todo)
+
+    with storage.file_lock(STOCK_FLOWS_FILE):
+        with closing(_connect()) as con:
+            # Upsert: this fund's rows for these months are replaced, everything else is untouched
+            with con:
+                con.executemany("DELETE FROM stock_flows WHERE Fund = ? AND Year = ? AND Month = ?",
+                                [(fund_name, year, month) for month, year in todo])
+                if not fresh.empty:
+                    fresh.to_sql("stock_flows", con, if_exists="append", index=False)
+            # Every fund's trades, for the touched months only
+            touched = pd.concat([pd.read_sql_query("SELECT * FROM stock_flows WHERE Year = ? AND Month = ?", con, params=(year, month))
+                                 for month, year in todo], ignore_index=True)
+
+        board = _load(LEADERBOARD_FILE, BOARD_COLUMNS)
+        board = _drop(board, [(m, int(y)) not in todo for m, y in zip(board["Month"], board["Year"])])
+        board = pd.concat([board, aggregate(touched)], ignore_index=True)
+        storage.write_csv(board, LEADERBOARD_FILE)
+
+def rebuild():
+    """Full recompute for every fund on disk"""
+    for path in (STOCK_FLOWS_FILE, LEADERBOARD_FILE):
+        if os.path.exists(path):
+            os.remove(path)
+    for fund_name in FUND_CONFIG:
+        df = analysis.load_fund_data(fund_name)
+        if df is not None and "ISIN" in df.columns:
+            update_fund(fund_name, df)
+
+# ===========================
+# READ SIDE
+# ===========================
+_BOARD_CACHE = {}
+
+def load_board():
+    """The precomputed leaderboard, re-read only when the file changes"""
+    if not os.path.exists(LEADERBOARD_FILE):
+        return pd.DataFrame(columns=BOARD_COLUMNS)
+    mtime = os.path.getmtime(LEADERBOARD_FILE)
+    cached = _BOARD_CACHE.get(LEADERBOARD_FILE)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, _load(LEADERBOARD_FILE, BOARD_COLUMNS))
+        _BOARD_CACHE[LEADERBOARD_FILE] = cached
+    return cached[1]
+
+def available_periods():
+    board = load_board()
+    stored = {(m, int(y)) for m, y in zip(board["Month"], board["Year"])}
+    return sorted(stored, key=lambda p: periods.period_key(*p))
+
+def leaderboard(month, year, by="funds", top=15):
+    """
+    Most bought / sold / initiated / exited stocks across all funds for one month.
+    by="funds" ranks by how many funds did it (value breaks ties), by="value" by rupee value.
+    """
+    board = load_board()
+    board = board[(board["Month"] == month) & (board["Year"] == year)].copy()
+    board.insert(0, "Stock Name", security_master.get_master().name_of(board["ISIN"]).to_numpy())
+
+    def rank(count_col, value_col):
+        keys = [count_col, value_col] if by == "funds" else [value_col, count_col]
+        ranked = board[board[count_col] > 0].sort_values(keys, ascending=False, na_position="last")
+        return ranked[["Stock Name", "ISIN", count_col, value_col]].head(top).reset_index(drop=True)
+
+    return {
+        "Most Bought": rank("Buyers", "ValueBought"),
+        "Most Sold": rank("Sellers", "ValueSold"),
+        "Most Initiated": rank("Initiated", "ValueInitiated"),
+        "Most Exited": rank("Exited", "ValueExited")
+    }
+
+if __name__ == "__main__":
+    rebuild()
+    latest = available_periods()
+    if latest:
+        for title, table in leaderboard(*latest[-1]).items():
+            print(f"\n{title} ({latest[-1][0]} {latest[-1][1]})\n{table.to_string(index=False)}")
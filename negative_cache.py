@@ -0,0 +1,108 @@
+# negative_cache.py
+import contextlib
+import datetime
+import json
+import os
+import threading
+from config import NEGATIVE_CACHE_FILE, NEGATIVE_CACHE_TTLS
+import periods
+import storage
+
+# ===========================
+# TTL POLICY
+# ===========================
+def ttl_for(month, year, today=None):
+    """How long to trust a miss: short for the current month, None (permanent) for old gaps"""
+    today = today or datetime.date.today()
+    age_days = (today - periods.month_end(month, year)).days
+    for max_age, hours in NEGATIVE_CACHE_TTLS:
+        if age_days <= max_age:
+            return datetime.timedelta(hours=hours)
+    return None
+
+# ===========================
+# STORE
+# ===========================
+class NegativeCache:
+    """(source, period) pairs known to be unpublished or permanently missing, persisted as JSON"""
+    def __init__(self, path=NEGATIVE_CACHE_FILE):
+        self.path = path
+        self.entries = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def _key(self, source, month, year):
+        return f"{source}|{month}|{year}"
+
+    def _refresh(self):
+        mtime = os.path.getmtime(self.path) if os.path.exists(self.path) else None
+        if mtime == self._mtime:
+            return
+        self.entries = {}
+        if mtime is not None:
+            with open(self.path) as f:
+                self.entries = json.load(f)
+        self._mtime = mtime
+
+    def _save(self):
+        with storage.atomic_path(self.path) as tmp:
+            with open(tmp, "w") as f:
+                json.dump(self.entries, f, indent=1, sort_keys=True)
+        self._mtime = os.path.getmtime(self.path)
+
+    @contextlib.contextmanager
+    def _editing(self):
+        """Read-modify-write under the file lock, so concurrent workers and processes don't lose entries"""
+        with self._lock, storage.file_lock(self.path):
+            self._mtime = None    # Always re-read: another process may have written within our mtime resolution
+            self._refresh()
+            yield self.entries
+            self._save()
+
+    def is_missing(self, source, month, year, now=None):
+        with self._lock:
+            self._refresh()
+            entry = self.entries.get(self._key(source, month, year))
+        if entry is None:
+            return False
+        expires = entry.get("expires")
+        return expires is None or (now or datetime.datetime.now()) < datetime.datetime.fromisoformat(expires)
+
+    def record_missing(self, source, month, year, now=None):
+        now = now or datetime.datetime.now()
+        ttl = ttl_for(month, year, now.date())
+        with self._editing() as entries:
+            entries[self._key(source, month, year)] = {
+                "checked": now.isoformat(timespec="seconds"),
+                "expires": (now + ttl).isoformat(timespec="seconds") if ttl else None
+            }
+        print(f"   🚫 {source} {month} {year} marked missing " + (f"for {ttl}" if ttl else "permanently"))
+
+    def clear(self, source=None, month=None, year=None):
+        """Forget one entry, or everything when called with no arguments"""
+        with self._editing() as entries:
+            if source is None:
+                entries.clear()
+            else:
+                entries.pop(self._key(source, month, year), None)
+
+    def clear_many(self, keys):
+        """Forget several (source, month, year) entries in one write"""
+        with self._editing() as entries:
+            for source, month, year in keys:
+                entries.pop(self._key(source, month, year), None)
+
+# --- SHARED INSTANCE ---
+_CACHE = NegativeCache()
+
+def is_missing(source, month, year):
+    return _CACHE.is_missing(source, month, year)
+
+def record_missing(source, month, year):
+    _CACHE.record_missing(source, month, year)
+
+def clear(source=None, month=None, year=None):
+    _CACHE.clear(source, month, year)
+
+def clear_many(keys):
+    _CACHE.clear_many(keys)
@@ -0,0 +1,104 @@
+# pending.py
+import contextlib
+import datetime
+import json
+import os
+import threading
+from config import PENDING_FILE
+import periods
+import storage
+
+# ===========================
+# STORE
+# ===========================
+class PendingStore:
+    """
+    Fund-months a deadline-bounded sync gave up on before they finished downloading, persisted
+    as JSON: {fund: {"Month|Year": first deferred}}. The next sync of the fund and the background
+    scheduler fetch them; any finished fetch (found or not) clears the entry.
+    """
+    def __init__(self, path=PENDING_FILE):
+        self.path = path
+        self.entries = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        mtime = os.path.getmtime(self.path) if os.path.exists(self.path) else None
+        if mtime == self._mtime:
+            return
+        self.entries = {}
+        if mtime is not None:
+            with open(self.path) as f:
+                self.entries = json.load(f)
+        self._mtime = mtime
+
+    def _save(self):
+        with storage.file_lock(self.path), storage.atomic_path(self.path) as tmp:
+            with open(tmp, "w") as f:
+                json.dump(self.entries, f, indent=1, sort_keys=True)
+        self._mtime = os.path.getmtime(self.path)
+
+    @contextlib.contextmanager
+    def _editing(self):
+        """Read-modify-write under the file lock, so concurrent workers and processes don't lose entries"""
+        with self._lock, storage.file_lock(self.path):
+            self._mtime = None    # Always re-read: another process may have written within our mtime resolution
+            self._refresh()
+            yield self.entries
+            self._save()
+
+    def add(self, fund_name, period_list):
+        if not period_list:
+            return
+        now = datetime.datetime.now().isoformat(timespec="seconds")
+        with self._editing() as entries:
+            fund = entries.setdefault(fund_name, {})
+            for month, year in period_list:
+                fund.setdefault(f"{month}|{year}", now)
+        print(f"   ⏳ {fund_name}: {', '.join(f'{m[:3]} {y}' for m, y in period_list)} left pending")
+
+    def resolve(self, fund_name, period_list):
+        """Drops entries whose fetch has now finished"""
+        keys = [f"{m}|{y}" for m, y in period_list]
+        # Most finished fetches were never pending: check without the file lock and skip the write
+        with self._lock:
+            self._refresh()
+            fund = self.entries.get(fund_name)
+            if not fund or not any(k in fund for k in keys):
+                return
+        with self._editing() as entries:
+            fund = entries.get(fund_name, {})
+            for key in keys:
+                fund.pop(key, None)
+            if not fund:
+                entries.pop(fund_name, None)
+
+    def periods_for(self, fund_name):
+        with self._lock:
+            self._refresh()
+            keys = list(self.entries.get(fund_name, {}))
+        out = [(month, int(year)) for month, year in (k.split("|") for k in keys)]
+        return sorted(out, key=lambda p: periods.period_key(*p))
+
+    def by_fund(self):
+        """{fund: [(month, year)]} for every fund with pending months"""
+        with self._lock:
+            self._refresh()
+            funds = list(self.entries)
+        return {f: self.periods_for(f) for f in funds}
+
+# --- SHARED INSTANCE ---
+_STORE = PendingStore()
+
+def add(fund_name, period_list):
+    _STORE.add(fund_name, period_list)
+
+def resolve(fund_name, period_list):
+    _STORE.resolve(fund_name, period_list)
+
+def periods_for(fund_name):
+    return _STORE.periods_for(fund_name)
+
+def by_fund():
+    return _STORE.by_fund()
@@ -0,0 +1,61 @@
+# periods.py
+import calendar
+import datetime
+from config import YEARS, MONTHS
+
+# --- COLUMN NAMING ---
+def qty_col(month, year):
+    return f"Qty_{month}_{year}"
+
+def parse_period_col(col_name):
+    """Splits 'Qty_March_2025' (or MarketValue_/NavPct_) into ("March", 2025), None if not a period column"""
+    parts = str(col_name).split("_")
+    if len(parts) != 3 or parts[1] not in MONTHS or not parts[2].isdigit():
+        return None
+    return parts[1], int(parts[2])
+
+def period_key(month, year):
+    """Sortable integer for a (month, year) pair"""
+    return year * 12 + MONTHS.index(month)
+
+def sort_period_cols(cols):
+    """Chronological order for Qty_ columns, ignoring anything that isn't a period"""
+    parsed = [(c, parse_period_col(c)) for c in cols]
+    return [c for c, p in sorted((x for x in parsed if x[1]), key=lambda x: period_key(*x[1]))]
+
+def month_key(month, year):
+    """("March", 2025) -> "2025-03", the form used on the command line and in the API"""
+    return f"{year}-{MONTHS.index(month) + 1:02d}"
+
+def parse_month_key(value):
+    """"2025-03" -> ("March", 2025)"""
+    year, month = str(value).split("-")
+    return MONTHS[int(month) - 1], int(year)
+
+def with_successors(stored, new_periods):
+    """new_periods plus the stored period right after each: its month-on-month diff depends on them"""
+    todo = set()
+    for p in new_periods:
+        if p in stored:
+            i = stored.index(p)
+            todo.update(stored[i:i + 2])
+    return todo
+
+# --- CALENDAR ---
+def tracked_periods():
+    """Every (month, year) the dashboard stores, oldest first"""
+    return [(m, y) for y in YEARS for m in MONTHS]
+
+def period_range(start, end):
+    """Every (month, year) from start to end inclusive, oldest first; both ends are (month, year)"""
+    return [(MONTHS[k % 12], k // 12) for k in range(period_key(*start), period_key(*end) + 1)]
+
+def month_end(month, year):
+    month_num = MONTHS.index(month) + 1
+    return datetime.date(year, month_num, calendar.monthrange(year, month_num)[1])
+
+def previous_period(today=None):
+    """The last fully completed month as of `today`"""
+    today = today or datetime.date.today()
+    prev_end = today.replace(day=1) - datetime.timedelta(days=1)
+    return MONTHS[prev_end.month - 1], prev_end.year
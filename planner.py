@@ -0,0 +1,130 @@
+# planner.py
+import argparse
+from config import FUND_CONFIG, EST_DOWNLOAD_MB
+import periods
+import engine
+import engines
+import sync
+import negative_cache
+
+# ===========================
+# PLAN
+# ===========================
+def is_shared_source(fund_name):
+    return engines.engine_for(fund_name).master_file
+
+def stored_periods(fund_name):
+    return set(engine.get_engine().periods(fund_name))
+
+def build_plan(fund_names=None, period_list=None):
+    """
+    Works out which physical files are needed for every missing fund-month and groups
+    fund-months by file, so a master workbook shared by many schemes is fetched once.
+    """
+    groups = {}
+    for fund_name in fund_names or FUND_CONFIG.keys():
+        have = stored_periods(fund_name)
+        for month, year in period_list or periods.tracked_periods():
+            if (month, year) in have: continue
+            amc = FUND_CONFIG[fund_name].get("amc_code")
+            source = engines.engine_for(fund_name).source(fund_name)
+            # Known-absent files never make it into the plan
+            if negative_cache.is_missing(source, month, year): continue
+            groups.setdefault((periods.period_key(month, year), amc, source, month, year), []).append(fund_name)
+
+    plan = []
+    for (_, amc, source, month, year), funds in sorted(groups.items()):
+        plan.append({
+            "amc": amc, "month": month, "year": year, "source": source, "funds": funds,
+            "shared": is_shared_source(funds[0]), "est_mb": EST_DOWNLOAD_MB.get(amc, 1)
+        })
+    return plan
+
+def forget_misses(fund_names=None, period_list=None):
+    """Drops cached 'not published' answers for these funds and months only, so they're probed again"""
+    keys = {(source, month, year)
+            for fund_name in fund_names or FUND_CONFIG.keys()
+            for source in engines.engine_for(fund_name).miss_sources(fund_name)
+            for month, year in period_list or periods.tracked_periods()}
+    negative_cache.clear_many(keys)
+
+def print_plan(plan, show_urls=False):
+    """Dry-run report: one line per physical download, then the estimated total"""
+    if not plan:
+        print("✅ Nothing to sync.")
+        return
+    for task in plan:
+        funds = ", ".join(task["funds"]) if len(task["funds"]) <= 3 else f"{len(task['funds'])} schemes"
+        print(f"   📄 {task['month'][:3]} {task['year']}  {task['source']:<30} ~{task['est_mb']:>5.1f} MB  -> {funds}")
+        if show_urls:
+            for url in engines.ENGINES[task["amc"]].resolve(task["month"], task["year"]):
+                print(f"         {url}")
+    fund_months = sum(len(t["funds"]) for t in plan)
+    total_mb = sum(t["est_mb"] for t in plan)
+    naive_mb = sum(t["est_mb"] * len(t["funds"]) for t in plan)
+    print(f"\n🧮 {len(plan)} downloads (~{total_mb:.0f} MB) serve {fund_months} fund-months; "
+          f"per-fund syncing would take {fund_months} downloads (~{naive_mb:.0f} MB).")
+
+# ===========================
+# EXECUTE
+# ===========================
+def task_id(task):
+    return f"{task['source']}|{task['month']}|{task['year']}"
+
+def _task_schemes(task):
+    engine = engines.ENGINES[task["amc"]]
+    return engine, {engine.scheme_of(f): f for f in task["funds"]}
+
+def fetch_task(task):
+    """One download + parse for a plan task -> {fund: new_df or None}"""
+    engine, schemes = _task_schemes(task)
+    parsed = engine.fetch(task["month"], task["year"], list(schemes))
+    return {fund_name: parsed.get(scheme) for scheme, fund_name in schemes.items()}
+
+def execute_plan(plan, on_progress=None):
+    """
+    Runs each download and parse exactly once, then merges and saves each fund once. Returns {fund: added periods}.
+    Tasks are batched per engine and scheme set; engines run side by side, each fetching its periods in parallel.
+    """
+    batches = {}
+    for task in plan:
+        engine, schemes = _task_schemes(task)
+        batch = batches.setdefault((engine.code, tuple(sorted(schemes))), (engine, [], list(schemes)))
+        batch[1].append((task["month"], task["year"]))
+
+    done = []
+    def on_period(engine, month, year, parsed):
+        done.append((engine.code, month, year))
+        if on_progress: on_progress(len(done), len(plan), (engine.code, month, year))
+
+    fetched = engines.fetch_batches(list(batches.values()), on_period)
+    results = {}
+    for task in plan:
+        _, schemes = _task_schemes(task)
+        parsed = fetched.get((task["amc"], task["month"], task["year"]), {})
+        for scheme, fund_name in schemes.items():
+            results.setdefault(fund_name, []).append((task["month"], task["year"], parsed.get(scheme)))
+
+    added = {}
+    for fund_name, fund_results in results.items():
+        _, added[fund_name] = sync.commit_results(fund_name, fund_results)
+    return added
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Plan (and run) the minimal set of disclosure downloads.")
+    parser.add_argument("--dry-run", action="store_true", help="print the plan and its estimated cost, fetch nothing")
+    parser.add_argument("--fund", action="append", help="limit to these funds (repeatable)")
+    parser.add_argument("--amc", action="append", help="limit to these AMC codes, e.g. SBI (repeatable)")
+    parser.add_argument("--urls", action="store_true", help="with --dry-run, list each download's candidate URLs")
+    parser.add_argument("--retry-missing", action="store_true", help="forget cached 'not published' results for the selected funds first")
+    args = parser.parse_args()
+
+    funds = [f for f, c in FUND_CONFIG.items()
+             if (not args.fund or f in args.fund) and (not args.amc or c.get("amc_code") in args.amc)]
+    if args.retry_missing:
+        forget_misses(funds)
+    plan = build_plan(funds)
+    print_plan(plan, args.urls)
+    if not args.dry_run and plan:
+        added = execute_plan(plan)
+        print(f"🎉 Synced {sum(len(v) for v in added.values())} fund-months.")
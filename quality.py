@@ -0,0 +1,161 @@
+# quality.py
+import argparse
+import os
+import numpy as np
+import pandas as pd
+from config import (FUND_CONFIG, QUALITY_REPORT_FILE, QUALITY_NAV_SUM_RANGES, QUALITY_NAV_MIN_ROWS,
+                    QUALITY_PRICE_RATIO, QUALITY_PRICE_OUTLIER_SHARE)
+import periods
+import analysis
+import storage
+
+REPORT_COLUMNS = ["Fund", "Year", "Month", "Rows", "NavSum", "InvalidIsins", "DuplicateIsins",
+                  "PricesCompared", "PriceOutliers", "Status", "Issues"]
+
+# ===========================
+# WHOLE-COLUMN CHECKS
+# ===========================
+def isin_valid(isins):
+    """
+    ISO 6166 check per ISIN, vectorized: 2 letters + 9 alphanumerics + a Luhn check digit
+    over the digits of the first 11 characters (letters count as 10..35).
+    """
+    isins = pd.Series(isins, dtype=object).fillna("").astype(str).str.strip().str.upper()
+    ok = isins.str.fullmatch(r"[A-Z]{2}[A-Z0-9]{9}[0-9]").to_numpy(dtype=bool).copy()
+    if not ok.any():
+        return ok
+    codes = np.frombuffer("".join(isins[ok]).encode("ascii"), dtype=np.uint8).reshape(-1, 12).astype(np.int16)
+    values = np.where(codes >= 65, codes - 55, codes - 48)        # "0".."9" -> 0..9, "A".."Z" -> 10..35
+    body, check = values[:, :11], values[:, 11]
+
+    # Each character contributes 1 or 2 digits; Luhn doubles every second digit counted from the
+    # check digit (position 0), so place each digit by how many digits sit to its right.
+    widths = np.where(body >= 10, 2, 1)
+    right = np.cumsum(widths[:, ::-1], axis=1)[:, ::-1] - widths + 1   # position of each char's ones digit
+    ones, tens = body % 10, body // 10
+
+    def luhn(digit, pos):
+        doubled = digit * 2
+        return np.where(pos % 2 == 1, doubled - 9 * (doubled > 9), digit)
+
+    total = luhn(ones, right).sum(axis=1) + np.where(widths == 2, luhn(tens, right + 1), 0).sum(axis=1) + check
+    ok[ok] = total % 10 == 0
+    return ok
+
+def implied_prices(frame, month, year):
+    """ISIN -> MarketValue / Qty for one period of a (wide or single-period) fund frame"""
+    qty_col, mv_col = periods.qty_col(month, year), f"MarketValue_{month}_{year}"
+    if frame is None or qty_col not in frame.columns or mv_col not in frame.columns:
+        return pd.Series(dtype=float)
+    qty = pd.to_numeric(frame[qty_col], errors="coerce")
+    mv = pd.to_numeric(frame[mv_col], errors="coerce")
+    held = (qty > 0) & (mv > 0)
+    prices = pd.Series((mv[held] / qty[held]).to_numpy(), index=frame.loc[held, "ISIN"].astype(str).str.strip().str.upper())
+    return prices[~prices.index.duplicated()]
+
+def check(fund_name, frame, month, year, prev_prices=None):
+    """
+    Reconciles one fund-month (as parsed, or sliced out of a wide file) -> one report row.
+    prev_prices: ISIN -> implied price at the fund's previous stored month, if any.
+    """
+    qty_col, nav_col = periods.qty_col(month, year), f"NavPct_{month}_{year}"
+    frame = frame[pd.to_numeric(frame[qty_col], errors="coerce") > 0]
+    isins = frame["ISIN"].astype(str).str.strip().str.upper()
+    issues, status = [], "ok"
+
+    def flag(level, message):
+        nonlocal status
+        issues.append(message)
+        if level == "error" or status == "ok": status = level
+
+    invalid = int((~isin_valid(isins)).sum())
+    if invalid: flag("warn", f"{invalid} invalid ISINs")
+    duplicates = int(isins.duplicated().sum())
+    if duplicates: flag("error", f"{duplicates} duplicate ISINs")
+
+    # Equity rows only, in percent: just under 100 for an equity scheme, less for hybrid and debt
+    nav_sum = None
+    if nav_col in frame.columns and len(frame) >= QUALITY_NAV_MIN_ROWS:
+        nav_sum = float(pd.to_numeric(frame[nav_col], errors="coerce").sum())
+        kind = analysis.scheme_type(fund_name)
+        low, high = QUALITY_NAV_SUM_RANGES[kind]
+        # Commits and reads scale fraction sheets to percent, so this is a file not rewritten since
+        if 0 < nav_sum <= 1.5 and low > 1.5: flag("error", f"NavPct sums to {nav_sum:.2f}: fractions instead of percent?")
+        elif nav_sum > high: flag("error", f"NavPct sums to {nav_sum:.1f}: subtotal or repeated rows?")
+        elif nav_sum < low: flag("warn", f"NavPct sums to {nav_sum:.1f}: equity rows missing ({kind} scheme)?")
+
+    # Implied price against the previous month, per ISIN: a whole-sheet shift means a unit change
+    # (lakhs vs crores) or a wrong column; a handful is usually splits and bonuses
+    compared = outliers = 0
+    prices = implied_prices(frame, month, year)
+    if prev_prices is not None and len(prices) and len(prev_prices):
+        ratio = (prices / prev_prices.reindex(prices.index)).dropna()
+        compared = len(ratio)
+        moved = (ratio > QUALITY_PRICE_RATIO) | (ratio < 1 / QUALITY_PRICE_RATIO)
+        outliers = int(moved.sum())
+        if compared and outliers / compared > QUALITY_PRICE_OUTLIER_SHARE:
+            flag("error", f"implied price moved >{QUALITY_PRICE_RATIO:g}x for {outliers}/{compared} stocks (median x{ratio.median():.2f})")
+        elif outliers:
+            flag("warn", f"implied price moved >{QUALITY_PRICE_RATIO:g}x for {', '.join(ratio[moved].index[:5])}")
+
+    return {
+        "Fund": fund_name, "Year": year, "Month": month, "Rows": len(frame),
+        "NavSum": round(nav_sum, 2) if nav_sum is not None else None,
+        "InvalidIsins": invalid, "DuplicateIsins": duplicates, "PricesCompared": compared,
+        "PriceOutliers": outliers, "Status": status, "Issues": "; ".join(issues)
+    }
+
+def previous_prices(master_df, month, year):
+    """Implied prices at the latest stored month before (month, year)"""
+    key = periods.period_key(month, year)
+    earlier = [p for p in (periods.parse_period_col(c) for c in master_df.columns if str(c).startswith("Qty_"))
+               if periods.period_key(*p) < key]
+    if not earlier:
+        return None
+    return implied_prices(master_df, *max(earlier, key=lambda p: periods.period_key(*p)))
+
+# ===========================
+# REPORT
+# ===========================
+def record(rows):
+    """Replaces the report rows for these fund-months"""
+    if not rows:
+        return
+    fresh = pd.DataFrame(rows, columns=REPORT_COLUMNS)
+    with storage.file_lock(QUALITY_REPORT_FILE):
+        report = pd.read_csv(QUALITY_REPORT_FILE) if os.path.exists(QUALITY_REPORT_FILE) else pd.DataFrame(columns=REPORT_COLUMNS)
+        keys = set(zip(fresh["Fund"], fresh["Month"], fresh["Year"]))
+        keep = [k not in keys for k in zip(report["Fund"], report["Month"], report["Year"].astype(int))]
+        report = pd.concat([report[np.asarray(keep, dtype=bool)], fresh], ignore_index=True) if len(report) else fresh
+        storage.write_csv(report, QUALITY_REPORT_FILE)
+    for row in rows:
+        if row["Status"] != "ok":
+            print(f"   {'🟥' if row['Status'] == 'error' else '🟨'} Quality {row['Fund']} {row['Month']} {row['Year']}: {row['Issues']}")
+
+def load_report():
+    if not os.path.exists(QUALITY_REPORT_FILE):
+        return pd.DataFrame(columns=REPORT_COLUMNS)
+    return pd.read_csv(QUALITY_REPORT_FILE)
+
+def check_fund(fund_name, df):
+    """Every stored month of a wide fund file, each against the month before it"""
+    stored = [periods.parse_period_col(c) for c in periods.sort_period_cols([c for c in df.columns if str(c).startswith("Qty_")])]
+    rows, prev = [], None
+    for month, year in stored:
+        rows.append(check(fund_name, df, month, year, prev))
+        prev = implied_prices(df, month, year)
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Data-quality reconciliation of stored fund-months.")
+    parser.add_argument("--fund", action="append", help="limit to these funds (repeatable)")
+    args = parser.parse_args()
+
+    rows = []
+    for fund_name in args.fund or FUND_CONFIG.keys():
+        df = analysis.read_fund_file(fund_name)
+        if df is not None and "ISIN" in df.columns:
+            rows.extend(check_fund(fund_name, df))
+    record(rows)
+    counts = pd.Series([r["Status"] for r in rows]).value_counts().to_dict()
+    print(f"🧪 Checked {len(rows)} fund-months: {counts}")
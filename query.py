@@ -0,0 +1,123 @@
+# query.py
+import argparse
+import os
+import sqlite3
+import threading
+from contextlib import closing
+import numpy as np
+import pandas as pd
+from config import FUND_CONFIG, QUERY_DB_FILE
+import periods
+import engine
+import flows
+import security_master
+import storage
+
+# One row per fund x security x period where the fund held it then or the month before.
+# `period` is a sortable integer (year * 12 + month index); `month_key` is "YYYY-MM".
+# `action` compares with the fund's previous stored month: entry / exit / add / trim / hold
+# (NULL for a fund's first month).
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS holdings (
+    fund TEXT, amc TEXT, isin TEXT, stock_name TEXT, sector TEXT,
+    period INTEGER, month TEXT, year INTEGER, month_key TEXT,
+    qty REAL, prev_qty REAL, market_value REAL, nav_pct REAL, action TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_holdings_isin ON holdings (isin, period);
+CREATE INDEX IF NOT EXISTS idx_holdings_fund ON holdings (fund, period);
+CREATE INDEX IF NOT EXISTS idx_holdings_period ON holdings (period, action);
+CREATE TABLE IF NOT EXISTS loaded (fund TEXT PRIMARY KEY, version TEXT);
+"""
+
+EXAMPLES = {
+    "SBI schemes that added HDFC Bank in March 2025": """
+SELECT fund, prev_qty, qty, qty - prev_qty AS bought
+FROM holdings
+WHERE amc = 'SBI' AND stock_name LIKE 'HDFC Bank%' AND month_key = '2025-03' AND action IN ('entry', 'add')
+ORDER BY bought DESC""",
+    "Top 20 stocks by number of funds exiting (latest month)": """
+SELECT stock_name, isin, COUNT(*) AS funds_exiting
+FROM holdings
+WHERE action = 'exit' AND period = (SELECT MAX(period) FROM holdings)
+GROUP BY isin ORDER BY funds_exiting DESC LIMIT 20""",
+    "Most widely held stocks": """
+SELECT stock_name, COUNT(DISTINCT fund) AS funds
+FROM holdings
+WHERE qty > 0 AND period = (SELECT MAX(period) FROM holdings)
+GROUP BY isin ORDER BY funds DESC LIMIT 20"""
+}
+
+# ===========================
+# LONG ROWS PER FUND
+# ===========================
+def long_rows(fund_name, df, matrix=None):
+    """Wide fund frame -> long holdings rows for the table, straight from the fund's flow matrix"""
+    matrix = matrix if matrix is not None else flows.compute(df)
+    if not matrix.periods:
+        return pd.DataFrame()
+    stored = matrix.periods
+    keep = (matrix.qty > 0) | (np.nan_to_num(matrix.prev) > 0)
+    rows, cols = np.nonzero(keep)
+    isins = matrix.isins[rows]
+    actions = np.array([None] + [flows.ACTIONS[c] for c in sorted(flows.ACTIONS)], dtype=object)
+    return pd.DataFrame({
+        "fund": fund_name, "amc": FUND_CONFIG[fund_name].get("amc_code"),
+        "isin": isins, "stock_name": matrix.names[rows],
+        "sector": security_master.get_master().sector_of(isins).to_numpy(),
+        "period": np.array([periods.period_key(m, y) for m, y in stored])[cols],
+        "month": np.array([m for m, _ in stored])[cols], "year": np.array([y for _, y in stored])[cols],
+        "month_key": np.array([periods.month_key(m, y) for m, y in stored])[cols],
+        "qty": matrix.qty[rows, cols], "prev_qty": matrix.prev[rows, cols],
+        "market_value": flows.value_matrix(df, "MarketValue", stored)[rows, cols],
+        "nav_pct": flows.value_matrix(df, "NavPct", stored)[rows, cols],
+        # NONE (-1) maps to index 0 -> NULL
+        "action": actions[matrix.action[rows, cols] + 1]
+    })
+
+# ===========================
+# DATABASE
+# ===========================
+_REFRESH_LOCK = threading.Lock()
+
+def refresh(fund_names=None):
+    """Re-imports only funds whose data version changed since the last import, returns them"""
+    eng = engine.get_engine()
+    os.makedirs(os.path.dirname(QUERY_DB_FILE) or ".", exist_ok=True)
+    with _REFRESH_LOCK, storage.file_lock(QUERY_DB_FILE), closing(sqlite3.connect(QUERY_DB_FILE)) as con, con:
+        con.executescript(SCHEMA)
+        loaded = dict(con.execute("SELECT fund, version FROM loaded"))
+        changed = []
+        for fund_name in fund_names or FUND_CONFIG.keys():
+            version = repr(eng.fund_version(fund_name))
+            if loaded.get(fund_name) == version: continue
+            con.execute("DELETE FROM holdings WHERE fund = ?", (fund_name,))
+            df = eng.frame(fund_name)
+            if df is not None:
+                rows = long_rows(fund_name, df, eng.flow_matrix(fund_name))
+                if not rows.empty:
+                    rows.to_sql("holdings", con, if_exists="append", index=False)
+            con.execute("INSERT OR REPLACE INTO loaded (fund, version) VALUES (?, ?)", (fund_name, version))
+            changed.append(fund_name)
+    return changed
+
+def run_query(sql, params=(), refresh_first=True):
+    """Runs a read-only query over every fund's holdings, returns a DataFrame"""
+    if refresh_first:
+        refresh()
+    # Read-only connection: the query box can't modify the table
+    with closing(sqlite3.connect(f"file:{QUERY_DB_FILE}?mode=ro", uri=True)) as con:
+        return pd.read_sql_query(sql, con, params=params)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SQL over all fund holdings (table: holdings).")
+    parser.add_argument("sql", nargs="?", help="query to run; omit to list the example queries")
+    parser.add_argument("--refresh-only", action="store_true", help="just bring the database up to date")
+    args = parser.parse_args()
+
+    changed = refresh()
+    print(f"🗄️ {QUERY_DB_FILE}: re-imported {len(changed)} funds")
+    if args.sql:
+        print(run_query(args.sql, refresh_first=False).to_string(index=False))
+    elif not args.refresh_only:
+        for title, sql in EXAMPLES.items():
+            print(f"\n-- {title}{sql}")
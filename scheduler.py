@@ -0,0 +1,107 @@
+# scheduler.py
+import datetime
+import threading
+from config import (FUND_CONFIG, PUBLICATION_WINDOWS, DEFAULT_PUBLICATION_WINDOW, SCHEDULER_POLL_SECONDS,
+                    PENDING_RETRY_SECONDS)
+import periods
+import engine
+import pending
+
+# ===========================
+# PUBLICATION WINDOWS
+# ===========================
+def due_period(amc_code, today=None):
+    """
+    Returns the (month, year) an AMC should be publishing right now, or None.
+    A period is due while today falls inside [month-end + start, month-end + end] days.
+    """
+    today = today or datetime.date.today()
+    month, year = periods.previous_period(today)
+    start, end = PUBLICATION_WINDOWS.get(amc_code, DEFAULT_PUBLICATION_WINDOW)
+    days_since = (today - periods.month_end(month, year)).days
+    if start <= days_since <= end:
+        return month, year
+    return None
+
+# ===========================
+# BACKGROUND PREFETCH
+# ===========================
+class PrefetchScheduler:
+    """
+    Polls each AMC during its publication window and syncs new months in the background,
+    so the dashboard only ever reads files that are already on disk.
+    """
+    def __init__(self, poll_seconds=SCHEDULER_POLL_SECONDS):
+        self.poll_seconds = poll_seconds
+        self.last_synced = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="prefetch-scheduler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def warm_caches(self, fund_names=None):
+        engine.get_engine().refresh(fund_names)
+
+    def run_once(self, today=None):
+        """
+        Syncs every fund whose AMC has a due period not yet on disk, plus any months a deadline-bounded
+        sync left pending; returns the funds touched
+        """
+        # Imported on the background thread so the scrapers stay off the app's startup path
+        import planner
+        tracked = set(periods.tracked_periods())
+        due = {}
+        for fund_name, conf in FUND_CONFIG.items():
+            period = due_period(conf.get("amc_code"), today)
+            # Only months the dashboard tracks (config.YEARS) are stored
+            if period is None or period not in tracked: continue
+            due.setdefault(period, []).append(fund_name)
+        deferred = {f: ps for f, ps in pending.by_fund().items() if f in FUND_CONFIG}
+        for fund_name, fund_periods in deferred.items():
+            for period in fund_periods:
+                if fund_name not in due.setdefault(period, []): due[period].append(fund_name)
+
+        synced = []
+        for period, fund_names in due.items():
+            # The planner skips funds that already have the month and shares master workbooks
+            plan = planner.build_plan(fund_names, [period])
+            planned = {f for task in plan for f in task["funds"]}
+            for fund_name in fund_names:
+                # Pending, but stored meanwhile or now known to be unpublished
+                if fund_name not in planned and period in deferred.get(fund_name, []):
+                    pending.resolve(fund_name, [period])
+            if not plan: continue
+            print(f"⏰ Prefetch: {period[0]} {period[1]} ({len(plan)} downloads)")
+            for fund_name, added in planner.execute_plan(plan).items():
+                if added:
+                    synced.append(fund_name)
+                    self.last_synced[fund_name] = datetime.datetime.now()
+
+        self.warm_caches(synced)
+        return synced
+
+    def _loop(self):
+        self.warm_caches()
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"   ❌ Prefetch error: {e}")
+            # Come back sooner while a UI sync has left months behind
+            self._stop.wait(min(self.poll_seconds, PENDING_RETRY_SECONDS) if pending.by_fund() else self.poll_seconds)
+
+if __name__ == "__main__":
+    # Standalone mode: run the scheduler as its own process instead of inside Streamlit
+    scheduler = PrefetchScheduler().start()
+    try:
+        scheduler._thread.join()
+    except KeyboardInterrupt:
+        scheduler.stop()
@@ -1,13 +1,17 @@
 # scrapers.py
-import requests
 import pandas as pd
 import re
+import requests
 from bs4 import BeautifulSoup
-from io import BytesIO
 import calendar
 import datetime
-from config import FUND_CONFIG, HEADERS, MONTH_ABBR
-# ... inside scrapers.py ...
+import threading
+from collections import OrderedDict
+from config import (FUND_CONFIG, MONTH_ABBR, MASTER_CACHE_SIZE, HDFC_EQUITY_SCHEMES, HDFC_BASE_URL,
+                    HDFC_MASTER_FILENAME, HDFC_SCHEME_FILENAME, HDFC_INDEX_ROWS)
+import http_client
+import negative_cache
+import layouts
 
 # --- HELPER: Date Ordinal (e.g., 1st, 2nd, 3rd, 4th) ---
 def get_date_suffix(day):
@@ -16,115 +20,193 @@ def get_date_suffix(day):
     else:
         return ["st", "nd", "rd"][day % 10 - 1]
 
-# --- SBI ENGINE ---
+# --- SHARED: MASTER-WORKBOOK SCHEME SHEETS ---
+def find_sheet(xls, sheet_code):
+    """Exact sheet-name match first, then case/whitespace-insensitive (e.g. "SMCDF " with space)"""
+    if sheet_code in xls.sheet_names:
+        return sheet_code
+    for s in xls.sheet_names:
+        if sheet_code.lower() == s.strip().lower():
+            return s
+    return None
 
-# ... imports ...
+def _to_float(value):
+    # Some AMCs export numbers as text with thousands separators ("1,23,456")
+    return float(str(value).replace(",", "")) if isinstance(value, str) else float(value)
 
-# --- GENERIC SBI ENGINE ---
-def fetch_sbi_generic(fund_name, month, year):
-    try:
-        # 1. Get Config
-        conf = FUND_CONFIG[fund_name]
-        target_sheet_code = conf["sheet_code"]  # e.g., "SMCDF"
-        
-        # 2. Construct Master URL
-        month_num = datetime.datetime.strptime(month, "%B").month
-        last_day = calendar.monthrange(year, month_num)[1]
-        suffix = "th" if 11 <= last_day <= 13 else {1: "st", 2: "nd", 3: "rd"}.get(last_day % 10, "th")
-        date_str = f"{last_day}{suffix}-{month.lower()}-{year}"
-        
-        base_url = f"https://www.sbimf.com/docs/default-source/scheme-portfolios/all-schemes-monthly-portfolio---as-on-{date_str}.xlsx"
-        
-        print(f"   🔍 SBI: Checking Master File...")
-        resp = requests.get(base_url, headers=HEADERS, timeout=60, verify=False)
-        
-        if resp.status_code != 200:
-            print(f"   ❌ Master file unavailable for {month} {year}")
-            return None
+def column_field(label):
+    """Period-free field a header label maps to, or None"""
+    c_lower = str(label).lower().strip()
+    if "name" in c_lower and "instrument" in c_lower: return "Stock Name"
+    elif "isin" in c_lower: return "ISIN"
+    elif "quantity" in c_lower or "qty" in c_lower: return "Qty"
+    elif "market" in c_lower and "value" in c_lower: return "MarketValue"
+    elif ("nav" in c_lower or "net assets" in c_lower) and "quantity" not in c_lower: return "NavPct"
+    elif "industry" in c_lower or "sector" in c_lower: return "Industry"
+    return None
 
-        # 3. Load Excel & Find Exact Sheet
-        xls = pd.ExcelFile(BytesIO(resp.content))
-        
-        actual_sheet = None
-        # Try exact match first, then case-insensitive
-        if target_sheet_code in xls.sheet_names:
-            actual_sheet = target_sheet_code
-        else:
-            # Fallback: Look for code inside sheet name (e.g. "SMCDF " with space)
-            for s in xls.sheet_names:
-                if target_sheet_code.lower() == s.strip().lower():
-                    actual_sheet = s
-                    break
+def discover_layout(df, header_test):
+    """Scans for the header row and maps columns by label -> (header_idx, {position: field})"""
+    header_idx = None
+    for pos, (_, row) in enumerate(df.iterrows()):
+        row_str = row.astype(str).str.cat(sep=' ').lower()
+        if header_test(row_str):
+            header_idx = pos
+            break
+    if header_idx is None: return None, {}
+
+    col_map = {}
+    for pos, label in enumerate(df.iloc[header_idx]):
+        field = column_field(label)
+        # First matching column wins
+        if field and field not in col_map.values(): col_map[pos] = field
+    return header_idx, col_map
+
+def parse_scheme_sheet(df, month, year, header_test, keep_row, amc_code=None, sheet=None):
+    """
+    Standard parse of one scheme sheet: find the header row, map columns, keep equity rows.
+    header_test(row_str) spots the header; keep_row(isin, name) is the AMC's equity filter.
+    With amc_code, a known layout (see layouts.py) skips discovery; a new or broken one is logged.
+    """
+    layout = layouts.lookup(amc_code, df, sheet) if amc_code else None
+    if layout is None:
+        header_idx, col_map = discover_layout(df, header_test)
+        if amc_code: layouts.record(amc_code, sheet, month, year, df, header_idx, col_map)
+        if header_idx is None or "Qty" not in col_map.values(): return None
+    else:
+        header_idx, col_map = layout
+
+    period_fields = {"Qty", "MarketValue", "NavPct"}
+    df = df.iloc[header_idx+1:].copy()
+    df.columns = [(f"{col_map[p]}_{month}_{year}" if col_map[p] in period_fields else col_map[p]) if p in col_map else f"_{p}"
+                  for p in range(df.shape[1])]
+    
+    # Parse Rows
+    valid_rows = []
+    for _, row in df.iterrows():
+        try:
+            isin = str(row.get("ISIN", "")).upper().strip()
+            name = str(row.get("Stock Name", "")).strip()
+            
+            if not keep_row(isin, name): continue
+
+            qty = _to_float(row.get(f"Qty_{month}_{year}", 0))
+            if qty <= 0: continue
+            
+            record = { "Stock Name": name, "ISIN": isin, f"Qty_{month}_{year}": qty }
+            
+            if f"MarketValue_{month}_{year}" in df.columns:
+                record[f"MarketValue_{month}_{year}"] = _to_float(row.get(f"MarketValue_{month}_{year}", 0))
+            if f"NavPct_{month}_{year}" in df.columns:
+                record[f"NavPct_{month}_{year}"] = _to_float(row.get(f"NavPct_{month}_{year}", 0))
+            if "Industry" in df.columns and pd.notna(row.get("Industry")):
+                record["Industry"] = str(row.get("Industry")).strip()
+                
+            valid_rows.append(record)
+        except: continue
         
+    return pd.DataFrame(valid_rows)
+
+def parse_master_workbook(fh, sheet_codes, month, year, parse_sheet):
+    """Opens a master workbook once and parses each requested scheme sheet -> {sheet_code: df or None}"""
+    results = {}
+    xls = pd.ExcelFile(fh)
+    for code in sheet_codes:
+        actual_sheet = find_sheet(xls, code)
         if not actual_sheet:
-            print(f"   ❌ Sheet '{target_sheet_code}' not found in master file.")
-            # Optional: Print available sheets for debugging
-            # print(f"Available: {xls.sheet_names[:5]}...") 
-            return None
-            
-        print(f"   ✅ Found Sheet: {actual_sheet}")
+            print(f"   ❌ Sheet '{code}' not found in master file.")
+            results[code] = None
+            continue
         df = pd.read_excel(xls, sheet_name=actual_sheet, header=None)
-        
-        # 4. Find Header Row (Standard logic)
-        header_idx = None
-        for idx, row in df.iterrows():
-            row_str = row.astype(str).str.cat(sep=' ').lower()
-            if "name of instrument" in row_str or "isin" in row_str:
-                header_idx = idx
-                break
-        
-        if header_idx is None: return None
+        results[code] = parse_sheet(df, month, year, actual_sheet)
+    return results
 
-        df.columns = df.iloc[header_idx]
-        df = df.iloc[header_idx+1:].copy()
-        
-        # 5. Map Columns
-        col_map = {}
-        for c in df.columns:
-            c_lower = str(c).lower().strip()
-            if "name" in c_lower and "instrument" in c_lower: col_map[c] = "Stock Name"
-            elif "isin" in c_lower: col_map[c] = "ISIN"
-            elif "quantity" in c_lower or "qty" in c_lower: col_map[c] = f"Qty_{month}_{year}"
-            elif "market" in c_lower and "value" in c_lower: col_map[c] = f"MarketValue_{month}_{year}"
-            elif ("nav" in c_lower or "net assets" in c_lower) and "quantity" not in c_lower: col_map[c] = f"NavPct_{month}_{year}"
-        
-        df = df.rename(columns=col_map)
-        
-        if f"Qty_{month}_{year}" not in df.columns: return None
-        
-        # 6. Parse Rows
-        valid_rows = []
-        for _, row in df.iterrows():
-            try:
-                isin = str(row.get("ISIN", "")).upper().strip()
-                name = str(row.get("Stock Name", "")).strip()
-                
-                # Equity Filter: Must have valid ISIN
-                if not isin.startswith("INE"): continue
+# --- SHARED: PARSED MASTER CACHE ---
+# One download + parse per (AMC, month) per process for the schemes asked for, whichever fund asks
+# first. Only requested sheets are parsed (a Nippon master has ~54); a later request for other
+# schemes of the same month downloads the workbook again for just those.
+_MASTER_CACHE = OrderedDict()
+_MASTER_LOCKS = {}          # key -> [lock, callers using it]; dropped when the last one finishes
+_MASTER_LOCKS_GUARD = threading.Lock()
 
-                qty = float(row.get(f"Qty_{month}_{year}", 0))
-                if qty <= 0: continue
-                
-                record = { "Stock Name": name, "ISIN": isin, f"Qty_{month}_{year}": qty }
-                
-                if f"MarketValue_{month}_{year}" in df.columns:
-                    record[f"MarketValue_{month}_{year}"] = float(row.get(f"MarketValue_{month}_{year}", 0))
-                if f"NavPct_{month}_{year}" in df.columns:
-                    record[f"NavPct_{month}_{year}"] = float(row.get(f"NavPct_{month}_{year}", 0))
-                    
-                valid_rows.append(record)
-            except: continue
-            
-        return pd.DataFrame(valid_rows)
+def cached_master(amc_code, month, year, sheet_codes, fetch_all):
+    key = (amc_code, month, year)
+    with _MASTER_LOCKS_GUARD:
+        entry = _MASTER_LOCKS.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        # A second caller for the same workbook waits here instead of downloading it again
+        with entry[0]:
+            with _MASTER_LOCKS_GUARD:
+                parsed = dict(_MASTER_CACHE.get(key, {}))
+            todo = sorted(set(sheet_codes) - set(parsed))
+            fetched = fetch_all(month, year, todo) if todo else {}
+            parsed.update(fetched)
+            with _MASTER_LOCKS_GUARD:
+                # An all-None answer (file not there) isn't kept: the negative cache handles misses
+                if any(v is not None for v in fetched.values()):
+                    _MASTER_CACHE[key] = parsed
+                if key in _MASTER_CACHE:
+                    _MASTER_CACHE.move_to_end(key)
+                    while len(_MASTER_CACHE) > MASTER_CACHE_SIZE:
+                        _MASTER_CACHE.popitem(last=False)
+    finally:
+        with _MASTER_LOCKS_GUARD:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _MASTER_LOCKS[key]
+    # Copies: callers normalize columns in place
+    return {c: (parsed.get(c).copy() if parsed.get(c) is not None else None) for c in sheet_codes}
+
+# --- GENERIC SBI ENGINE ---
+def sbi_master_url(month, year):
+    month_num = datetime.datetime.strptime(month, "%B").month
+    last_day = calendar.monthrange(year, month_num)[1]
+    suffix = "th" if 11 <= last_day <= 13 else {1: "st", 2: "nd", 3: "rd"}.get(last_day % 10, "th")
+    date_str = f"{last_day}{suffix}-{month.lower()}-{year}"
+    return f"https://www.sbimf.com/docs/default-source/scheme-portfolios/all-schemes-monthly-portfolio---as-on-{date_str}.xlsx"
+
+def parse_sbi_sheet(df, month, year, sheet=None):
+    return parse_scheme_sheet(
+        df, month, year, amc_code="SBI", sheet=sheet,
+        header_test=lambda r: "name of instrument" in r or "isin" in r,
+        # Equity Filter: Must have valid ISIN
+        keep_row=lambda isin, name: isin.startswith("INE")
+    )
 
+def _fetch_sbi_master(month, year, sheet_codes):
+    """One download + one workbook open for every requested SBI scheme -> {sheet_code: df or None}"""
+    if negative_cache.is_missing("SBI master", month, year):
+        return {code: None for code in sheet_codes}
+    try:
+        print(f"   🔍 SBI: Checking Master File...")
+        fh = http_client.download(sbi_master_url(month, year), verify=False)
+        if fh is None:
+            print(f"   ❌ Master file unavailable for {month} {year}")
+            negative_cache.record_missing("SBI master", month, year)
+            return {code: None for code in sheet_codes}
+        with fh:
+            return parse_master_workbook(fh, sheet_codes, month, year, parse_sbi_sheet)
+    except requests.RequestException: raise   # Outage or cancelled, not missing: caller retries
     except Exception as e:
-        print(f"   ❌ Error in SBI {fund_name}: {e}")
-        return None
+        print(f"   ❌ Error in SBI master {month} {year}: {e}")
+        return {code: None for code in sheet_codes}
+
+def fetch_sbi_master(month, year, sheet_codes):
+    return cached_master("SBI", month, year, sheet_codes, _fetch_sbi_master)
+
+def fetch_sbi_generic(fund_name, month, year):
+    code = FUND_CONFIG[fund_name]["sheet_code"]  # e.g., "SMCDF"
+    return fetch_sbi_master(month, year, [code])[code]
+
 # --- PPFAS ENGINE ---
 def fetch_ppfas(month, year):
+    if negative_cache.is_missing("PPFAS Flexi Cap", month, year): return None
     try:
         conf = FUND_CONFIG["PPFAS Flexi Cap"]
-        response = requests.get(conf["url"], headers=HEADERS, timeout=10)
+        response = http_client.get(conf["url"])
+        # An error page has no matching link either: only a real listing can say the month isn't there
+        response.raise_for_status()
         soup = BeautifulSoup(response.content, 'html.parser')
         
         target_url = None
@@ -135,11 +217,17 @@ def fetch_ppfas(month, year):
                 target_url = link['href'] if link['href'].startswith('http') else f"https://amc.ppfas.com{link['href']}"
                 break
         
-        if not target_url: return None
+        if not target_url:
+            negative_cache.record_missing("PPFAS Flexi Cap", month, year)
+            return None
 
-        resp = requests.get(target_url, headers=HEADERS, timeout=30)
-        try: all_sheets = pd.read_excel(BytesIO(resp.content), header=None, sheet_name=None, engine='openpyxl')
-        except: all_sheets = pd.read_excel(BytesIO(resp.content), header=None, sheet_name=None, engine='xlrd')
+        fh = http_client.download(target_url)
+        if fh is None: return None
+        with fh:
+            try: all_sheets = pd.read_excel(fh, header=None, sheet_name=None, engine='openpyxl')
+            except:
+                fh.seek(0)
+                all_sheets = pd.read_excel(fh, header=None, sheet_name=None, engine='xlrd')
         
         full_df = pd.concat(all_sheets.values(), ignore_index=True)
         valid_holdings = []
@@ -158,259 +246,187 @@ def fetch_ppfas(month, year):
         
         if not valid_holdings: return None
         return pd.DataFrame(valid_holdings).groupby("ISIN", as_index=False).agg({"Stock Name": "first", f"Qty_{month}_{year}": "sum"})
+    except requests.RequestException: raise   # Outage or cancelled, not missing: caller retries
     except: return None
 
-# ... imports ...
+# --- GENERIC NIPPON ENGINE (Day-Specific Pattern) ---
+def nippon_master_candidates(month, year):
+    mon_abbr = MONTH_ABBR.get(month, month[:3]) # "Dec"
+    yy = str(year)[-2:] # "25"
+    
+    # Calculate Last Day of Month (e.g., 31, 30, 28)
+    month_num = datetime.datetime.strptime(month, "%B").month
+    last_day = calendar.monthrange(year, month_num)[1]
+    
+    base_paths = [
+        # Pattern 1: With Day (e.g., NIMF-MONTHLY-PORTFOLIO-31-Dec-25)
+        f"https://mf.nipponindiaim.com/InvestorServices/FactsheetsDocuments/NIMF-MONTHLY-PORTFOLIO-{last_day}-{mon_abbr}-{yy}",
+        f"https://mf.nipponindiaim.com/InvestorServices/FactsheetsDocuments/NIMF-MONTHLY-PORTFOLIO-{last_day}-{month}-{yy}"
+        ]
+    return [p + ext for p in base_paths for ext in (".xls", ".xlsx")]
 
-# --- GENERIC NIPPON ENGINE ---
-# ... inside scrapers.py ...
+def find_nippon_master(month, year):
+    """
+    URL of the month's master file, or None when every candidate answered 4xx (not published).
+    A candidate that failed or answered otherwise leaves the question open, so that raises instead.
+    """
+    print(f"   🔍 Nippon: Searching for master file ({month} {year})...")
+    failure = None
+    for u in nippon_master_candidates(month, year):
+        try:
+            # verify=False is critical for some Nippon servers
+            print(f"   🔍 Checking URL: {u}")
+            status = http_client.head(u, timeout=5, verify=False).status_code
+        except http_client.Cancelled: raise
+        except requests.RequestException as e:
+            failure = e
+            continue
+        print(f"   🔍 Status Code: {status}")
+        if status == 200:
+            return u
+        if not 400 <= status < 500:
+            failure = requests.HTTPError(f"{status} for {u}")
+    if failure is not None:
+        raise failure
+    return None
 
-# --- GENERIC NIPPON ENGINE (Updated with Day-Specific Pattern) ---
-def fetch_nippon_generic(fund_name, month, year):
-    print(month)
-    if month == "August" or month == "July":
-        print(f"Skipping {month} as it's not supported.")
-        return None
+def parse_nippon_sheet(df, month, year, sheet=None):
+    return parse_scheme_sheet(
+        df, month, year, amc_code="NIPPON", sheet=sheet,
+        header_test=lambda r: "name of the instrument" in r or ("isin" in r and "qty" in r),
+        # Equity Filter
+        keep_row=lambda isin, name: isin.startswith("INE") or (len(name) >= 3 and "Total" not in name)
+    )
 
-    try:
-        conf = FUND_CONFIG[fund_name]
-        target_sheet_code = conf["sheet_code"] # e.g., "SC" or "GF"
-        
-        # 1. Prepare Date Variables
-        
-        mon_abbr = MONTH_ABBR.get(month, month[:3]) # "Dec"
-        yy = str(year)[-2:] # "25"
-        
-        # Calculate Last Day of Month (e.g., 31, 30, 28)
-        month_num = datetime.datetime.strptime(month, "%B").month
-        last_day = calendar.monthrange(year, month_num)[1]
-        
-        target_url = None
-        
-        # 2. Define URL Patterns
-        base_paths = [
-            # Pattern 1: With Day (e.g., NIMF-MONTHLY-PORTFOLIO-31-Dec-25)
-            f"https://mf.nipponindiaim.com/InvestorServices/FactsheetsDocuments/NIMF-MONTHLY-PORTFOLIO-{last_day}-{mon_abbr}-{yy}",
-            f"https://mf.nipponindiaim.com/InvestorServices/FactsheetsDocuments/NIMF-MONTHLY-PORTFOLIO-{last_day}-{month}-{yy}"
-            ]
-        
-        urls_to_try = []
-        for p in base_paths:
-            urls_to_try.append(p + ".xls")
-            urls_to_try.append(p + ".xlsx")
-
-        # 3. Find File
-        print(f"   🔍 Nippon: Searching for master file ({month} {year})...")
-        for u in urls_to_try:
-            try:
-                # verify=False is critical for some Nippon servers
-                print(f"   🔍 Checking URL: {u}")
-                status = requests.head(u, headers=HEADERS, timeout=5, verify=False).status_code
-                print(f"   🔍 Status Code: {status}")
-                if status == 200:
-                    target_url = u
-                    break
-            except: continue
+def _fetch_nippon_master(month, year, sheet_codes):
+    """One download + one workbook open for every requested Nippon scheme -> {sheet_code: df or None}"""
+    # Known-absent months (e.g. the July/August gap) are skipped without touching the network
+    if negative_cache.is_missing("NIPPON master", month, year):
+        return {code: None for code in sheet_codes}
 
+    try:
+        target_url = find_nippon_master(month, year)
         print(f"   🔍 Nippon: Target URL: {target_url}" )
-
         if not target_url: 
             print(f"   ❌ Nippon: Master file not found.")
-            return None
+            negative_cache.record_missing("NIPPON master", month, year)
+            return {code: None for code in sheet_codes}
 
         print(f"   ✅ Found: {target_url}")
-        resp = requests.get(target_url, headers=HEADERS, timeout=45, verify=False)
-        
-        # 4. Load Excel & Find Exact Sheet
-        xls = pd.ExcelFile(BytesIO(resp.content))
-        
-        actual_sheet = None
-        # Try exact match first (Case sensitive is safer for codes like "SC")
-        if target_sheet_code in xls.sheet_names:
-            actual_sheet = target_sheet_code
-        else:
-            # Fallback: Case insensitive match
-            for s in xls.sheet_names:
-                if target_sheet_code.lower() == s.strip().lower():
-                    actual_sheet = s
-                    break
-        
-        if not actual_sheet:
-            print(f"   ❌ Sheet '{target_sheet_code}' not found in master file.")
-            return None
-            
-        print(f"   📄 Parsing Sheet: {actual_sheet}")
-        df = pd.read_excel(xls, sheet_name=actual_sheet, header=None)
+        fh = http_client.download(target_url, verify=False)
+        if fh is None: return {code: None for code in sheet_codes}
+        with fh:
+            return parse_master_workbook(fh, sheet_codes, month, year, parse_nippon_sheet)
+    except requests.RequestException: raise   # Outage or cancelled, not missing: caller retries
+    except Exception as e:
+        print(f"   ❌ Error processing Nippon master {month} {year}: {e}")
+        return {code: None for code in sheet_codes}
 
-        # 5. Standard Parsing Logic
-        header_idx = None
-        for idx, row in df.iterrows():
-            row_str = row.astype(str).str.cat(sep=' ').lower()
-            if "name of the instrument" in row_str or ("isin" in row_str and "qty" in row_str): 
-                header_idx = idx
-                break
-        
-        if header_idx is None: return None
+def fetch_nippon_master(month, year, sheet_codes):
+    return cached_master("NIPPON", month, year, sheet_codes, _fetch_nippon_master)
 
-        df.columns = df.iloc[header_idx]
-        df = df.iloc[header_idx+1:].copy()
-        
-        col_map = {}
-        for c in df.columns:
-            c_lower = str(c).lower().strip()
-            if "name" in c_lower and "instrument" in c_lower: col_map[c] = "Stock Name"
-            elif "isin" in c_lower: col_map[c] = "ISIN"
-            elif "quantity" in c_lower or "qty" in c_lower: col_map[c] = f"Qty_{month}_{year}"
-            elif "market" in c_lower and "value" in c_lower: col_map[c] = f"MarketValue_{month}_{year}"
-            elif ("nav" in c_lower or "net assets" in c_lower) and "quantity" not in c_lower: col_map[c] = f"NavPct_{month}_{year}"
-                
-        df = df.rename(columns=col_map)
-        
-        if f"Qty_{month}_{year}" not in df.columns: return None
-        
-        valid_rows = []
-        for _, row in df.iterrows():
-            try:
-                isin = str(row.get("ISIN", "")).upper().strip()
-                name = str(row.get("Stock Name", "")).strip()
-                
-                # Equity Filter
-                if (not isin.startswith("INE")) and (len(name) < 3 or "Total" in name): continue
+def fetch_nippon_generic(fund_name, month, year):
+    code = FUND_CONFIG[fund_name]["sheet_code"] # e.g., "SC" or "GF"
+    return fetch_nippon_master(month, year, [code])[code]
 
-                qty = float(row.get(f"Qty_{month}_{year}", 0))
-                if qty <= 0: continue
-                
-                record = { "Stock Name": name, "ISIN": isin, f"Qty_{month}_{year}": qty }
-                
-                if f"MarketValue_{month}_{year}" in df.columns:
-                    record[f"MarketValue_{month}_{year}"] = float(row.get(f"MarketValue_{month}_{year}", 0))
-                if f"NavPct_{month}_{year}" in df.columns:
-                    record[f"NavPct_{month}_{year}"] = float(row.get(f"NavPct_{month}_{year}", 0))
-                        
-                valid_rows.append(record)
-            except: continue
-            
-        return pd.DataFrame(valid_rows)
+# --- HDFC ENGINE (Keyword-Indexed Workbooks) ---
+def hdfc_file_urls(filename, month, year):
+    """Next-month upload folder first, then the data month's own folder (sometimes they upload early)"""
+    month_num = datetime.datetime.strptime(month, "%B").month
+    date_obj = datetime.date(year, month_num, 1)
+    next_month = date_obj.replace(day=28) + datetime.timedelta(days=4)
+    quoted = filename.replace(' ', '%20')
+    return [f"{HDFC_BASE_URL}/{d.strftime('%Y-%m')}/{quoted}" for d in (next_month, date_obj)]
 
-    except Exception as e:
-        print(f"   ❌ Error processing Nippon {fund_name}: {e}")
-        return None
-def fetch_nippon(st, month, year):
-    print(month)
-    if month != "August" or month!="July":
+def hdfc_filename(pattern, month, year, scheme=None):
+    month_num = datetime.datetime.strptime(month, "%B").month
+    last_day = calendar.monthrange(year, month_num)[1]
+    return pattern.format(day=last_day, month=month, year=year, scheme=scheme)
 
-        try:
-            
-            conf = FUND_CONFIG["Nippon India Small Cap"]
-            month_short, year_short = month[:3], str(year)[-2:]
-            target_url = None
-            
-            # 1. Try Direct Patterns
-            patterns = [
-                f"https://mf.nipponindiaim.com/InvestorServices/FactsheetsDocuments/NIMF-MONTHLY-PORTFOLIO-{month_short}-{year_short}.xls",
-                f"https://mf.nipponindiaim.com/InvestorServices/FactsheetsDocuments/NIMF-MONTHLY-PORTFOLIO-{month}-{year}.xls"
-            ]
-            for url in patterns:
-                try: 
-                    if requests.head(url, headers=HEADERS, timeout=10000).status_code == 200: target_url = url; break
-                except: continue
-                
-            # 2. Try Regex
-            if not target_url:
-                resp = requests.get(conf["url"], headers=HEADERS, timeout=10000)
-                st.toast(resp.status_code)
-                regex = fr'href=["\']([^"\']*(?:monthly|portfolio)[^"\']*(?:{month}|{month_short})[^"\']*(?:{year}|{year_short})[^"\']*\.xls[x]?)["\']'
-                matches = re.findall(regex, resp.text, re.IGNORECASE)
-                st.toast(f"🔍 Nippon Regex found {len(matches)} links", icon="🔗")
-                if matches:
-                    st.toast(f"🔍 Nippon Regex matched {len(matches)} links", icon="🔗")
-                    link = matches[0]
-                    target_url = conf["base_url"] + link if link.startswith("/") else link
-            
-            print(f"   🔍 Nippon URL found: {target_url}")
-            st.toast(f"🔍 Nippon URL not found for {month} {year}", icon="🔗")
-            if not target_url: return None
-        
+def _normalize(text):
+    return re.sub(r'[^a-z0-9]+', ' ', str(text).lower()).strip()
 
-            resp = requests.get(target_url, headers=HEADERS, timeout=30)
-            try: df = pd.read_excel(BytesIO(resp.content), sheet_name=conf["sheet"], header=None, engine='openpyxl')
-            except: df = pd.read_excel(BytesIO(resp.content), sheet_name=conf["sheet"], header=None, engine='xlrd')
+def index_workbook(fh):
+    """
+    Reads only the title rows of every sheet, once per workbook -> (xls, {sheet: normalized title text}).
+    Schemes are then matched against the index instead of parsing every sheet.
+    """
+    xls = pd.ExcelFile(fh)
+    index = {}
+    for sheet in xls.sheet_names:
+        head = pd.read_excel(xls, sheet_name=sheet, header=None, nrows=HDFC_INDEX_ROWS)
+        cells = " ".join(str(v) for v in head.to_numpy().ravel() if pd.notna(v))
+        index[sheet] = f" {_normalize(sheet + ' ' + cells)} "
+    return xls, index
 
-            header_idx = None
-            for idx, row in df.iterrows():
-                if "name of the instrument" in row.astype(str).str.cat(sep=' ').lower(): header_idx = idx; break
-            st.toast(f"🔍 Nippon Header found for {header_idx}", icon="🔗")
-            if header_idx is None: return None
+def match_scheme_sheet(index, scheme):
+    """Sheet whose title mentions the scheme; the tightest title wins ("Mid Cap" vs "Large and Mid Cap")"""
+    keyword = f" {_normalize(scheme)} "
+    hits = [s for s, text in index.items() if keyword in text]
+    return min(hits, key=lambda s: len(index[s])) if hits else None
 
-            df.columns = df.iloc[header_idx]
-            df = df.iloc[header_idx+1:].copy()
-            col_map = {c: "Stock Name" if "name of the instrument" in str(c).lower() else "ISIN" if "isin" in str(c).lower() else f"Qty_{month}_{year}" if "quantity" in str(c).lower() else c for c in df.columns}
-            df = df.rename(columns=col_map)
-            
-            valid_rows = []
-            for _, row in df.iterrows():
-                isin = str(row.get("ISIN", "")).upper()
-                if isin.startswith("INE") and "total" not in str(row.get("Stock Name", "")).lower():
-                    try:
-                        qty = float(str(row.get(f"Qty_{month}_{year}", 0)).replace(",", ""))
-                        if qty > 0: valid_rows.append({"Stock Name": row["Stock Name"], "ISIN": isin, f"Qty_{month}_{year}": qty})
-                    except: continue
-            st.toast(f"✅ Secured Nippon data for {month} {year} valid rows: {len(valid_rows)}", icon="✨")
-            return pd.DataFrame(valid_rows)
-        except:
-            print(f"   ❌ Error fetching Nippon data for {month} {year}") 
-            st.toast(f"❌ Error fetching Nippon data for {month} {year}", icon="⚠️")
-            return None
+def parse_hdfc_sheet(df, month, year, sheet=None):
+    return parse_scheme_sheet(
+        df, month, year, amc_code="HDFC", sheet=sheet,
+        header_test=lambda r: "isin" in r and "name" in r and "quantity" in r,
+        keep_row=lambda isin, name: isin.startswith("INE")
+    )
+
+def parse_indexed_workbook(fh, schemes, month, year):
+    """{sheet_code: scheme name} -> {sheet_code: df or None}, unmatched schemes are left out"""
+    xls, index = index_workbook(fh)
+    results = {}
+    for code, scheme in schemes.items():
+        sheet = match_scheme_sheet(index, scheme)
+        if sheet is None: continue
+        df = pd.read_excel(xls, sheet_name=sheet, header=None)
+        results[code] = parse_hdfc_sheet(df, month, year, sheet)
+    return results
 
-# --- HDFC ENGINE ---
-def fetch_hdfc(month, year):
+def download_first(urls):
+    for url in urls:
+        fh = http_client.download(url, timeout=15)
+        if fh is not None:
+            return fh
+    return None
+
+def _fetch_hdfc_master(month, year, sheet_codes):
+    """
+    One download + one index of the all-schemes workbook for every requested HDFC scheme.
+    Schemes it doesn't cover (or months it isn't published) fall back to per-scheme files.
+    """
+    schemes = {code: HDFC_EQUITY_SCHEMES[code] for code in sheet_codes}
+    results = {}
     try:
-        conf = FUND_CONFIG["HDFC Nifty 50 Index"]
-        month_num = datetime.datetime.strptime(month, "%B").month
-        last_day = calendar.monthrange(year, month_num)[1]
-        
-        # Calculate folder date (Next month logic)
-        date_obj = datetime.date(year, month_num, 1)
-        next_month = date_obj.replace(day=28) + datetime.timedelta(days=4)
-        folder_path = next_month.strftime("%Y-%m")
-        
-        filename = f"Monthly HDFC Nifty 50 Index Fund - {last_day} {month} {year}.xlsx"
-        url = f"{conf['base_url']}/{folder_path}/{filename.replace(' ', '%20')}"
+        if not negative_cache.is_missing("HDFC master", month, year):
+            print(f"   🔍 HDFC: Checking Master File...")
+            fh = download_first(hdfc_file_urls(hdfc_filename(HDFC_MASTER_FILENAME, month, year), month, year))
+            if fh is None:
+                negative_cache.record_missing("HDFC master", month, year)
+            else:
+                with fh:
+                    results = parse_indexed_workbook(fh, schemes, month, year)
+    except requests.RequestException: raise   # Outage or cancelled, not missing: caller retries
+    except Exception as e:
+        print(f"   ❌ Error in HDFC master {month} {year}: {e}")
 
-        resp = requests.get(url, headers=HEADERS, timeout=30)
-        if resp.status_code != 200: return None
-        
-        xls = pd.ExcelFile(BytesIO(resp.content))
-        target_df, header_row = None, None
-        
-        for sheet in xls.sheet_names:
-            df = pd.read_excel(xls, sheet_name=sheet, header=None)
-            if conf['fund_keyword'] in df.iloc[0:5].astype(str).to_string().lower():
-                target_df = df
-                for idx, row in df.iterrows():
-                    r_str = row.astype(str).str.cat(sep=" ").lower()
-                    if "isin" in r_str and "name" in r_str and "quantity" in r_str: header_row = idx; break
-                break
-        
-        if target_df is None or header_row is None: return None
-
-        target_df.columns = target_df.iloc[header_row]
-        df = target_df.iloc[header_row+1:].copy()
-        col_map = {}
-        for c in df.columns:
-            val = str(c).lower().strip()
-            if "isin" in val: col_map[c] = "ISIN"
-            elif "name" in val and "instrument" in val: col_map[c] = "Stock Name"
-            elif "quantity" in val: col_map[c] = f"Qty_{month}_{year}"
-        df = df.rename(columns=col_map)
-        
-        valid_rows = []
-        for _, row in df.iterrows():
-            isin = str(row.get("ISIN", "")).upper()
-            if isin.startswith("INE"):
-                try:
-                    qty = float(str(row.get(f"Qty_{month}_{year}", 0)).replace(",", ""))
-                    if qty > 0: valid_rows.append({"Stock Name": row["Stock Name"], "ISIN": isin, f"Qty_{month}_{year}": qty})
-                except: continue
-        return pd.DataFrame(valid_rows)
-    except: return None
\ No newline at end of file
+    for code, scheme in schemes.items():
+        if code in results or negative_cache.is_missing(scheme, month, year): continue
+        try:
+            fh = download_first(hdfc_file_urls(hdfc_filename(HDFC_SCHEME_FILENAME, month, year, scheme), month, year))
+            if fh is None:
+                negative_cache.record_missing(scheme, month, year)
+                continue
+            with fh:
+                results.update(parse_indexed_workbook(fh, {code: scheme}, month, year))
+        except requests.RequestException: raise   # Outage or cancelled, not missing: caller retries
+        except Exception as e:
+            print(f"   ❌ Error in {scheme} {month} {year}: {e}")
+    return {code: results.get(code) for code in sheet_codes}
+
+def fetch_hdfc_master(month, year, sheet_codes):
+    return cached_master("HDFC", month, year, sheet_codes, _fetch_hdfc_master)
+
+def fetch_hdfc_generic(fund_name, month, year):
+    code = FUND_CONFIG[fund_name]["sheet_code"]  # e.g., "NIFTY50"
+    return fetch_hdfc_master(month, year, [code])[code]
@@ -0,0 +1,127 @@
+# sector_flows.py
+import os
+import numpy as np
+import pandas as pd
+from config import FUND_CONFIG, SECTOR_FLOWS_FILE
+import periods
+import analysis
+import security_master
+import storage
+
+FLOW_COLUMNS = ["Fund", "Year", "Month", "Sector", "Stocks", "MarketValue", "Weight", "NetBuying"]
+
+# ===========================
+# PER FUND-MONTH AGGREGATE
+# ===========================
+def compute_fund_period(df, month, year, prev=None):
+    """
+    Sector rows for one fund-month: stocks held, market value, weight and net buying.
+    Net buying = change in quantity x this month's price (MarketValue / Qty), so price moves don't count as flows.
+    `prev` is the (month, year) to diff against, None for the first stored month.
+    """
+    qty_col = periods.qty_col(month, year)
+    qty = pd.to_numeric(df[qty_col], errors="coerce").fillna(0).to_numpy()
+    prev_qty = np.zeros_like(qty)
+    if prev is not None:
+        prev_qty = pd.to_numeric(df[periods.qty_col(*prev)], errors="coerce").fillna(0).to_numpy()
+
+    mv = _numeric(df, f"MarketValue_{month}_{year}")
+    nav = _numeric(df, f"NavPct_{month}_{year}")
+    price = np.divide(mv, qty, out=np.full_like(qty, np.nan, dtype=float), where=qty > 0)
+    if prev is not None:
+        # Exits have no current price; fall back to last month's
+        prev_mv = _numeric(df, f"MarketValue_{prev[0]}_{prev[1]}")
+        prev_price = np.divide(prev_mv, prev_qty, out=np.full_like(qty, np.nan, dtype=float), where=prev_qty > 0)
+        price = np.where(np.isnan(price), prev_price, price)
+
+    frame = pd.DataFrame({
+        "Sector": security_master.get_master().sector_of(df["ISIN"]).to_numpy(),
+        "Held": qty > 0,
+        "MarketValue": np.where(qty > 0, mv, 0.0),
+        "NavPct": np.where(qty > 0, nav, 0.0),
+        "NetBuying": (qty - prev_qty) * price if prev is not None else np.nan
+    })
+    frame = frame[frame["Held"] | (prev_qty > 0)]
+    out = frame.groupby("Sector", as_index=False).agg(
+        Stocks=("Held", "sum"), MarketValue=("MarketValue", lambda s: s.sum(min_count=1)),
+        NavPct=("NavPct", "sum"), NetBuying=("NetBuying", lambda s: s.sum(min_count=1))
+    )
+    total_mv = out["MarketValue"].sum()
+    out["Weight"] = out["MarketValue"] / total_mv if total_mv > 0 else out["NavPct"] / 100   # NavPct is in percent
+    out["Year"], out["Month"] = year, month
+    return out
+
+def _numeric(df, col):
+    if col not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+
+# ===========================
+# INCREMENTAL STORE
+# ===========================
+def load_flows():
+    if os.path.exists(SECTOR_FLOWS_FILE):
+        return pd.read_csv(SECTOR_FLOWS_FILE)
+    return pd.DataFrame(columns=FLOW_COLUMNS)
+
+def update_fund(fund_name, df, new_periods=None):
+    """
+    Recomputes only the given fund-months (plus the month after each, whose net buying depends on it).
+    With new_periods=None every stored month of the fund is rebuilt.
+    """
+    qty_cols = periods.sort_period_cols([c for c in df.columns if str(c).startswith("Qty_")])
+    stored = [periods.parse_period_col(c) for c in qty_cols]
+    todo = set(stored) if new_periods is None else periods.with_successors(stored, new_periods)
+    if not todo:
+        return load_flows()
+
+    rows = []
+    for i, p in enumerate(stored):
+        if p in todo:
+            rows.append(compute_fund_period(df, p[0], p[1], stored[i - 1] if i > 0 else None))
+
+    fresh = pd.concat(rows, ignore_index=True)
+    fresh["Fund"] = fund_name
+    # Every fund shares one file: read-modify-write under its lock
+    with storage.file_lock(SECTOR_FLOWS_FILE):
+        flows = load_flows()
+        if not flows.empty:
+            stale = [f == fund_name and (m, int(y)) in todo for f, m, y in zip(flows["Fund"], flows["Month"], flows["Year"])]
+            flows = flows[~np.array(stale)]
+        flows = pd.concat([flows, fresh[FLOW_COLUMNS]], ignore_index=True)
+        storage.write_csv(flows, SECTOR_FLOWS_FILE)
+    return flows
+
+def rebuild():
+    """Full recompute for every fund on disk, e.g. after editing the sector map"""
+    if os.path.exists(SECTOR_FLOWS_FILE):
+        os.remove(SECTOR_FLOWS_FILE)
+    for fund_name in FUND_CONFIG:
+        df = analysis.load_fund_data(fund_name)
+        if df is not None and "ISIN" in df.columns:
+            update_fund(fund_name, df)
+
+# ===========================
+# READ SIDE
+# ===========================
+def sector_view(fund_name=None):
+    """Sector x month table for one fund, or summed across all funds (weights re-based on the combined value)"""
+    flows = load_flows()
+    if fund_name is not None:
+        flows = flows[flows["Fund"] == fund_name]
+    if flows.empty:
+        return flows
+    out = flows.groupby(["Year", "Month", "Sector"], as_index=False).agg(
+        Stocks=("Stocks", "sum"), MarketValue=("MarketValue", "sum"),
+        Weight=("Weight", "sum"), NetBuying=("NetBuying", lambda s: s.sum(min_count=1))
+    )
+    if fund_name is None:
+        totals = out.groupby(["Year", "Month"])["MarketValue"].transform("sum")
+        out["Weight"] = np.where(totals > 0, out["MarketValue"] / totals, np.nan)
+    out["Period"] = out["Month"].str[:3] + " " + out["Year"].astype(str)
+    out["_key"] = [periods.period_key(m, int(y)) for m, y in zip(out["Month"], out["Year"])]
+    return out.sort_values(["_key", "MarketValue"], ascending=[True, False]).drop(columns=["_key"])
+
+if __name__ == "__main__":
+    rebuild()
+    print(sector_view().tail(20).to_string(index=False))
@@ -0,0 +1,140 @@
+# security_master.py
+import os
+import re
+import threading
+import pandas as pd
+import storage
+from config import SECURITY_MASTER_FILE, SECURITY_ALIASES_FILE, SECTOR_MAP_FILE, UNCLASSIFIED_SECTOR
+
+MASTER_COLUMNS = ["ISIN", "Name", "Sector"]
+ALIAS_COLUMNS = ["ISIN", "AMC", "Alias"]
+
+# ===========================
+# NAME CLEANUP (ONCE PER ISIN)
+# ===========================
+_SUFFIX = re.compile(r'\s+(Limited|Ltd\.?)\s*$', re.IGNORECASE)
+_SPECIAL = re.compile(r'[^\w\s\-&]')
+_SPACES = re.compile(r'\s+')
+
+def canonical_name(raw):
+    """Display name for a security: drops Ltd/Limited and punctuation, collapses whitespace"""
+    name = _SUFFIX.sub('', str(raw).strip())
+    # Remove special characters but keep alphanumeric, spaces, hyphens, and ampersand
+    name = _SPECIAL.sub('', name)
+    return _SPACES.sub(' ', name).strip()
+
+# ===========================
+# MASTER TABLE
+# ===========================
+class SecurityMaster:
+    """
+    ISIN -> canonical name and sector, plus every raw name each AMC has used for it.
+    Updated incrementally at sync time; display and grouping are then a dictionary lookup.
+    Sectors come from the disclosures' Industry column, overridden by SECTOR_MAP_FILE.
+    """
+    def __init__(self, master_file=SECURITY_MASTER_FILE, aliases_file=SECURITY_ALIASES_FILE):
+        self.master_file = master_file
+        self.aliases_file = aliases_file
+        self.names = {}
+        self.sectors = {}
+        self.sector_overrides = {}
+        self.aliases = pd.DataFrame(columns=ALIAS_COLUMNS)
+        self._lock = threading.Lock()
+        self._mtime = None
+
+    def load(self):
+        if os.path.exists(self.master_file):
+            master = pd.read_csv(self.master_file, dtype=str).fillna("")
+            self.names = dict(zip(master["ISIN"], master["Name"]))
+            if "Sector" in master.columns:
+                self.sectors = {i: sec for i, sec in zip(master["ISIN"], master["Sector"]) if sec}
+            self._mtime = os.path.getmtime(self.master_file)
+        if os.path.exists(self.aliases_file):
+            self.aliases = pd.read_csv(self.aliases_file, dtype=str).fillna("")
+        if os.path.exists(SECTOR_MAP_FILE):
+            overrides = pd.read_csv(SECTOR_MAP_FILE, dtype=str).dropna()
+            self.sector_overrides = dict(zip(overrides["ISIN"].str.strip().str.upper(), overrides["Sector"].str.strip()))
+        return self
+
+    def is_stale(self):
+        """True if another process rewrote the master file since we loaded it"""
+        return os.path.exists(self.master_file) and os.path.getmtime(self.master_file) != self._mtime
+
+    def save(self):
+        master = pd.DataFrame({"ISIN": list(self.names.keys()), "Name": list(self.names.values())})
+        master["Sector"] = master["ISIN"].map(self.sectors).fillna("")
+        storage.write_csv(self.aliases, self.aliases_file)
+        storage.write_csv(master[MASTER_COLUMNS], self.master_file)
+        self._mtime = os.path.getmtime(self.master_file)
+
+    def update(self, df, amc_code=None):
+        """
+        Registers new ISINs and unseen raw names from a parsed holdings frame, saves if anything changed.
+        Sync path only. Re-reads both files under the master file's lock first, so concurrent syncs
+        (threads or processes) add to each other's entries instead of overwriting them.
+        """
+        if df is None or "ISIN" not in df.columns or "Stock Name" not in df.columns:
+            return 0
+        seen = df[["ISIN", "Stock Name"]].dropna().astype(str)
+        seen["ISIN"] = seen["ISIN"].str.strip().str.upper()
+        seen = seen[seen["ISIN"] != ""].drop_duplicates()
+
+        with self._lock, storage.file_lock(self.master_file):
+            self.load()
+            new = seen[~seen["ISIN"].isin(self.names.keys())].drop_duplicates("ISIN")
+            for isin, raw in zip(new["ISIN"], new["Stock Name"]):
+                self.names[isin] = canonical_name(raw)
+
+            classified = 0
+            if "Industry" in df.columns:
+                industries = df[["ISIN", "Industry"]].dropna().astype(str)
+                industries["ISIN"] = industries["ISIN"].str.strip().str.upper()
+                industries = industries[~industries["ISIN"].isin(self.sectors.keys()) & (industries["Industry"].str.strip() != "")]
+                for isin, industry in zip(industries["ISIN"], industries["Industry"]):
+                    self.sectors[isin] = industry.strip()
+                classified = len(industries)
+
+            aliases = pd.DataFrame({"ISIN": seen["ISIN"], "AMC": amc_code or "", "Alias": seen["Stock Name"].str.strip()})
+            fresh = aliases.drop_duplicates().merge(self.aliases.drop_duplicates(), on=ALIAS_COLUMNS, how="left", indicator=True)
+            fresh = fresh[fresh["_merge"] == "left_only"].drop(columns=["_merge"])
+            if not fresh.empty:
+                self.aliases = pd.concat([self.aliases, fresh], ignore_index=True)
+
+            if len(new) or classified or not fresh.empty:
+                self.save()
+        return len(new)
+
+    def name_of(self, isins, fallback=None):
+        """Canonical names for a column of ISINs; unknown ISINs keep `fallback` (or the ISIN)"""
+        isins = pd.Series(isins).astype(str).str.strip().str.upper()
+        names = isins.map(self.names).astype(object)   # All-NaN (float) when none are known yet
+        missing = names.isna()
+        if fallback is not None and missing.any():
+            # Regex cleanup only for ISINs the master doesn't know yet
+            fallback = pd.Series(fallback, index=isins.index)[missing]
+            names[missing] = fallback.astype(str).map(canonical_name)
+        return names.fillna(isins)
+
+    def sector_of(self, isins):
+        """Sector per ISIN: manual override, else the AMC-reported industry, else Unclassified"""
+        isins = pd.Series(isins).astype(str).str.strip().str.upper()
+        sectors = isins.map(self.sector_overrides).fillna(isins.map(self.sectors))
+        return sectors.fillna(UNCLASSIFIED_SECTOR)
+
+    def apply(self, df):
+        """Sets Stock Name from the master (a lookup only: ISINs it hasn't seen get their cleaned raw name)"""
+        if "ISIN" not in df.columns:
+            return df
+        df["Stock Name"] = self.name_of(df["ISIN"], df.get("Stock Name")).to_numpy()
+        return df
+
+# --- SHARED INSTANCE ---
+_MASTER = None
+_MASTER_LOCK = threading.Lock()
+
+def get_master():
+    global _MASTER
+    with _MASTER_LOCK:
+        if _MASTER is None or _MASTER.is_stale():
+            _MASTER = SecurityMaster().load()
+        return _MASTER
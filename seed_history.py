@@ -1,12 +1,12 @@
 import pandas as pd
-import requests
 from bs4 import BeautifulSoup
-from io import BytesIO
 import re
 import os
-import time
 import xlsxwriter
+import http_client
+import storage
 
+# Single-fund PPFAS seeding script. For multi-year jobs across funds or AMCs use backfill.py.
 # --- CONFIGURATION ---
 DISCLOSURE_PAGE_URL = "https://amc.ppfas.com/downloads/portfolio-disclosure/"
 OUTPUT_FILE = "PPFCF_Portfolio_Dashboard_2025.xlsx"
@@ -16,17 +16,13 @@ MONTHS = [
     "July", "August", "September", "October", "November", "December"
 ]
 
-HEADERS = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-}
-
 # ===========================
 # 1. URL FINDER
 # ===========================
 def get_dynamic_url(month, year):
     print(f"🔎 Scanning for: {month} {year}...")
     try:
-        response = requests.get(DISCLOSURE_PAGE_URL, headers=HEADERS, timeout=15)
+        response = http_client.get(DISCLOSURE_PAGE_URL)
         soup = BeautifulSoup(response.content, 'html.parser')
         links = soup.find_all('a', href=True)
         
@@ -57,13 +53,18 @@ def fetch_month_data(month, year):
         return None
     
     try:
-        resp = requests.get(url, headers=HEADERS, timeout=30)
+        file_data = http_client.download(url)
+        if file_data is None:
+            print(f"   ⚠️ Download failed for {month} {year}")
+            return None
         
         # Load Raw Data (No Header assumption)
-        try: 
-            all_sheets = pd.read_excel(BytesIO(resp.content), header=None, sheet_name=None, engine='openpyxl')
-        except: 
-            all_sheets = pd.read_excel(BytesIO(resp.content), header=None, sheet_name=None, engine='xlrd')
+        with file_data:
+            try: 
+                all_sheets = pd.read_excel(file_data, header=None, sheet_name=None, engine='openpyxl')
+            except: 
+                file_data.seek(0)
+                all_sheets = pd.read_excel(file_data, header=None, sheet_name=None, engine='xlrd')
 
         # We will merge ALL sheets into one big search space to be safe
         full_df = pd.concat(all_sheets.values(), ignore_index=True)
@@ -179,13 +180,14 @@ def build_portfolio_history_data():
                             master_df[col_name] = master_df[f"{col_name}_new"]
                             master_df.drop(columns=[f"{col_name}_new"], inplace=True)
                     
+                    # Saved after every month, so a crash loses at most the month in flight
+                    # and a rerun resumes from the first month not on disk
+                    storage.write_excel(master_df, OUTPUT_FILE)
                     data_updated = True
                 except Exception as e: 
                     print(f"   ❌ Merge Failed: {e}")
-                time.sleep(0.5)
 
     if data_updated:
-        master_df.to_excel(OUTPUT_FILE, index=False)
         print("✅ Data collection complete.")
         return True
     else:
@@ -198,55 +200,59 @@ def build_portfolio_history_data():
 def create_dashboard_visuals(filename):
     print("\n🎨 Generating Visual Dashboard...")
     try:
-        df = pd.read_excel(filename)
-        qty_cols = [c for c in df.columns if c.startswith("Qty_")]
-        for col in qty_cols: df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-        latest_col = qty_cols[-1] if qty_cols else None
+        # Rendered to a temp file and swapped in, so the app never reads a half-written workbook
+        with storage.file_lock(filename), storage.atomic_path(filename) as tmp:
+            df = pd.read_excel(filename)
+            qty_cols = [c for c in df.columns if c.startswith("Qty_")]
+            for col in qty_cols: df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+            latest_col = qty_cols[-1] if qty_cols else None
         
-        writer = pd.ExcelWriter(filename, engine='xlsxwriter')
-        workbook = writer.book
-
-        sheet_data = 'Portfolio History'
-        df.to_excel(writer, sheet_name=sheet_data, index=False)
-        ws_data = writer.sheets[sheet_data]
-        if qty_cols:
-            first_idx = df.columns.get_loc(qty_cols[0])
-            last_idx = df.columns.get_loc(qty_cols[-1])
-            ws_data.conditional_format(1, first_idx, len(df)+1, last_idx, {
-                'type': '3_color_scale', 'min_color': "#FFFFFF", 'mid_color': "#EBF1DE", 'max_color': "#63C384"
-            })
-            ws_data.freeze_panes(1, 2)
-            ws_data.set_column(1, 1, 40)
-
-        if latest_col:
-            top_holdings = df[['Stock Name', latest_col]].sort_values(by=latest_col, ascending=False).head(10)
-            top_holdings = top_holdings[top_holdings[latest_col] > 0]
-            sheet_dash = 'Dashboard'
-            ws_dash = workbook.add_worksheet(sheet_dash)
-            header_fmt = workbook.add_format({'bold': True, 'bg_color': '#D7E4BC', 'border': 1})
+            writer = pd.ExcelWriter(tmp, engine='xlsxwriter')
+            workbook = writer.book
+
+            sheet_data = 'Portfolio History'
+            df.to_excel(writer, sheet_name=sheet_data, index=False)
+            ws_data = writer.sheets[sheet_data]
+            if qty_cols:
+                first_idx = df.columns.get_loc(qty_cols[0])
+                last_idx = df.columns.get_loc(qty_cols[-1])
+                ws_data.conditional_format(1, first_idx, len(df)+1, last_idx, {
+                    'type': '3_color_scale', 'min_color': "#FFFFFF", 'mid_color': "#EBF1DE", 'max_color': "#63C384"
+                })
+                ws_data.freeze_panes(1, 2)
+                ws_data.set_column(1, 1, 40)
+
+            if latest_col:
+                top_holdings = df[['Stock Name', latest_col]].sort_values(by=latest_col, ascending=False).head(10)
+                top_holdings = top_holdings[top_holdings[latest_col] > 0]
+                sheet_dash = 'Dashboard'
+                ws_dash = workbook.add_worksheet(sheet_dash)
+                header_fmt = workbook.add_format({'bold': True, 'bg_color': '#D7E4BC', 'border': 1})
             
-            ws_dash.write_string(0, 0, "Top 10 Holdings", header_fmt)
-            ws_dash.write_row(1, 0, top_holdings.columns, header_fmt)
-            for i, row in enumerate(top_holdings.values): ws_dash.write_row(i + 2, 0, row)
-
-            chart = workbook.add_chart({'type': 'pie'})
-            chart.add_series({
-                'name': f'Top 10 Holdings ({latest_col})',
-                'categories': [sheet_dash, 2, 0, 1 + len(top_holdings), 0],
-                'values':     [sheet_dash, 2, 1, 1 + len(top_holdings), 1],
-                'data_labels': {'value': False, 'percentage': True, 'position': 'outside'},
-            })
-            chart.set_title({'name': f"Top 10 Holdings\n(as of {latest_col.replace('Qty_', '').replace('_', ' ')})"})
-            chart.set_size({'width': 600, 'height': 450})
-            ws_dash.insert_chart('D2', chart)
-
-        writer.close()
+                ws_dash.write_string(0, 0, "Top 10 Holdings", header_fmt)
+                ws_dash.write_row(1, 0, top_holdings.columns, header_fmt)
+                for i, row in enumerate(top_holdings.values): ws_dash.write_row(i + 2, 0, row)
+
+                chart = workbook.add_chart({'type': 'pie'})
+                chart.add_series({
+                    'name': f'Top 10 Holdings ({latest_col})',
+                    'categories': [sheet_dash, 2, 0, 1 + len(top_holdings), 0],
+                    'values':     [sheet_dash, 2, 1, 1 + len(top_holdings), 1],
+                    'data_labels': {'value': False, 'percentage': True, 'position': 'outside'},
+                })
+                chart.set_title({'name': f"Top 10 Holdings\n(as of {latest_col.replace('Qty_', '').replace('_', ' ')})"})
+                chart.set_size({'width': 600, 'height': 450})
+                ws_dash.insert_chart('D2', chart)
+
+            writer.close()
         print(f"🎉 Dashboard Updated: {filename}")
     except PermissionError:
         print(f"⚠️  ERROR: Close '{filename}' so I can save the dashboard!")
 
 if __name__ == "__main__":
-    if build_portfolio_history_data():
-        create_dashboard_visuals(OUTPUT_FILE)
-    elif os.path.exists(OUTPUT_FILE):
-        create_dashboard_visuals(OUTPUT_FILE)
\ No newline at end of file
+    # Same file the dashboard syncs into: hold its lock for the whole run
+    with storage.file_lock(OUTPUT_FILE):
+        if build_portfolio_history_data():
+            create_dashboard_visuals(OUTPUT_FILE)
+        elif os.path.exists(OUTPUT_FILE):
+            create_dashboard_visuals(OUTPUT_FILE)
\ No newline at end of file
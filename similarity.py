@@ -0,0 +1,178 @@
+# similarity.py
+import argparse
+import hashlib
+import threading
+import numpy as np
+import pandas as pd
+from config import (FUND_CONFIG, SIMILARITY_NUM_PERM, SIMILARITY_BANDS, SIMILARITY_SEED,
+                    SIMILARITY_CLOSET_JACCARD, INDEX_FUND_KEYWORDS)
+import periods
+import engine
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+SIMILAR_COLUMNS = ["Fund", "Jaccard", "Shared", "Holdings"]
+CLOSET_COLUMNS = ["Fund", "Period", "Index Fund", "Jaccard", "Shared", "Holdings"]
+
+def is_index_fund(fund_name):
+    return any(k.lower() in fund_name.lower() for k in INDEX_FUND_KEYWORDS)
+
+# ===========================
+# MINHASH
+# ===========================
+_HASHES = {}
+
+def isin_hashes(isins):
+    """Stable 32-bit hash per ISIN (memoized: the ISIN universe is small and shared by every fund)"""
+    out = np.empty(len(isins), dtype=np.uint64)
+    for i, isin in enumerate(isins):
+        h = _HASHES.get(isin)
+        if h is None:
+            h = _HASHES[isin] = int.from_bytes(hashlib.md5(isin.encode()).digest()[:4], "little")
+        out[i] = h
+    return out
+
+class MinHasher:
+    """num_perm universal hashes (a*x + b) mod p; the signature is each one's minimum over the set"""
+    def __init__(self, num_perm=SIMILARITY_NUM_PERM, seed=SIMILARITY_SEED):
+        rng = np.random.default_rng(seed)
+        # a, x < 2^32 keeps a*x + b inside uint64
+        self.a = rng.integers(1, _MAX_HASH, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, _MAX_HASH, num_perm, dtype=np.uint64)
+
+    def signature(self, hashes):
+        return (((hashes[:, None] * self.a + self.b) % _PRIME) & _MAX_HASH).min(axis=0).astype(np.uint32)
+
+def jaccard(a, b):
+    """Exact Jaccard of two sorted unique ISIN arrays -> (jaccard, shared)"""
+    shared = len(np.intersect1d(a, b, assume_unique=True))
+    union = len(a) + len(b) - shared
+    return (shared / union if union else 0.0), shared
+
+# ===========================
+# LSH INDEX
+# ===========================
+class SimilarityIndex:
+    """
+    MinHash signature of every fund's ISIN set per stored period, banded into LSH buckets.
+    A query only reranks the funds sharing a bucket with it (exact Jaccard), not every fund.
+    Kept in step with the holdings engine: a fund is re-signed only when its data version changes.
+    """
+    def __init__(self, num_perm=SIMILARITY_NUM_PERM, bands=SIMILARITY_BANDS):
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._sets = {}       # (fund, period) -> sorted ISIN array
+        self._keys = {}       # (fund, period) -> band keys
+        self._buckets = {}    # period -> [{band key: set of funds}] per band
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def _band_keys(self, sig):
+        return [sig[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def _remove(self, fund_name):
+        for key in [k for k in self._sets if k[0] == fund_name]:
+            period = key[1]
+            for band, bkey in enumerate(self._keys.pop(key)):
+                bucket = self._buckets[period][band].get(bkey)
+                bucket.discard(fund_name)
+                if not bucket: del self._buckets[period][band][bkey]
+            del self._sets[key]
+
+    def _add(self, fund_name, period, isins):
+        if not len(isins): return
+        keys = self._band_keys(self.hasher.signature(isin_hashes(isins)))
+        tables = self._buckets.setdefault(period, [{} for _ in range(self.bands)])
+        for band, bkey in enumerate(keys):
+            tables[band].setdefault(bkey, set()).add(fund_name)
+        self._sets[(fund_name, period)] = isins
+        self._keys[(fund_name, period)] = keys
+
+    def refresh(self, fund_names=None):
+        """Re-signs funds whose data changed since they were indexed, returns them"""
+        eng = engine.get_engine()
+        changed = []
+        with self._lock:
+            for fund_name in fund_names or FUND_CONFIG.keys():
+                version = eng.fund_version(fund_name)
+                if fund_name in self._versions and self._versions[fund_name] == version: continue
+                self._remove(fund_name)
+                df = eng.frame(fund_name)
+                for month, year in eng.periods(fund_name):
+                    held = df.loc[df[periods.qty_col(month, year)] > 0, "ISIN"].astype(str)
+                    self._add(fund_name, (month, year), np.unique(held.to_numpy()))
+                self._versions[fund_name] = version
+                changed.append(fund_name)
+        return changed
+
+    def candidates(self, fund_name, period):
+        """Funds sharing at least one LSH bucket with the fund at this period"""
+        keys = self._keys.get((fund_name, period))
+        if keys is None:
+            return set()
+        tables = self._buckets[period]
+        found = set().union(*(tables[band].get(bkey, ()) for band, bkey in enumerate(keys)))
+        found.discard(fund_name)
+        return found
+
+    def _rank(self, fund_name, period, others):
+        mine = self._sets[(fund_name, period)]
+        rows = []
+        for other in others:
+            score, shared = jaccard(mine, self._sets[(other, period)])
+            rows.append({"Fund": other, "Jaccard": round(score, 4), "Shared": shared, "Holdings": len(self._sets[(other, period)])})
+        return pd.DataFrame(rows, columns=SIMILAR_COLUMNS).sort_values("Jaccard", ascending=False, ignore_index=True)
+
+    def similar(self, fund_name, k=10, period=None):
+        """Top-k funds by exact Jaccard of ISIN sets at a period (default: the fund's latest), among LSH candidates"""
+        self.refresh()
+        period = period or engine.get_engine().latest_period(fund_name)
+        with self._lock:
+            if (fund_name, period) not in self._sets:
+                return pd.DataFrame(columns=SIMILAR_COLUMNS)
+            return self._rank(fund_name, period, self.candidates(fund_name, period)).head(k)
+
+    def closet_indexers(self, threshold=SIMILARITY_CLOSET_JACCARD):
+        """
+        Active funds whose latest holdings nearly match an index fund's at the same period:
+        each one's closest index fund by exact Jaccard, at or above the threshold.
+        """
+        self.refresh()
+        eng = engine.get_engine()
+        rows = []
+        with self._lock:
+            for fund_name in FUND_CONFIG:
+                if is_index_fund(fund_name): continue
+                period = eng.latest_period(fund_name)
+                if (fund_name, period) not in self._sets: continue
+                index_funds = [f for f in self.candidates(fund_name, period) if is_index_fund(f)]
+                ranked = self._rank(fund_name, period, index_funds)
+                if ranked.empty or ranked["Jaccard"].iloc[0] < threshold: continue
+                best = ranked.iloc[0]
+                rows.append({"Fund": fund_name, "Period": f"{period[0]} {period[1]}", "Index Fund": best["Fund"],
+                             "Jaccard": best["Jaccard"], "Shared": best["Shared"], "Holdings": len(self._sets[(fund_name, period)])})
+        return pd.DataFrame(rows, columns=CLOSET_COLUMNS).sort_values("Jaccard", ascending=False, ignore_index=True)
+
+# --- SHARED INSTANCE ---
+_INDEX = None
+_INDEX_LOCK = threading.Lock()
+
+def get_index():
+    global _INDEX
+    with _INDEX_LOCK:
+        if _INDEX is None:
+            _INDEX = SimilarityIndex()
+        return _INDEX
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Funds most like a given fund, and likely closet indexers.")
+    parser.add_argument("fund", nargs="?", help="fund to find look-alikes for; omit to list closet indexers")
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    index = get_index()
+    if args.fund:
+        print(index.similar(args.fund, args.k).to_string(index=False))
+    else:
+        print(index.closet_indexers().to_string(index=False))
@@ -0,0 +1,79 @@
+# storage.py
+import contextlib
+import os
+import threading
+from config import FUND_CONFIG
+
+try:
+    import fcntl  # POSIX only; elsewhere locks are per-process
+except ImportError:
+    fcntl = None
+
+# ===========================
+# LOCKS
+# ===========================
+class FileLock:
+    """
+    Exclusive lock on a data file, held across threads and processes (via <file>.lock).
+    Re-entrant within a thread, so sync_fund can hold it while commit_results takes it again.
+    """
+    def __init__(self, path):
+        self.lock_path = f"{path}.lock"
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._fh = None
+
+    def __enter__(self):
+        self._lock.acquire()
+        if self._depth == 0 and fcntl is not None:
+            os.makedirs(os.path.dirname(self.lock_path) or ".", exist_ok=True)
+            self._fh = open(self.lock_path, "a")
+            fcntl.flock(self._fh, fcntl.LOCK_EX)
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        self._depth -= 1
+        if self._depth == 0 and self._fh is not None:
+            fcntl.flock(self._fh, fcntl.LOCK_UN)
+            self._fh.close()
+            self._fh = None
+        self._lock.release()
+
+_LOCKS = {}
+_LOCKS_GUARD = threading.Lock()
+
+def file_lock(path):
+    with _LOCKS_GUARD:
+        return _LOCKS.setdefault(os.path.abspath(path), FileLock(path))
+
+def fund_lock(fund_name):
+    return file_lock(FUND_CONFIG[fund_name]["file"])
+
+# ===========================
+# ATOMIC WRITES
+# ===========================
+@contextlib.contextmanager
+def atomic_path(path):
+    """
+    Yields a temp path next to `path`; on success it replaces `path` in one rename,
+    so readers see either the old file or the new one, never a half-written one.
+    """
+    directory, name = os.path.split(path)
+    os.makedirs(directory or ".", exist_ok=True)
+    root, ext = os.path.splitext(name)
+    tmp = os.path.join(directory, f".{root}.{os.getpid()}.{threading.get_ident()}.tmp{ext}")
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+def write_excel(df, path, **kwargs):
+    with atomic_path(path) as tmp:
+        df.to_excel(tmp, index=False, **kwargs)
+
+def write_csv(df, path):
+    with atomic_path(path) as tmp:
+        df.to_csv(tmp, index=False)
@@ -0,0 +1,132 @@
+# sync.py
+import contextlib
+import os
+import pandas as pd
+from config import FUND_CONFIG
+import periods
+import engines
+import analysis
+import security_master
+import sector_flows
+import leaderboard
+import quality
+import storage
+import pending
+import http_client
+
+# ===========================
+# MERGE
+# ===========================
+def load_master(fund_name):
+    output_file = FUND_CONFIG[fund_name]["file"]
+    if os.path.exists(output_file):
+        master_df = pd.read_excel(output_file)
+        if "ISIN" in master_df.columns:
+            master_df["ISIN"] = master_df["ISIN"].astype(str).str.strip()
+        return master_df
+    return pd.DataFrame(columns=["ISIN", "Stock Name"])
+
+def merge_period(master_df, new_df, month, year):
+    """Outer-joins one month of holdings onto the fund's history on ISIN"""
+    new_df["ISIN"] = new_df["ISIN"].astype(str).str.strip()
+    master_df = pd.merge(master_df, new_df, on="ISIN", how="outer", suffixes=("", "_new"))
+
+    # Handle Stock Name
+    if "Stock Name_new" in master_df.columns:
+        master_df["Stock Name"] = master_df["Stock Name"].fillna(master_df["Stock Name_new"])
+        master_df.drop(columns=["Stock Name_new"], inplace=True)
+
+    # Handle Qty / MarketValue / NavPct columns
+    for prefix in ["Qty", "MarketValue", "NavPct"]:
+        col = f"{prefix}_{month}_{year}"
+        if f"{col}_new" in master_df.columns:
+            master_df[col] = master_df[f"{col}_new"]
+            master_df.drop(columns=[f"{col}_new"], inplace=True)
+    return master_df
+
+def order_columns(master_df):
+    """Identity columns first, then each period's Qty/MarketValue/NavPct oldest first (backfills arrive out of order)"""
+    prefixes = ["Qty", "MarketValue", "NavPct"]
+    period_cols = [c for c in master_df.columns if periods.parse_period_col(c)]
+    period_cols.sort(key=lambda c: (periods.period_key(*periods.parse_period_col(c)), prefixes.index(str(c).split("_")[0])
+                                    if str(c).split("_")[0] in prefixes else len(prefixes)))
+    other = [c for c in master_df.columns if c not in period_cols]
+    return master_df[other + period_cols]
+
+# ===========================
+# SYNC
+# ===========================
+def commit_results(fund_name, results, master_df=None):
+    """
+    Merges fetched months into a fund's history and saves it once.
+    results is a list of (month, year, new_df or None); returns (master_df, added periods).
+    """
+    conf = FUND_CONFIG[fund_name]
+    output_file = conf["file"]
+    # Held from read to rename: another session's commit can't slip in between and be overwritten
+    with storage.fund_lock(fund_name):
+        # Months stored as fractions by earlier versions are rewritten in percent with this save
+        master_df = analysis.percent_nav(master_df if master_df is not None else load_master(fund_name), fund_name)
+        added = []
+        reports = []
+
+        for month, year, new_df in results:
+            if new_df is None or new_df.empty: continue
+            if periods.qty_col(month, year) in master_df.columns: continue
+            new_df = analysis.percent_nav(new_df, fund_name)
+            # Checked as parsed, before the merge hides duplicates and bad rows
+            reports.append(quality.check(fund_name, new_df, month, year, quality.previous_prices(master_df, month, year)))
+            security_master.get_master().update(new_df, conf.get("amc_code"))
+            master_df = merge_period(master_df, new_df.drop(columns=["Industry"], errors="ignore"), month, year)
+            added.append((month, year))
+
+        if added or not os.path.exists(output_file):
+            master = security_master.get_master()
+            # Registers ISINs stored before the master existed, so reads never have to
+            unknown = master_df[~master_df["ISIN"].isin(master.names.keys())] if "ISIN" in master_df.columns else None
+            if unknown is not None and len(unknown): master.update(unknown, conf.get("amc_code"))
+            master_df = order_columns(master.apply(master_df))
+            storage.write_excel(master_df, output_file)
+    # Every month here finished fetching (found or not): none of them is pending any more
+    pending.resolve(fund_name, [(month, year) for month, year, _ in results])
+    if added:
+        quality.record(reports)
+        sector_flows.update_fund(fund_name, master_df, added)
+        leaderboard.update_fund(fund_name, master_df, added)
+    return master_df, added
+
+def sync_fund(fund_name, period_list=None, on_progress=None, on_result=None, deadline=None):
+    """
+    Fetches every missing period for a fund and saves the merged history.
+    UI-agnostic: the Streamlit page and the background scheduler both call this.
+    Missing periods are fetched in parallel through the fund's AMC engine.
+    on_progress(done, total, month, year) and on_result(month, year, found) are optional hooks,
+    called on this thread as each period arrives.
+    Single-flight: a second sync of the same fund (any session or process) waits for the first,
+    then re-reads the file and only fetches what is still missing.
+    deadline: seconds for the whole sync. Months still downloading then are cancelled, the finished
+    ones are saved, and the rest are recorded in pending.py for the next sync or the scheduler.
+    """
+    # Months an earlier sync left pending go first
+    deferred = pending.periods_for(fund_name)
+    period_list = deferred + [p for p in period_list or periods.tracked_periods() if p not in deferred]
+    engine = engines.engine_for(fund_name)
+    scheme = engine.scheme_of(fund_name)
+    with storage.fund_lock(fund_name):
+        master_df = load_master(fund_name)
+        missing = [(m, y) for m, y in period_list if periods.qty_col(m, y) not in master_df.columns]
+        # Pending months another sync has stored meanwhile
+        pending.resolve(fund_name, [p for p in deferred if p not in missing])
+        results = []
+
+        def on_period(month, year, parsed):
+            new_df = parsed.get(scheme)
+            results.append((month, year, new_df))
+            if on_result: on_result(month, year, new_df is not None)
+            if on_progress: on_progress(len(results), len(missing), month, year)
+
+        with http_client.budget(deadline) if deadline else contextlib.nullcontext():
+            engine.fetch_many(missing, [scheme], on_period)
+        finished = {(m, y) for m, y, _ in results}
+        pending.add(fund_name, [p for p in missing if p not in finished])
+        return commit_results(fund_name, results, master_df)
@@ -0,0 +1,13 @@
+# tests/conftest.py
+import os
+import sys
+import pytest
+
+# The app's modules live at the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """Each test runs in its own directory, so the relative data/ paths never touch the repo"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
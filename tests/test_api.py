@@ -0,0 +1,116 @@
+# tests/test_api.py
+import gzip
+import http.client
+import json
+import threading
+from http.server import ThreadingHTTPServer
+import pandas as pd
+import pytest
+import api
+import engine
+import flows
+
+FUND, OTHER = "SBI Contra Fund", "SBI Midcap Fund"
+
+class FakeEngine:
+    """Fixed holdings per fund; bump() plays the part of a sync changing a fund's file"""
+    def __init__(self):
+        self.versions = {FUND: 1, OTHER: 1}
+        self.builds = 0
+        self.rows = 3
+
+    def bump(self, fund_name):
+        self.versions[fund_name] += 1
+
+    def version(self, fund_names=None):
+        return "-".join(f"{self.versions[f]}" for f in (fund_names or sorted(self.versions)))
+
+    def latest_period(self, fund_name):
+        return ("May", 2025)
+
+    def holdings(self, fund_name, month, year):
+        self.builds += 1
+        return pd.DataFrame({"ISIN": [f"INE{i:09d}" for i in range(self.rows)], "Qty": 1.0})
+
+    def flow_matrix(self, fund_name):
+        df = pd.DataFrame({
+            "Stock Name": ["Alpha", "Beta"], "ISIN": ["INE000000001", "INE000000002"],
+            "Qty_April_2025": [10, 0], "Qty_May_2025": [15, 5]
+        })
+        return flows.compute(df)
+
+@pytest.fixture
+def server(monkeypatch):
+    fake = FakeEngine()
+    monkeypatch.setattr(engine, "get_engine", lambda: fake)
+    monkeypatch.setattr(api, "_CACHE", api.ResponseCache())
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), api.ApiHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+    def get(path, **headers):
+        con = http.client.HTTPConnection(*httpd.server_address, timeout=5)
+        con.request("GET", path, headers=headers)
+        resp = con.getresponse()
+        body = resp.read()
+        con.close()
+        return resp, body
+
+    yield fake, get
+    httpd.shutdown()
+    httpd.server_close()
+
+HOLDINGS = f"/holdings?fund={FUND.replace(' ', '+')}"
+
+def test_matching_etag_gets_304_without_building(server):
+    fake, get = server
+    resp, body = get(HOLDINGS)
+    etag = resp.getheader("ETag")
+    assert resp.status == 200 and etag and json.loads(body)["fund"] == FUND
+    resp, body = get(HOLDINGS, **{"If-None-Match": etag})
+    assert (resp.status, body, resp.getheader("ETag")) == (304, b"", etag)
+    assert fake.builds == 1
+
+def test_unchanged_data_is_served_from_the_response_cache(server):
+    fake, get = server
+    first = get(HOLDINGS)[1]
+    assert get(HOLDINGS)[1] == first
+    assert fake.builds == 1
+
+def test_sync_of_the_fund_changes_the_etag(server):
+    fake, get = server
+    etag = get(HOLDINGS)[0].getheader("ETag")
+    fake.bump(FUND)
+    resp, _ = get(HOLDINGS, **{"If-None-Match": etag})
+    assert resp.status == 200 and resp.getheader("ETag") != etag
+    assert fake.builds == 2
+
+def test_sync_of_another_fund_keeps_the_etag(server):
+    fake, get = server
+    etag = get(HOLDINGS)[0].getheader("ETag")
+    fake.bump(OTHER)
+    assert get(HOLDINGS, **{"If-None-Match": etag})[0].status == 304
+
+def test_gzip_only_when_accepted_and_worth_it(server):
+    fake, get = server
+    assert get(HOLDINGS, **{"Accept-Encoding": "gzip"})[0].getheader("Content-Encoding") is None   # Small body
+    fake.rows = 200
+    fake.bump(FUND)
+    resp, body = get(HOLDINGS, **{"Accept-Encoding": "gzip"})
+    assert resp.getheader("Content-Encoding") == "gzip"
+    assert len(json.loads(gzip.decompress(body))["holdings"]) == 200
+    resp, body = get(HOLDINGS)
+    assert resp.getheader("Content-Encoding") is None and len(json.loads(body)["holdings"]) == 200
+
+def test_errors_carry_no_etag(server):
+    _, get = server
+    resp, body = get("/holdings?fund=Nope")
+    assert resp.status == 404 and resp.getheader("ETag") is None
+    assert json.loads(body) == {"error": "unknown fund: Nope"}
+
+def test_cumulative_flows_route(server):
+    _, get = server
+    resp, body = get(f"/flows/cumulative?fund={FUND.replace(' ', '+')}")
+    data = json.loads(body)
+    assert resp.status == 200 and resp.getheader("ETag") and data["periods"] == ["2025-04", "2025-05"]
+    stocks = {s["Stock Name"]: s for s in data["stocks"]}
+    assert (stocks["Beta"]["Entries"], stocks["Alpha"]["Adds"], stocks["Alpha"]["MonthsHeld"]) == (1, 1, 2)
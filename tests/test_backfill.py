@@ -0,0 +1,81 @@
+# tests/test_backfill.py
+import json
+import pandas as pd
+import pytest
+import requests
+import backfill
+import negative_cache
+import planner
+import sync
+from config import BACKFILL_CHECKPOINT_FILE
+
+FUND = "SBI Contra Fund"
+START, END = ("January", 2024), ("March", 2024)
+
+@pytest.fixture
+def world(monkeypatch):
+    """A fund with no stored months whose downloads answer per month from `answers`"""
+    monkeypatch.setattr(negative_cache, "_CACHE", negative_cache.NegativeCache("data/negative_cache.json"))
+    stored, fetched, answers = set(), [], {}
+
+    def fetch_task(task):
+        fetched.append(task["month"])
+        answer = answers[task["month"]]
+        if isinstance(answer, Exception): raise answer
+        return {f: answer for f in task["funds"]}
+
+    def commit_results(fund_name, results):
+        added = [(m, y) for m, y, df in results if df is not None]
+        stored.update(added)
+        return None, added
+
+    monkeypatch.setattr(planner, "stored_periods", lambda fund_name: set(stored))
+    monkeypatch.setattr(planner, "fetch_task", fetch_task)
+    monkeypatch.setattr(sync, "commit_results", commit_results)
+    return answers, fetched
+
+def checkpoint_done(job):
+    with open(BACKFILL_CHECKPOINT_FILE) as f:
+        return json.load(f)[job]["done"]
+
+def test_checkpoint_records_found_and_empty_but_not_errors(world):
+    answers, fetched = world
+    answers.update(January=pd.DataFrame({"ISIN": ["INE000000001"]}), February=None,
+                   March=requests.ConnectionError("down"))
+    added = backfill.backfill([FUND], START, END, "job", workers=1)
+    assert added == {FUND: [("January", 2024)]}
+    assert checkpoint_done("job") == {"SBI master|January|2024": "found", "SBI master|February|2024": "empty"}
+
+def test_rerun_resumes_with_only_unfinished_downloads(world):
+    answers, fetched = world
+    answers.update(January=pd.DataFrame({"ISIN": ["INE000000001"]}), February=None,
+                   March=requests.ConnectionError("down"))
+    backfill.backfill([FUND], START, END, "job", workers=1)
+    fetched.clear()
+    answers["March"] = pd.DataFrame({"ISIN": ["INE000000001"]})
+    added = backfill.backfill([FUND], START, END, "job", workers=1)
+    assert fetched == ["March"]
+    assert added == {FUND: [("March", 2024)]}
+    assert backfill.backfill([FUND], START, END, "job", workers=1) == {}
+
+def test_jobs_keep_separate_checkpoints(world):
+    answers, fetched = world
+    answers.update(January=None, February=None, March=None)
+    backfill.backfill([FUND], START, END, "first", workers=1)
+    fetched.clear()
+    backfill.backfill([FUND], START, END, "second", workers=1)
+    assert sorted(fetched) == ["February", "January", "March"]
+
+def test_retry_missing_reprobes_empties_and_only_this_jobs_misses(world):
+    answers, fetched = world
+    answers.update(January=None, February=None, March=None)
+    backfill.backfill([FUND], START, END, "job", workers=1)
+    negative_cache.record_missing("SBI master", "February", 2024)
+    negative_cache.record_missing("SBI master", "June", 2024)
+    negative_cache.record_missing("NIPPON master", "February", 2024)
+    fetched.clear()
+    backfill.backfill([FUND], START, END, "job", workers=1, retry_missing=True)
+    assert sorted(fetched) == ["February", "January", "March"]
+    assert not negative_cache.is_missing("SBI master", "February", 2024)
+    assert negative_cache.is_missing("SBI master", "June", 2024)
+    assert negative_cache.is_missing("NIPPON master", "February", 2024)
@@ -0,0 +1,83 @@
+# tests/test_bitsets.py
+import itertools
+import numpy as np
+import pytest
+import bitsets
+
+UNIVERSE = [f"INE{i:09d}" for i in range(150)]     # Spans three uint64 words
+
+def random_sets(n, seed):
+    rng = np.random.default_rng(seed)
+    return [set(rng.choice(UNIVERSE, size=rng.integers(0, 90), replace=False)) for _ in range(n)]
+
+class FixedBitsets(bitsets.HoldingsBitsets):
+    """Bitsets from plain ISIN sets, no engine"""
+    def __init__(self, holdings):
+        super().__init__()
+        self._bits = {(f, None): self._encode(sorted(s)) for f, s in holdings.items()}
+
+    def refresh(self, fund_names=None):
+        pass
+
+    def bitset(self, fund_name, period=None):
+        words = self._bits.get((fund_name, period))
+        size = (len(self.universe) + 63) // 64
+        return None if words is None else np.concatenate([words, np.zeros(size - len(words), dtype=np.uint64)])
+
+def encoded(sets):
+    index = bitsets.HoldingsBitsets()
+    words = [index._encode(sorted(s)) for s in sets]
+    size = (len(index.universe) + 63) // 64
+    return index, np.stack([np.concatenate([w, np.zeros(size - len(w), dtype=np.uint64)]) for w in words])
+
+def test_popcount_table_fallback_matches_builtin(monkeypatch):
+    words = np.array([0, 1, 2**63, 2**64 - 1, 0x0F0F], dtype=np.uint64)
+    expected = sum(bin(int(w)).count("1") for w in words)
+    assert bitsets.popcount(words) == expected
+    monkeypatch.delattr(np, "bitwise_count", raising=False)
+    assert bitsets.popcount(words) == expected
+
+def test_encode_round_trips_and_grows_append_only():
+    index = bitsets.HoldingsBitsets()
+    first = index._encode(UNIVERSE[:70])
+    assert index.isins(first) == UNIVERSE[:70]
+    second = index._encode(UNIVERSE[60:140])
+    assert len(first) == 2 and len(second) == 3
+    assert index.isins(second) == UNIVERSE[60:140]
+    assert index.universe == UNIVERSE[:140]
+
+@pytest.mark.parametrize("n, seed", [(1, 0), (2, 1), (3, 2), (5, 3), (7, 4)])
+def test_counts_by_holders_matches_set_counting(n, seed):
+    sets = random_sets(n, seed)
+    index, words = encoded(sets)
+    by_holders = bitsets._counts_by_holders(words)
+    for k in range(1, n + 1):
+        expected = {i for i in set().union(*sets) if sum(i in s for s in sets) == k}
+        assert set(index.isins(by_holders[k])) == expected
+
+@pytest.mark.parametrize("n, seed", [(2, 5), (4, 6), (6, 7)])
+def test_exclusive_groups_match_brute_force(n, seed):
+    sets = random_sets(n, seed)
+    index, words = encoded(sets)
+    groups = {members: set(index.isins(bits)) for members, bits in bitsets._exclusive_groups(words, np.bitwise_or.reduce(words))}
+    expected = {}
+    for members in itertools.chain.from_iterable(itertools.combinations(range(n), r) for r in range(1, n + 1)):
+        stocks = set().union(*sets)
+        for i in range(n):
+            stocks = stocks & sets[i] if i in members else stocks - sets[i]
+        if stocks: expected[members] = stocks
+    assert groups == expected
+
+def test_intersect_summaries():
+    holdings = {"A": set(UNIVERSE[:80]), "B": set(UNIVERSE[40:120]), "C": set(UNIVERSE[70:75]) | set(UNIVERSE[140:])}
+    out = bitsets.intersect(list(holdings), index=FixedBitsets(holdings))
+    assert out["union"] == 130
+    assert out["all"] == 5
+    assert sorted(out["held_by_all"]["ISIN"]) == UNIVERSE[70:75]
+    assert out["exactly"]["Stocks"].tolist() == [5, 35, 90]        # held by 3, 2, 1 of 3
+    assert out["unique"]["Unique"].tolist() == [40, 40, 10]
+    assert out["groups"]["Stocks"].sum() == 130
+
+def test_intersect_reports_funds_without_holdings():
+    out = bitsets.intersect(["A", "Z"], index=FixedBitsets({"A": set(UNIVERSE[:3])}))
+    assert out == {"error": "No holdings for Z. Sync first."}
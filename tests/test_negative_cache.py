@@ -0,0 +1,80 @@
+# tests/test_negative_cache.py
+import datetime
+import pytest
+import requests
+import http_client
+import negative_cache
+import scrapers
+
+NOW = datetime.datetime(2025, 6, 10, 12, 0)
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = negative_cache.NegativeCache("data/negative_cache.json")
+    monkeypatch.setattr(negative_cache, "_CACHE", cache)
+    return cache
+
+def response(status):
+    r = requests.Response()
+    r.status_code, r.url = status, "https://example.test/"
+    return r
+
+# ===========================
+# TTL POLICY
+# ===========================
+def test_ttl_short_for_current_cycle_longer_for_recent_none_for_old():
+    today = NOW.date()
+    assert negative_cache.ttl_for("May", 2025, today) == datetime.timedelta(hours=6)
+    assert negative_cache.ttl_for("March", 2025, today) == datetime.timedelta(hours=72)
+    assert negative_cache.ttl_for("January", 2024, today) is None
+
+def test_miss_expires_after_its_ttl(cache):
+    cache.record_missing("SBI master", "May", 2025, now=NOW)
+    assert cache.is_missing("SBI master", "May", 2025, now=NOW + datetime.timedelta(hours=5))
+    assert not cache.is_missing("SBI master", "May", 2025, now=NOW + datetime.timedelta(hours=7))
+
+def test_old_miss_is_permanent(cache):
+    cache.record_missing("SBI master", "January", 2024, now=NOW)
+    assert cache.is_missing("SBI master", "January", 2024, now=NOW + datetime.timedelta(days=3650))
+
+# ===========================
+# STORE
+# ===========================
+def test_entries_persist_and_merge_across_instances(cache):
+    other = negative_cache.NegativeCache(cache.path)
+    cache.record_missing("SBI master", "January", 2024, now=NOW)
+    other.record_missing("NIPPON master", "January", 2024, now=NOW)
+    fresh = negative_cache.NegativeCache(cache.path)
+    assert fresh.is_missing("SBI master", "January", 2024)
+    assert fresh.is_missing("NIPPON master", "January", 2024)
+
+def test_clear_many_forgets_only_those_keys(cache):
+    for source in ("A", "B", "C"):
+        cache.record_missing(source, "January", 2024, now=NOW)
+    cache.clear_many([("A", "January", 2024), ("B", "January", 2024)])
+    assert [cache.is_missing(s, "January", 2024) for s in ("A", "B", "C")] == [False, False, True]
+
+# ===========================
+# OUTAGES ARE NOT MISSES
+# ===========================
+def test_nippon_master_all_404_is_missing(cache, monkeypatch):
+    monkeypatch.setattr(http_client, "head", lambda url, **kw: response(404))
+    assert scrapers.find_nippon_master("January", 2024) is None
+    assert scrapers._fetch_nippon_master("January", 2024, ["SC"]) == {"SC": None}
+    assert cache.is_missing("NIPPON master", "January", 2024)
+
+@pytest.mark.parametrize("outcome", [response(503), requests.ConnectionError("down")])
+def test_nippon_master_outage_raises_and_is_not_cached(cache, monkeypatch, outcome):
+    def head(url, **kw):
+        if isinstance(outcome, Exception): raise outcome
+        return outcome
+    monkeypatch.setattr(http_client, "head", head)
+    with pytest.raises(requests.RequestException):
+        scrapers._fetch_nippon_master("January", 2024, ["SC"])
+    assert not cache.is_missing("NIPPON master", "January", 2024)
+
+def test_ppfas_error_page_is_not_cached(cache, monkeypatch):
+    monkeypatch.setattr(http_client, "get", lambda url, **kw: response(503))
+    with pytest.raises(requests.HTTPError):
+        scrapers.fetch_ppfas("January", 2024)
+    assert not cache.is_missing("PPFAS Flexi Cap", "January", 2024)
@@ -0,0 +1,99 @@
+# tests/test_quality.py
+import pandas as pd
+import pytest
+import analysis
+import quality
+
+MONTH, YEAR = "May", 2025
+VALID = ["INE002A01018", "INE009A01021", "INE040A01034", "INE467B01029", "US0378331005"]
+
+def valid_isin(i):
+    body = f"INE{i:08d}"
+    return next(body + d for d in "0123456789" if quality.isin_valid([body + d])[0])
+
+def fund_month(n=12, nav=8.0, price=100.0, isins=None, month=MONTH):
+    isins = isins or [valid_isin(i) for i in range(n)]
+    return pd.DataFrame({"ISIN": isins, f"Qty_{month}_{YEAR}": 10.0,
+                         f"MarketValue_{month}_{YEAR}": 10.0 * price, f"NavPct_{month}_{YEAR}": nav})
+
+# ===========================
+# ISINS
+# ===========================
+def test_isin_checksum():
+    assert quality.isin_valid(VALID).tolist() == [True] * 5
+    assert quality.isin_valid(["INE002A01019", "INE002A0101", "ine002a01018 ", None]).tolist() == [False, False, True, False]
+
+def test_duplicate_isins_are_an_error():
+    row = quality.check("SBI Contra Fund", fund_month(isins=VALID[:4] * 3), MONTH, YEAR)
+    assert row["DuplicateIsins"] == 8 and row["Status"] == "error"
+
+# ===========================
+# NAV TOTAL
+# ===========================
+@pytest.mark.parametrize("fund, kind", [
+    ("SBI Contra Fund", "equity"), ("SBI Equity Hybrid Fund", "hybrid"), ("HDFC Balanced Advantage Fund", "hybrid"),
+    ("SBI Liquid Fund", "debt"), ("SBI Savings Fund", "debt"), ("SBI Children's Fund - Savings Plan (Erstwhile known as SBI Magnum Children's Benefit Fund-Svg P)", "hybrid")
+])
+def test_scheme_type_from_name(fund, kind):
+    assert analysis.scheme_type(fund) == kind
+
+def test_scheme_type_setting_wins(monkeypatch):
+    monkeypatch.setitem(analysis.FUND_CONFIG, "Some Fund", {"scheme_type": "hybrid"})
+    assert analysis.scheme_type("Some Fund") == "hybrid"
+
+@pytest.mark.parametrize("fund, nav, status, issue", [
+    ("SBI Contra Fund", 8.0, "ok", ""),                            # 96%
+    ("SBI Contra Fund", 3.0, "warn", "equity rows missing"),       # 36% for an equity scheme
+    ("SBI Equity Hybrid Fund", 3.0, "ok", ""),                     # 36% is normal for a hybrid
+    ("SBI Contra Fund", 9.0, "error", "subtotal or repeated rows"),
+    ("SBI Contra Fund", 0.08, "error", "fractions instead of percent"),
+    ("SBI Liquid Fund", 0.08, "ok", "")
+])
+def test_nav_sum_by_scheme_type(fund, nav, status, issue):
+    row = quality.check(fund, fund_month(nav=nav), MONTH, YEAR)
+    assert row["Status"] == status
+    assert issue in row["Issues"]
+
+def test_nav_sum_skipped_for_tiny_sheets():
+    row = quality.check("SBI Contra Fund", fund_month(n=3, nav=1.0), MONTH, YEAR)
+    assert row["NavSum"] is None and row["Status"] == "ok"
+
+def test_fraction_sheets_are_kept_in_percent():
+    col = f"NavPct_{MONTH}_{YEAR}"
+    assert analysis.percent_nav(fund_month(nav=0.08), "SBI Contra Fund")[col].sum() == pytest.approx(96)
+    assert analysis.percent_nav(fund_month(nav=8.0), "SBI Contra Fund")[col].sum() == pytest.approx(96)
+
+def test_debt_schemes_keep_tiny_percentages():
+    col = f"NavPct_{MONTH}_{YEAR}"
+    assert analysis.percent_nav(fund_month(n=3, nav=0.1), "SBI Liquid Fund")[col].sum() == pytest.approx(0.3)
+
+def test_stored_fraction_months_read_back_in_percent():
+    df = analysis.clean_fund_frame(fund_month(nav=0.08).assign(**{"Stock Name": "x"}), "SBI Contra Fund")
+    assert df[f"NavPct_{MONTH}_{YEAR}"].iloc[0] == pytest.approx(8.0)
+
+# ===========================
+# IMPLIED PRICES
+# ===========================
+def test_whole_sheet_price_shift_is_an_error():
+    prev = quality.implied_prices(fund_month(price=100.0), MONTH, YEAR)
+    row = quality.check("SBI Contra Fund", fund_month(price=100_000.0), MONTH, YEAR, prev)
+    assert row["PriceOutliers"] == row["PricesCompared"] == 12
+    assert row["Status"] == "error"
+
+def test_a_few_price_moves_only_warn():
+    prev = quality.implied_prices(fund_month(price=100.0), MONTH, YEAR)
+    now = fund_month(price=100.0)
+    now.loc[0, f"MarketValue_{MONTH}_{YEAR}"] *= 10     # One stock after a 10:1 consolidation
+    row = quality.check("SBI Contra Fund", now, MONTH, YEAR, prev)
+    assert (row["PriceOutliers"], row["Status"]) == (1, "warn")
+
+# ===========================
+# REPORT
+# ===========================
+def test_record_replaces_rows_for_the_same_fund_month():
+    quality.record([quality.check("SBI Contra Fund", fund_month(nav=3.0), MONTH, YEAR)])
+    quality.record([quality.check("SBI Contra Fund", fund_month(), MONTH, YEAR),
+                    quality.check("SBI Contra Fund", fund_month(month="April"), "April", YEAR)])
+    report = quality.load_report()
+    assert len(report) == 2
+    assert report.set_index("Month").loc[MONTH, "Status"] == "ok"
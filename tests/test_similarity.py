@@ -0,0 +1,56 @@
+# tests/test_similarity.py
+import numpy as np
+import pytest
+import similarity
+from config import SIMILARITY_NUM_PERM, SIMILARITY_BANDS
+
+PERIOD = ("March", 2025)
+
+def isins(start, stop):
+    return np.array([f"INE{i:09d}" for i in range(start, stop)])
+
+def test_bands_split_the_signature_evenly():
+    assert SIMILARITY_NUM_PERM % SIMILARITY_BANDS == 0
+    index = similarity.SimilarityIndex()
+    sig = index.hasher.signature(similarity.isin_hashes(isins(0, 50)))
+    keys = index._band_keys(sig)
+    assert len(keys) == SIMILARITY_BANDS
+    assert {len(k) for k in keys} == {index.rows * sig.itemsize}
+    assert b"".join(keys) == sig.tobytes()
+
+def test_signature_matches_exact_modular_arithmetic():
+    """a*x + b must not wrap in uint64 before the mod"""
+    hasher = similarity.MinHasher(num_perm=16)
+    hashes = similarity.isin_hashes(isins(0, 20))
+    expected = [min(((int(a) * int(x) + int(b)) % similarity._PRIME) & similarity._MAX_HASH for x in hashes)
+                for a, b in zip(hasher.a, hasher.b)]
+    assert hasher.signature(hashes).tolist() == expected
+
+def test_signature_agreement_estimates_jaccard():
+    hasher = similarity.MinHasher(num_perm=1024)
+    a, b = isins(0, 100), isins(50, 150)                 # Jaccard 50 / 150
+    agree = (hasher.signature(similarity.isin_hashes(a)) == hasher.signature(similarity.isin_hashes(b))).mean()
+    assert agree == pytest.approx(1 / 3, abs=0.06)
+    same = hasher.signature(similarity.isin_hashes(a[::-1]))
+    assert (same == hasher.signature(similarity.isin_hashes(a))).all()
+
+def test_exact_jaccard():
+    assert similarity.jaccard(isins(0, 100), isins(50, 150)) == (pytest.approx(1 / 3), 50)
+    assert similarity.jaccard(isins(0, 0), isins(0, 0)) == (0.0, 0)
+
+def test_lsh_finds_near_duplicates_and_skips_disjoint_funds():
+    index = similarity.SimilarityIndex()
+    index._add("Active", PERIOD, isins(0, 50))
+    index._add("Index", PERIOD, isins(5, 55))            # Jaccard 45 / 55
+    index._add("Other", PERIOD, isins(1000, 1050))
+    assert index.candidates("Active", PERIOD) == {"Index"}
+    ranked = index._rank("Active", PERIOD, index.candidates("Active", PERIOD))
+    assert ranked.iloc[0].to_dict() == {"Fund": "Index", "Jaccard": round(45 / 55, 4), "Shared": 45, "Holdings": 50}
+
+def test_removing_a_fund_empties_its_buckets():
+    index = similarity.SimilarityIndex()
+    index._add("A", PERIOD, isins(0, 50))
+    index._add("B", PERIOD, isins(0, 50))
+    index._remove("A")
+    assert index.candidates("B", PERIOD) == set()
+    assert all(funds == {"B"} for table in index._buckets[PERIOD] for funds in table.values())
@@ -1,6 +1,7 @@
 import streamlit as st
-import plotly.express as px
-import plotly.graph_objects as go
+
+# Plotly is imported inside each chart function: it costs more than the rest of ui at cold start,
+# and the landing page and compare mode never draw a chart
 
 def apply_clean_saas_theme():
     st.markdown("""
@@ -227,6 +228,7 @@ def render_metric_card(label, value, delta=None, delta_color="neu"):
     """, unsafe_allow_html=True)
 
 def render_treemap(df, col_name):
+    import plotly.express as px
     col_base = col_name.replace("Qty_", "")
     market_value_col = f"MarketValue_{col_base}"
     nav_pct_col = f"NavPct_{col_base}"
@@ -262,8 +264,9 @@ def render_treemap(df, col_name):
     st.plotly_chart(fig, use_container_width=True)
 
 def render_trend_chart(df, stock_name, qty_cols, years):
+    import plotly.graph_objects as go
     trend_data = df[df["Stock Name"] == stock_name].melt(id_vars=["Stock Name"], value_vars=qty_cols, var_name="Month", value_name="Qty")
-    trend_data["Month"] = trend_data["Month"].str.replace("Qty_", "").str.replace(f"_{years[0]}", "")
+    trend_data["Month"] = trend_data["Month"].str.replace("Qty_", "").str.replace(f"_{years[0]}", "").str.replace("_", " ")
     fig = go.Figure()
     fig.add_trace(go.Scatter(
         x=trend_data['Month'], y=trend_data['Qty'], fill='tozeroy', mode='lines+markers',
@@ -280,6 +283,43 @@ def render_trend_chart(df, stock_name, qty_cols, years):
     )
     st.plotly_chart(fig, use_container_width=True)
 
+def render_sector_view(sector_df):
+    if sector_df.empty:
+        st.info("No sector data yet. Sync the fund to build it.")
+        return
+    import plotly.express as px
+    import plotly.graph_objects as go
+    period_order = list(dict.fromkeys(sector_df["Period"]))
+    fig = px.bar(
+        sector_df, x="Period", y="Weight", color="Sector", category_orders={"Period": period_order},
+        color_discrete_sequence=px.colors.sequential.Oranges_r + px.colors.sequential.Greys_r
+    )
+    fig.update_layout(
+        title=dict(text="Sector Weights", font=dict(size=18, family="Plus Jakarta Sans, sans-serif", color="#111827", weight=700)),
+        template="plotly_white", paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)',
+        font=dict(family="Plus Jakarta Sans, sans-serif", color="#6B7280"), barmode="stack",
+        yaxis=dict(tickformat=".0%", showgrid=True, gridcolor='#F3F4F6'), xaxis=dict(showgrid=False),
+        legend=dict(orientation="h", y=-0.2)
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+    latest = sector_df[sector_df["Period"] == period_order[-1]].dropna(subset=["NetBuying"])
+    if latest.empty:
+        st.caption("Net buying needs market values and at least two months of data.")
+        return
+    latest = latest.sort_values("NetBuying")
+    fig = go.Figure(go.Bar(
+        x=latest["NetBuying"], y=latest["Sector"], orientation="h",
+        marker_color=["#059669" if v >= 0 else "#DC2626" for v in latest["NetBuying"]]
+    ))
+    fig.update_layout(
+        title=dict(text=f"Net Buying: {period_order[-1]}", font=dict(size=18, family="Plus Jakarta Sans, sans-serif", color="#111827", weight=700)),
+        template="plotly_white", paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)',
+        font=dict(family="Plus Jakarta Sans, sans-serif", color="#6B7280"),
+        xaxis=dict(showgrid=True, gridcolor='#F3F4F6', zeroline=True, zerolinecolor='#E5E7EB'), yaxis=dict(showgrid=False)
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
 def render_fund_flow(entries_df, exits_df, current_month):
     st.markdown(f"#### Fund Flow: {current_month} Activity")
     col1, col2 = st.columns(2)
@@ -299,6 +339,51 @@ def render_fund_flow(entries_df, exits_df, current_month):
         else: st.markdown("<div style='color: #9CA3AF; font-style: italic; padding: 10px 0;'>No exits this month.</div>", unsafe_allow_html=True)
         st.markdown("</div>", unsafe_allow_html=True)
 
+def render_flow_history(summary_df, cumulative_df=None):
+    if summary_df.empty:
+        return
+    st.markdown("#### Flow History")
+    import plotly.graph_objects as go
+    fig = go.Figure()
+    for col, color in [("Entries", "#059669"), ("Adds", "#6EE7B7"), ("Trims", "#FCA5A5"), ("Exits", "#DC2626")]:
+        sign = -1 if col in ("Trims", "Exits") else 1
+        fig.add_trace(go.Bar(x=summary_df["Period"], y=sign * summary_df[col], name=col, marker_color=color))
+    fig.update_layout(
+        template="plotly_white", paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', barmode="relative",
+        font=dict(family="Plus Jakarta Sans, sans-serif", color="#6B7280"),
+        xaxis=dict(showgrid=False), yaxis=dict(title="Positions", showgrid=True, gridcolor='#F3F4F6', zeroline=True, zerolinecolor='#E5E7EB'),
+        legend=dict(orientation="h", y=-0.2), margin=dict(t=10)
+    )
+    st.plotly_chart(fig, use_container_width=True)
+    if cumulative_df is not None and not cumulative_df.empty:
+        with st.expander("Cumulative flows per stock, all stored months"):
+            st.dataframe(cumulative_df.set_index("Stock Name").style.format("{:,.0f}", subset=["NetChange"]),
+                         use_container_width=True, height=400)
+
+def render_similar_funds(similar_df, period_label, index_match=None):
+    st.markdown(f"#### Funds Most Like This One · {period_label}")
+    if index_match is not None:
+        st.warning(f"⚠️ Likely closet indexer: {index_match['Shared']} of its {index_match['Holdings']} holdings are also in "
+                   f"{index_match['Fund']} (Jaccard {index_match['Jaccard']:.2f}).")
+    if similar_df.empty:
+        st.info("No other fund holds a similar set of stocks this month.")
+        return
+    st.caption("Jaccard = shared stocks / stocks held by either fund.")
+    st.dataframe(similar_df.set_index("Fund").style.format("{:.2f}", subset=["Jaccard"])
+                 .background_gradient(cmap="Oranges", subset=["Jaccard"]), use_container_width=True)
+
+def render_leaderboard(boards, period_label):
+    colors = {"Most Bought": "#059669", "Most Initiated": "#059669", "Most Sold": "#DC2626", "Most Exited": "#DC2626"}
+    titles = list(boards)
+    for row in (titles[:2], titles[2:]):
+        cols = st.columns(2)
+        for col, title in zip(cols, row):
+            with col:
+                st.markdown(f"<div style='color: {colors.get(title, '#111827')}; font-weight: 700; margin-bottom: 8px;'>{title.upper()} · {period_label}</div>", unsafe_allow_html=True)
+                table = boards[title].set_index("Stock Name")
+                value_cols = [c for c in table.columns if c.startswith("Value")]
+                st.dataframe(table.style.format("{:,.0f}", subset=value_cols, na_rep="–"), use_container_width=True)
+
 def render_comparison_dashboard(fund_a, fund_b, analysis_result):
     if "error" in analysis_result:
         st.error(analysis_result["error"])
@@ -321,6 +406,36 @@ def render_comparison_dashboard(fund_a, fund_b, analysis_result):
     with c2: render_list_column("COMMON", "BOTH FUNDS", len(common_list), "#FFF7ED", "#C2410C", common_list) 
     with c3: render_list_column("ONLY IN", fund_b.split()[0].upper(), len(unique_b_list), "#F3F4F6", "#374151", unique_b_list) 
 
+def render_intersections(result):
+    if "error" in result:
+        st.error(result["error"])
+        return
+    funds = result["funds"]
+    st.markdown(f"### 🧩 Portfolio Intersections: <span style='color:#FF6B00'>{len(funds)} funds</span>", unsafe_allow_html=True)
+    st.markdown("<br>", unsafe_allow_html=True)
+
+    c1, c2, c3 = st.columns(3)
+    with c1: render_metric_card("Held by All", result["all"], f"of {result['union']} stocks", "pos")
+    with c2: render_metric_card("Held by Any", result["union"], "Distinct Stocks", "neu")
+    with c3: render_metric_card("Unique Bets", int(result["unique"]["Unique"].sum()), "Held by one fund only", "neu")
+
+    st.markdown("<br>", unsafe_allow_html=True)
+    c1, c2 = st.columns([1, 2])
+    with c1:
+        st.markdown("#### Held By Exactly")
+        st.dataframe(result["exactly"].set_index("Held By"), use_container_width=True)
+    with c2:
+        st.markdown("#### Unique to Each Fund")
+        st.dataframe(result["unique"].set_index("Fund"), use_container_width=True)
+
+    st.markdown("#### Membership Groups")
+    st.caption("Each row: stocks held by exactly the marked funds and no other selected fund.")
+    groups = result["groups"].head(30)
+    st.dataframe(groups.style.background_gradient(cmap="Oranges", subset=["Stocks"]), use_container_width=True, hide_index=True)
+
+    with st.expander(f"Stocks held by all {len(funds)} funds ({result['all']})"):
+        st.dataframe(result["held_by_all"], use_container_width=True, hide_index=True)
+
 def render_landing_page():
     # --- HERO SECTION ---
     c1, c2 = st.columns([1.2, 1], gap="large")